@@ -0,0 +1,145 @@
+import argparse
+import time
+from random import Random
+from typing import List, Tuple, Type
+
+from mcpi_tetris.ai.search import board_rows, collides, place, search_placements
+from mcpi_tetris.core.basic import Position
+from mcpi_tetris.core.bitboard import BitboardTetrisBoard
+from mcpi_tetris.core.board import TetrisBoard
+from mcpi_tetris.core.tetromino import DefaultTetrominoDefinitions, Tetromino, TetrominoDefinition
+
+
+parser = argparse.ArgumentParser(description='Compare TetrisBoard engines with a microbenchmark.')
+parser.add_argument('--width', type=int, default=10)
+parser.add_argument('--height', type=int, default=20)
+parser.add_argument('--pieces', type=int, default=5000, help='플레이아웃에서 떨어트릴 테트로미노 수')
+parser.add_argument('--seed', type=int, default=1640170508)
+
+DEFINITIONS = [
+    DefaultTetrominoDefinitions.SHAPE_I,
+    DefaultTetrominoDefinitions.SHAPE_J,
+    DefaultTetrominoDefinitions.SHAPE_L,
+    DefaultTetrominoDefinitions.SHAPE_O,
+    DefaultTetrominoDefinitions.SHAPE_S,
+    DefaultTetrominoDefinitions.SHAPE_Z,
+    DefaultTetrominoDefinitions.SHAPE_T,
+]
+
+
+MOVE_ROTATE = 0
+MOVE_LEFT = 1
+MOVE_RIGHT = 2
+
+Script = List[Tuple[TetrominoDefinition, List[int]]]
+"""테트로미노마다 (정의, 떨어트리기 전에 입력할 이동들)"""
+
+
+def plan(width: int, height: int, pieces: int, seed: int) -> Tuple[Script, List[int]]:
+    """
+    무작위로 몇 번 움직인 뒤 A.I.가 고른 가장 좋은 위치로 이동하는 입력을 미리 만듦.
+    줄이 실제로 파괴되어야 destroy_completed_lines까지 비교할 수 있으며,
+    탐색은 보드 엔진과 무관하므로 측정 시간에서 제외함. (입력 목록, 예상되는 최종 가로줄 목록)을 반환
+    """
+    random = Random(seed)
+    rows = [0] * height
+    script = []
+
+    for _ in range(pieces):
+        definition = random.choice(DEFINITIONS)
+        tetromino = Tetromino(definition, Position(width // 2, height - 1))
+        if collides(rows, width, height, tetromino.get_rotation(), tetromino.position.x, tetromino.position.y):
+            rows = [0] * height # game over
+
+        moves = [random.randrange(3) for _ in range(random.randrange(6))]
+        for move in moves:
+            if move == MOVE_ROTATE:
+                tetromino.rotate()
+                if collides(rows, width, height, tetromino.get_rotation(), tetromino.position.x, tetromino.position.y):
+                    tetromino.rotate_reverse()
+            else:
+                step = -1 if move == MOVE_LEFT else 1
+                if not collides(rows, width, height, tetromino.get_rotation(), tetromino.position.x + step, tetromino.position.y):
+                    tetromino.position.x += step
+
+        best = max(search_placements(rows, width, height, tetromino), key=lambda placement: placement.score)
+
+        # search_placements는 rotate()와 같은 방향으로 회전하며 탐색함
+        moves += [MOVE_ROTATE] * ((tetromino.rotation - best.rotation) % len(definition.rotations))
+        dx = best.x - tetromino.position.x
+        moves += [MOVE_LEFT if dx < 0 else MOVE_RIGHT] * abs(dx)
+
+        rows, _ = place(rows, width, definition.get_rotation(best.rotation), best.x, best.y)
+        script.append((definition, moves))
+
+    return script, rows
+
+
+def playout(board_class: Type[TetrisBoard], width: int, height: int, script: Script):
+    """
+    fall, left, right, rotate, land가 호출하는 보드 연산 순서를 그대로 흉내내어 입력대로 테트로미노를 떨어트림.
+    (collisions, destroyed lines, spawned pieces, zobrist hash)와 최종 보드를 반환
+    """
+    board = board_class(width, height)
+
+    collisions = 0
+    destroyed_lines = 0
+
+    for definition, moves in script:
+        tetromino = Tetromino(definition, Position(width // 2, height - 1))
+        if board.has_collision(tetromino):
+            # game over, start again with an empty board
+            board = board_class(width, height)
+
+        board.set_tetromino(tetromino)
+
+        for move in moves:
+            board.remove_tetromino(tetromino)
+            if move == MOVE_ROTATE:
+                tetromino.rotate()
+                if board.has_collision(tetromino):
+                    tetromino.rotate_reverse()
+                    collisions += 1
+            elif move == MOVE_LEFT:
+                tetromino.left()
+                if board.has_collision(tetromino):
+                    tetromino.right()
+                    collisions += 1
+            else:
+                tetromino.right()
+                if board.has_collision(tetromino):
+                    tetromino.left()
+                    collisions += 1
+
+            board.set_tetromino(tetromino)
+
+        board.remove_tetromino(tetromino)
+        tetromino.position.y -= board.drop_distance(tetromino)
+        board.set_tetromino(tetromino)
+        destroyed_lines += board.destroy_completed_lines()
+
+    return (collisions, destroyed_lines, len(script), board.zobrist_hash), board
+
+
+def bench(board_class: Type[TetrisBoard], width: int, height: int, script: Script, expected_rows: List[int]):
+    started = time.perf_counter()
+    result, board = playout(board_class, width, height, script)
+    elapsed = time.perf_counter() - started
+
+    collisions, destroyed_lines, pieces, zobrist_hash = result
+    print(f'{board_class.__name__:>20}: {elapsed:.3f}s ({pieces / elapsed:,.0f} pieces/s) '
+          f'collisions={collisions} lines={destroyed_lines} hash={zobrist_hash:016x}')
+
+    assert board_rows(board) == expected_rows, f'{board_class.__name__} final board differs from the plan!'
+    return elapsed, result
+
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    script, expected_rows = plan(args.width, args.height, args.pieces, args.seed)
+
+    list_elapsed, list_result = bench(TetrisBoard, args.width, args.height, script, expected_rows)
+    bit_elapsed, bit_result = bench(BitboardTetrisBoard, args.width, args.height, script, expected_rows)
+
+    assert list_result == bit_result, 'board engines disagree!'
+    print(f'speedup: x{list_elapsed / bit_elapsed:.2f}')
@@ -0,0 +1,432 @@
+import argparse
+from collections import deque
+import glob
+import heapq
+import multiprocessing
+import queue
+from random import Random
+from socket import *
+import threading
+import time
+from typing import Deque, Iterable, List, Optional, Set, Tuple
+
+from mcpi_tetris.config import config
+from mcpi_tetris.core.controller import Controller, TetrisKey
+from mcpi_tetris.core.display import NullDisplayAdapter
+from mcpi_tetris.core.game import TetrisGame
+from mcpi_tetris.core.network import CONTROLLER_SERVER_PORT, ControllerServer, TetrisPacket, encode_keys
+from mcpi_tetris.core.player import TetrisPlayer
+from mcpi_tetris.core.profiler import TickProfiler
+from mcpi_tetris.record.controller import read_play_log
+from mcpi_tetris.record.logger import KeyLogger
+
+
+parser = argparse.ArgumentParser(description='Measure controller input latency and tick slip of a headless host under simulated clients.')
+parser.add_argument('--clients', type=int, nargs='+', default=[10, 25, 50, 100, 200], help='단계별 동시 접속 컨트롤러 수. 단계마다 게임을 새로 시작함')
+parser.add_argument('--duration', type=float, default=5, help='단계마다 키를 보내는 시간 (초)')
+parser.add_argument('--speed', type=float, default=1, help='기록된 키 입력 속도의 배수')
+parser.add_argument('--logs', default='logs/play-*.log', help='재생할 플레이 로그 파일 (glob)')
+parser.add_argument('--processes', type=int, default=1, help='클라이언트를 나눠서 돌릴 프로세스 수. 0이면 호스트와 같은 프로세스의 쓰레드에서 돌림')
+parser.add_argument('--port', type=int, default=CONTROLLER_SERVER_PORT)
+parser.add_argument('--slip-threshold', type=float, default=0.01, help='늦은 tick의 비율이 이보다 크거나 버린 tick이 있으면 밀린 것으로 봄')
+parser.add_argument('--drain', type=float, default=0.5, help='키 입력이 끝난 후 남은 키가 처리되기를 기다리는 시간 (초)')
+parser.add_argument('--seed', type=int, default=1640170508)
+# 호스트와 같은 게임 설정 (host.py 참고)
+parser.add_argument('--tick-rate', type=int, default=20)
+parser.add_argument('--tick-policy', default='catch_up', choices=('catch_up', 'skip'))
+parser.add_argument('--immediate-input', action='store_true')
+parser.add_argument('--bitboard', action='store_true')
+parser.add_argument('--input-queue-limit', type=int, default=32)
+parser.add_argument('--max-keys-per-tick', type=int, default=8)
+parser.add_argument('--no-coalesce', action='store_true')
+
+MOVE_KEYS = (TetrisKey.DOWN, TetrisKey.UP, TetrisKey.LEFT, TetrisKey.RIGHT, TetrisKey.LAND)
+
+KeyStream = List[Tuple[float, TetrisKey]]
+"""(재생 시작부터의 시각 (초), 키)들"""
+
+
+def now_us(epoch_ns: int) -> int:
+    """epoch_ns부터 지난 시간 (µs). time.monotonic_ns()는 프로세스끼리도 같은 시계를 사용함"""
+    return (time.monotonic_ns() - epoch_ns) // 1000
+
+
+def load_streams(pattern: str, speed: float) -> List[KeyStream]:
+    """플레이 로그들에서 이동 키만 꺼내 재생 시각을 붙임. 게임 참여, 시작 키는 벤치마크가 직접 처리함"""
+    streams = []
+
+    for path in sorted(glob.glob(pattern)):
+        header, logs = read_play_log(path)
+        tick_rate = int(header.get('tick_rate', 20))
+        logs = [(tick, key) for tick, key in logs if key in MOVE_KEYS]
+        if len(logs) == 0:
+            continue
+
+        first_tick = logs[0][0]
+        streams.append([((tick - first_tick) / tick_rate / speed, key) for tick, key in logs])
+
+    if len(streams) == 0:
+        raise SystemExit(f'no play logs found: {pattern}')
+
+    return streams
+
+
+class BenchController(Controller):
+    """받은 키와 함께 seq(보낸 시각)를 보관하여, 키가 적용될 때 지연 시간을 알 수 있게 함"""
+
+    seqs: Deque[Optional[int]]
+
+    applied_seq: Optional[int] = None
+    """마지막으로 pop()한 키의 seq"""
+
+    def __init__(self, player_id: int):
+        super().__init__(player_id)
+        self.seqs = deque()
+
+    def push_packet(self, packet: TetrisPacket):
+        dropped_keys = self.dropped_keys
+        self.push(packet.key)
+
+        if self.dropped_keys == dropped_keys:
+            self.seqs.appendleft(packet.seq)
+
+    def pop(self) -> Optional[TetrisKey]:
+        key = super().pop()
+        self.applied_seq = None if key is None else self.seqs.pop()
+        return key
+
+
+class LatencyLogger(KeyLogger):
+    """TetrisPlayer가 키를 처리할 때마다 보낸 시각부터의 지연 시간을 기록"""
+
+    game: 'BenchTetrisGame'
+
+    def __init__(self, player: TetrisPlayer, game: 'BenchTetrisGame'):
+        super().__init__(player)
+        self.game = game
+
+    def onkeypress(self, key: TetrisKey):
+        self.game.onkeyapplied(self.player.controller.applied_seq)
+
+
+class BenchTetrisGame(TetrisGame):
+    """
+    화면과 마인크래프트 없이 ControllerServer로 키를 받는 게임. 실제 호스트처럼 tick 스케줄러에 맞춰 진행함.
+    게임 오버된 플레이어는 바로 새 판으로 바꿔서, 단계가 끝날 때까지 모든 클라이언트의 키를 받음
+    """
+
+    network: ControllerServer
+    epoch_ns: int
+
+    latency: TickProfiler
+    """측정 구간에 보낸 키들의 지연 시간 (초). 프로파일러의 통계 계산을 그대로 사용"""
+
+    window: Tuple[int, int] = (0, 0)
+    """지연 시간을 기록할 키들을 보낸 시각의 범위 (µs)"""
+
+    applied_keys: int = 0
+    """처리한 키 수 (측정 구간과 관계없이)"""
+
+    restarted_players: int = 0
+    """게임 오버되어 새 판으로 바꾼 횟수"""
+
+    def __init__(self, port: int, epoch_ns: int):
+        super().__init__()
+        self.epoch_ns = epoch_ns
+        self.latency = TickProfiler(window=10_000_000)
+
+        self.network = ControllerServer()
+        self.network.verbose = False
+        self.network.serve(port)
+
+    def create_player(self, player_id: int) -> TetrisPlayer:
+        player = TetrisPlayer(
+            game=self,
+            width=10,
+            height=20,
+            controller=self.get_controller(player_id),
+            display_adapter=NullDisplayAdapter(),
+        )
+        player.setlogger(LatencyLogger(player, self))
+        return player
+
+    def print_message(self, message: str):
+        pass
+
+    def pretick(self):
+        self.dispatch_packets(self.network.recv())
+
+    def wait_for_input(self, timeout: float) -> Iterable[int]:
+        return self.dispatch_packets(self.network.wait(timeout))
+
+    def dispatch_packets(self, packets: Iterable[TetrisPacket]) -> Set[int]:
+        player_ids = set()
+
+        for packet in packets:
+            controller = self.controllers.get(packet.player_id)
+            if controller is not None:
+                controller.push_packet(packet)
+                player_ids.add(packet.player_id)
+
+        return player_ids
+
+    def tick_player(self, player: TetrisPlayer):
+        player.tick()
+
+        if not player.playing:
+            player_id = player.controller.player_id
+            player.close()
+            self.players[player_id] = self.create_player(player_id)
+            self.restarted_players += 1
+
+    def onkeyapplied(self, seq: Optional[int]):
+        self.applied_keys += 1
+
+        if seq is not None and self.window[0] <= seq < self.window[1]:
+            self.latency.record('latency', (now_us(self.epoch_ns) - seq) / 1e6)
+
+    def close(self):
+        super().close()
+        self.network.close()
+
+
+class ReplayClient:
+    """로그 하나의 키들을 기록된 간격대로 반복해서 보내는 클라이언트"""
+
+    player_id: int
+    sock: socket
+    stream: KeyStream
+
+    span: float
+    """스트림 한 바퀴의 길이 (초)"""
+
+    index: int = 0
+    loop_offset: float = 0
+
+    def __init__(self, player_id: int, sock: socket, stream: KeyStream, phase: float):
+        self.player_id = player_id
+        self.sock = sock
+        self.stream = stream
+        self.span = stream[-1][0] + 1
+        self.loop_offset = -phase # 모든 클라이언트가 같은 순간에 보내지 않도록 시작 위치를 흩뜨림
+
+        while self.next_at() < 0:
+            self.advance()
+
+    def next_at(self) -> float:
+        return self.loop_offset + self.stream[self.index][0]
+
+    def advance(self):
+        self.index += 1
+        if self.index == len(self.stream):
+            self.index = 0
+            self.loop_offset += self.span
+
+
+def replay_clients(
+    port: int,
+    clients: List[Tuple[int, int, float]],
+    streams: List[KeyStream],
+    epoch_ns: int,
+    duration: float,
+    linger: float,
+    start: threading.Event,
+    results,
+):
+    """
+    (플레이어 ID, 스트림 번호, 시작 위치)마다 연결을 하나씩 만들고, start가 설정되면 duration초 동안 키를 보냄.
+    연결마다 쓰레드를 만들지 않고 다음에 보낼 시각 순서로 heap에서 꺼내서 보냄.
+    결과로 (보낸 키 수, 예정보다 늦게 보낸 최대 시간 (초))를 results에 넣음
+    """
+    replays = []
+    for player_id, stream_index, phase in clients:
+        sock = create_connection(('127.0.0.1', port))
+        sock.setsockopt(IPPROTO_TCP, TCP_NODELAY, 1)
+        replays.append(ReplayClient(player_id, sock, streams[stream_index], phase))
+
+    start.wait()
+    started = time.monotonic()
+    heap = [(replay.next_at(), i) for i, replay in enumerate(replays)]
+    heapq.heapify(heap)
+
+    sent = 0
+    max_lag = 0
+
+    while len(heap) > 0:
+        at, i = heap[0]
+        if at >= duration:
+            break
+
+        delay = started + at - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+            continue
+
+        max_lag = max(max_lag, -delay)
+
+        replay = replays[i]
+        key = replay.stream[replay.index][1]
+        replay.sock.sendall(encode_keys(replay.player_id, [key], [now_us(epoch_ns)]))
+        sent += 1
+
+        replay.advance()
+        heapq.heapreplace(heap, (replay.next_at(), i))
+
+    time.sleep(max(0, started + duration + linger - time.monotonic())) # 남은 키가 처리될 때까지 연결을 유지
+
+    for replay in replays:
+        replay.sock.close()
+
+    results.put((sent, max_lag))
+
+
+class StageResult:
+    clients: int
+    duration: float = 0
+
+    sent: int = 0
+    applied: int = 0
+    dropped: int = 0
+    generator_lag: float = 0
+
+    latency: Optional[dict] = None
+    cpu_seconds: float = 0
+
+    ticks: int = 0
+    late_ticks: int = 0
+    skipped_ticks: int = 0
+    max_lateness: float = 0
+
+    def __init__(self, clients: int):
+        self.clients = clients
+
+    def slipped(self, threshold: float) -> bool:
+        return self.skipped_ticks > 0 or self.late_ticks > self.ticks * threshold
+
+
+def run_stage(args, streams: List[KeyStream], count: int, random: Random) -> StageResult:
+    result = StageResult(count)
+    epoch_ns = time.monotonic_ns()
+
+    game = BenchTetrisGame(args.port, epoch_ns)
+    for player_id in range(1, count + 1):
+        controller = BenchController(player_id)
+        controller.max_queue = args.input_queue_limit or None
+        game.add_controller(controller)
+        game.join(player_id)
+
+    game.start()
+
+    clients = [(player_id, random.randrange(len(streams)), random.random() * 10) for player_id in range(1, count + 1)]
+    workers = []
+
+    if args.processes > 0:
+        context = multiprocessing.get_context()
+        start = context.Event()
+        results = context.Queue()
+        for i in range(args.processes):
+            workers.append(context.Process(
+                target=replay_clients,
+                args=(args.port, clients[i::args.processes], streams, epoch_ns, args.duration, args.drain, start, results),
+                daemon=True,
+            ))
+    else:
+        start = threading.Event()
+        results = queue.Queue()
+        workers.append(threading.Thread(
+            target=replay_clients,
+            args=(args.port, clients, streams, epoch_ns, args.duration, args.drain, start, results),
+            daemon=True,
+        ))
+
+    try:
+        for worker in workers:
+            worker.start()
+
+        # 모든 클라이언트가 접속할 때까지 tick을 돌림 (게임 루프가 새 연결을 받음)
+        connect_deadline = time.monotonic() + 30
+        while len(game.network.clients) < count:
+            if time.monotonic() > connect_deadline:
+                raise TimeoutError(f'only {len(game.network.clients)} of {count} clients connected')
+
+            game.tick()
+
+        scheduler = game.scheduler
+        ticks, late_ticks, skipped_ticks = scheduler.ticks, scheduler.late_ticks, scheduler.skipped_ticks
+        scheduler.max_lateness = 0
+        dropped = sum(controller.dropped_keys for controller in game.controllers.values())
+        applied = game.applied_keys
+
+        started = time.monotonic()
+        started_us = now_us(epoch_ns)
+        game.window = (started_us, started_us + int(args.duration * 1e6))
+        cpu_started = time.thread_time() # 게임 루프만 측정. 같은 프로세스의 클라이언트 쓰레드는 제외
+        start.set()
+
+        while time.monotonic() - started < args.duration + args.drain:
+            game.tick()
+
+        result.cpu_seconds = time.thread_time() - cpu_started
+        result.duration = time.monotonic() - started
+        result.applied = game.applied_keys - applied
+        result.dropped = sum(controller.dropped_keys for controller in game.controllers.values()) - dropped
+        result.ticks = scheduler.ticks - ticks
+        result.late_ticks = scheduler.late_ticks - late_ticks
+        result.skipped_ticks = scheduler.skipped_ticks - skipped_ticks
+        result.max_lateness = scheduler.max_lateness
+        result.latency = game.latency.percentiles('latency')
+
+        for _ in workers:
+            sent, lag = results.get(timeout=args.drain + 10)
+            result.sent += sent
+            result.generator_lag = max(result.generator_lag, lag)
+    finally:
+        start.set()
+        for worker in workers:
+            worker.join(5)
+
+        game.close()
+
+    return result
+
+
+def print_result(result: StageResult, threshold: float):
+    latency = ' '.join(f'{key}={value * 1000:6.1f}ms' for key, value in result.latency.items()) if result.latency else 'no keys applied'
+    cpu_per_key = result.cpu_seconds / result.applied * 1e6 if result.applied > 0 else 0
+
+    print(f'{result.clients:>5} clients: {result.sent / result.duration:8,.0f} keys/s  {latency}  '
+          f'cpu {cpu_per_key:6.1f}us/key {result.cpu_seconds / max(result.ticks, 1) * 1000:5.2f}ms/tick  '
+          f'ticks={result.ticks} late={result.late_ticks} skipped={result.skipped_ticks} '
+          f'max_lateness={result.max_lateness * 1000:.1f}ms'
+          + (f'  dropped={result.dropped}' if result.dropped > 0 else '')
+          + (f'  generator_lag={result.generator_lag * 1000:.0f}ms' if result.generator_lag > 0.05 else '')
+          + ('  SLIP' if result.slipped(threshold) else ''))
+
+
+if __name__ == '__main__':
+    config.load_from_parser(parser)
+    args = parser.parse_args()
+
+    streams = load_streams(args.logs, args.speed)
+    random = Random(args.seed)
+
+    print(f'{len(streams)} play logs, {sum(map(len, streams))} keys, tick_rate={args.tick_rate}, '
+          f'immediate_input={args.immediate_input}, {args.processes or "in-process"} client workers')
+
+    slip_point = None
+    for count in args.clients:
+        result = run_stage(args, streams, count, random)
+        print_result(result, args.slip_threshold)
+
+        if result.generator_lag > 0.05:
+            print('       load generator could not keep up; use more --processes for accurate results')
+
+        if result.slipped(args.slip_threshold):
+            slip_point = result
+            break
+
+    if slip_point is None:
+        print(f'tick deadlines held up to {args.clients[-1]} clients')
+    else:
+        print(f'tick deadlines start to slip at {slip_point.clients} clients '
+              f'({slip_point.sent / slip_point.duration:,.0f} keys/s)')
@@ -13,7 +13,10 @@ parser.add_argument('--controller', default='wasd', choices=(
 ))
 parser.add_argument('--record', action='store_true', help='Record player\'s key inputs to file. (will saved into logs folder.)')
 parser.add_argument('--play-recorded', help='File to play recorded keys.')
-parser.add_argument('--ai', action='store_true', help='It\'s A.I.')
+parser.add_argument('--legacy-protocol', action='store_true', help='예전 텍스트 프로토콜로 키를 보냅니다. (바이너리 프로토콜을 모르는 호스트용)')
+parser.add_argument('--udp', action='store_true', help='키 입력을 UDP로 보냅니다. 패킷을 잃어버려도 다음 패킷으로 복구되어 무선 환경에서 지연이 적습니다. (host.py --udp 필요)')
+parser.add_argument('--display', default='none', choices=('none', 'console', 'minecraft'), help='호스트에게 받은 자신의 보드를 직접 그립니다. (host.py --board-sync 필요)')
+parser.add_argument('--ai', action='store_true', help='It\'s A.I. (호스트에게 받은 보드를 보고 조작합니다. host.py --board-sync 필요)')
 
 config.load_from_parser(parser)
 
@@ -24,9 +27,8 @@ if need_hardwares:
     Hardware.enable_hardwares()
 
 if config.get('ai'):
-    config.set('play_recorded', '1640170508')
-
-if config.get('play_recorded') is not None:
+    config.set('controller', 'ai')
+elif config.get('play_recorded') is not None:
     config.set('controller', 'record')
 
 username = get_username()
@@ -58,8 +60,29 @@ elif config.get('controller') == 'record':
 
     from mcpi_tetris.record.controller import RecordedController
     controller = RecordedController(player_id)
+elif config.get('controller') == 'ai':
+    from mcpi_tetris.ai.controller import PlacementSearchController
+    from mcpi_tetris.core.controller import TetrisKey
+    controller = PlacementSearchController(player_id)
+    controller.push(TetrisKey.JOIN)
+
+display_adapter = None
+if config.get('display') == 'console':
+    from mcpi_tetris.core.display import ConsoleDisplayAdapter
+    display_adapter = ConsoleDisplayAdapter()
+elif config.get('display') == 'minecraft':
+    from mcpi_tetris.minecraft.display import McpiDisplayAdapter
+    display_adapter = McpiDisplayAdapter(minecraft, player_id)
 
-remote = McpiRemoteControl(minecraft, controller, config.get('ip'))
+remote = McpiRemoteControl(
+    minecraft,
+    controller,
+    config.get('ip'),
+    legacy_protocol=config.get('legacy_protocol'),
+    udp=config.get('udp'),
+    display_adapter=display_adapter,
+    board_sync=config.get('ai'),
+)
 remote.run()
 
 if need_hardwares:
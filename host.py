@@ -1,7 +1,8 @@
 import argparse
+import signal
 from mcpi.minecraft import Minecraft
 from mcpi_tetris.config import config
-from mcpi_tetris.minecraft.game import McpiTetrisGame
+from mcpi_tetris.minecraft.game import AsyncMcpiTetrisGame, McpiTetrisGame
 from music import play_music
 
 
@@ -9,9 +10,28 @@ parser = argparse.ArgumentParser(description='Run tetris game as host in mcpi.')
 parser.add_argument('--lcd', action='store_true', help='LCD 장치를 활성화합니다.')
 parser.add_argument('--led', action='store_true', help='LED 장치를 활성화합니다.')
 parser.add_argument('--bgm', action='store_true', help='BGM 음악을 재생합니다.')
+parser.add_argument('--bitboard', action='store_true', help='비트마스크 기반 보드 엔진을 사용합니다.')
+parser.add_argument('--async', dest='use_async', action='store_true', help='asyncio 이벤트 루프로 게임을 실행합니다. (I/O와 tick 타이머 분리)')
+parser.add_argument('--tick-policy', default='catch_up', choices=('catch_up', 'skip'), help='tick이 늦어졌을 때 밀린 tick을 따라잡을지(catch_up), 버릴지(skip) 정합니다.')
+parser.add_argument('--rooms', type=int, help='여러 개의 방을 각각의 프로세스에서 실행합니다. 채팅으로 "/room N"을 입력하여 방을 옮길 수 있습니다.')
+parser.add_argument('--spectator', action='store_true', help='관전자들이 소켓으로 게임 보드를 볼 수 있도록 합니다. (spectate.py 참고)')
+parser.add_argument('--tick-rate', type=int, default=20, help='1초당 tick 수. 올리면 입력이 더 자주 반영되며, 게임 속도는 그대로입니다. (기본값: 20)')
+parser.add_argument('--immediate-input', action='store_true', help='키 입력을 다음 tick까지 기다리지 않고 바로 적용하여 화면에 그립니다.')
+parser.add_argument('--profile', action='store_true', help='tick 구간별 실행 시간을 측정합니다. 종료 시 또는 SIGUSR1을 받으면 통계를 출력합니다.')
+parser.add_argument('--profile-output', help='프로파일 통계를 추가로 기록할 파일')
+parser.add_argument('--udp', action='store_true', help='컨트롤러 키 입력을 UDP로도 받습니다. (같은 포트 번호, client.py --udp)')
+parser.add_argument('--board-sync', action='store_true', help='각 플레이어의 보드를 컨트롤러 연결로 보내서 클라이언트가 직접 그리거나 A.I.가 볼 수 있게 합니다. (client.py --display, --ai)')
+parser.add_argument('--remote-display', action='store_true', help='호스트는 보드를 그리지 않고 클라이언트가 직접 그립니다. (--board-sync 포함)')
+parser.add_argument('--input-queue-limit', type=int, default=32, help='플레이어마다 쌓아둘 수 있는 최대 키 수. 넘치는 키는 버립니다. 0이면 제한 없음 (기본값: 32)')
+parser.add_argument('--max-keys-per-tick', type=int, default=8, help='플레이어마다 tick당 처리할 최대 키 수. 0이면 제한 없음 (기본값: 8)')
+parser.add_argument('--no-coalesce', action='store_true', help='벽에 막힌 이동 키가 연달아 들어와도 하나씩 처리합니다.')
 
 config.load_from_parser(parser)
 
+if config.get('rooms') and (config.get('board_sync') or config.get('remote_display')):
+    # 방 프로세스는 컨트롤러 연결을 갖고 있지 않으므로 보드를 보낼 수 없음
+    parser.error('--board-sync and --remote-display cannot be used with --rooms')
+
 need_hardwares = config.get('lcd') or config.get('led') or config.get('bgm')
 
 if need_hardwares:
@@ -22,7 +42,17 @@ if config.get('bgm'):
     play_music()
 
 minecraft = Minecraft.create()
-game = McpiTetrisGame(minecraft)
+if config.get('rooms'):
+    from mcpi_tetris.minecraft.lobby import McpiLobby
+    game = McpiLobby(minecraft, config.get('rooms'))
+elif config.get('use_async'):
+    game = AsyncMcpiTetrisGame(minecraft)
+else:
+    game = McpiTetrisGame(minecraft)
+
+if config.get('profile') and hasattr(signal, 'SIGUSR1'):
+    # kill -USR1 <pid> 로 실행 중에 통계 확인
+    signal.signal(signal.SIGUSR1, lambda signum, frame: game.request_profile_dump())
 
 # run() method will take infinity loop (to break, keyboard interrupt need)
 game.run()
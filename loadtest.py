@@ -0,0 +1,122 @@
+import argparse
+from random import Random
+from socket import *
+import struct
+import time
+from typing import List
+
+from mcpi_tetris.core.controller import TetrisKey
+from mcpi_tetris.core.network import CONTROLLER_SERVER_PORT, ControllerServer, encode_keys
+
+
+parser = argparse.ArgumentParser(description='Load test the controller server with many simulated controllers on localhost.')
+parser.add_argument('--clients', type=int, default=200, help='동시에 접속할 컨트롤러 수')
+parser.add_argument('--rounds', type=int, default=50, help='컨트롤러마다 보낼 키 입력 수')
+parser.add_argument('--port', type=int, default=CONTROLLER_SERVER_PORT)
+parser.add_argument('--timeout', type=float, default=10, help='각 단계를 기다리는 최대 시간 (초)')
+parser.add_argument('--seed', type=int, default=1640170508)
+
+KEYS = [TetrisKey.LEFT, TetrisKey.RIGHT, TetrisKey.UP, TetrisKey.DOWN, TetrisKey.LAND]
+
+
+class ServerLoop:
+    """server.wait()를 반복 호출하면서 호출 횟수와 걸린 CPU 시간을 기록"""
+
+    server: ControllerServer
+    calls: int = 0
+    cpu_seconds: float = 0
+    received: int = 0
+
+    def __init__(self, server: ControllerServer):
+        self.server = server
+
+    def wait(self, timeout: float):
+        started = time.process_time()
+        self.received += len(self.server.wait(timeout))
+        self.cpu_seconds += time.process_time() - started
+        self.calls += 1
+
+    def run_until(self, condition, timeout: float) -> float:
+        """condition()이 참이 될 때까지 돌고 걸린 시간 (초)를 반환"""
+        started = time.perf_counter()
+        while not condition():
+            if time.perf_counter() - started > timeout:
+                raise TimeoutError('server did not catch up in time')
+
+            self.wait(0.05)
+
+        return time.perf_counter() - started
+
+
+def connect_clients(loop: ServerLoop, port: int, count: int) -> List[socket]:
+    """
+    클라이언트들을 연달아 접속시킴. listen backlog가 가득 차면 SYN이 버려지고 재전송(1초)을 기다리게 되므로,
+    실제 게임 루프처럼 중간중간 서버가 wait()를 호출함
+    """
+    socks = []
+    for i in range(count):
+        sock = create_connection(('127.0.0.1', port))
+        sock.setsockopt(IPPROTO_TCP, TCP_NODELAY, 1)
+        socks.append(sock)
+
+        if i % 32 == 31:
+            loop.wait(0)
+
+    return socks
+
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    random = Random(args.seed)
+
+    server = ControllerServer()
+    server.verbose = False
+    server.serve(args.port)
+    loop = ServerLoop(server)
+
+    try:
+        # 1. 모든 클라이언트가 연달아 접속
+        started = time.perf_counter()
+        socks = connect_clients(loop, args.port, args.clients)
+        loop.run_until(lambda: len(server.clients) == args.clients, args.timeout)
+        accept_elapsed = time.perf_counter() - started
+        print(f'accept:     {args.clients} clients in {accept_elapsed * 1000:.1f}ms ({loop.calls} wait calls)')
+
+        # 2. 라운드마다 모든 클라이언트가 키를 하나씩 보냄
+        loop.calls = 0
+        loop.cpu_seconds = 0
+        started = time.perf_counter()
+
+        for seq in range(args.rounds):
+            for player_id, sock in enumerate(socks):
+                sock.sendall(encode_keys(player_id, [random.choice(KEYS)], [seq]))
+
+            loop.wait(0)
+
+        sent = args.clients * args.rounds
+        loop.run_until(lambda: loop.received >= sent, args.timeout)
+        elapsed = time.perf_counter() - started
+
+        assert loop.received == sent, f'lost keys: sent={sent} received={loop.received}'
+        print(f'keys:       {sent} keys in {elapsed:.3f}s ({sent / elapsed:,.0f} keys/s)')
+        print(f'server:     {loop.calls} wait calls, cpu {loop.cpu_seconds * 1000:.1f}ms '
+              f'({loop.cpu_seconds / sent * 1e6:.1f}us/key, {loop.cpu_seconds / loop.calls * 1e6:.1f}us/call)')
+
+        # 3. 키 입력이 없을 때는 wait()가 timeout만큼 잠들어야 함
+        started = time.perf_counter()
+        cpu_started = time.process_time()
+        loop.wait(0.1)
+        print(f'idle wait:  {(time.perf_counter() - started) * 1000:.1f}ms wall, '
+              f'{(time.process_time() - cpu_started) * 1000:.2f}ms cpu with {len(server.clients)} idle clients')
+
+        # 4. 절반은 정상 종료, 나머지는 RST로 끊어도 모두 정리되어야 함
+        for i, sock in enumerate(socks):
+            if i % 2 == 1:
+                sock.setsockopt(SOL_SOCKET, SO_LINGER, struct.pack('ii', 1, 0))
+
+            sock.close()
+
+        cleanup_elapsed = loop.run_until(lambda: len(server.clients) == 0, args.timeout)
+        print(f'disconnect: {args.clients} clients removed in {cleanup_elapsed * 1000:.1f}ms')
+    finally:
+        server.close()
@@ -0,0 +1,108 @@
+import time
+from typing import Iterator, Optional
+
+from mcpi_tetris.core.controller import Controller, TetrisKey
+from mcpi_tetris.core.tetromino import Tetromino
+
+from .search import Placement, board_rows, search_placements
+
+
+class PlacementSearchController(Controller):
+    """
+    플레이어의 보드를 읽고, 현재 테트로미노를 놓을 수 있는 모든 위치를 평가하여
+    가장 좋은 위치까지 이동하는 키를 입력하는 A.I. Controller.
+    게임 tick이 늦어지지 않도록 tick마다 정해진 시간만큼만 탐색함
+    """
+
+    time_budget: float
+    """tick마다 탐색에 사용할 수 있는 시간 (초)"""
+
+    poll_interval: Optional[float] = 0.05
+
+    tetromino: Optional[Tetromino] = None
+    """탐색중이거나 탐색을 마친 테트로미노"""
+
+    search: Optional[Iterator[Placement]] = None
+    """진행중인 탐색. 탐색이 끝나면 None"""
+
+    best: Optional[Placement] = None
+    """지금까지 찾은 가장 좋은 위치"""
+
+    landed_tick: int = -1
+    """마지막으로 테트로미노를 설치한 tick"""
+
+    budget_tick: int = -1
+    """budget_used를 계산중인 tick"""
+
+    budget_used: float = 0
+    """budget_tick에 사용한 탐색 시간 (초)"""
+
+    def __init__(self, player_id: int, time_budget: float = 0.01):
+        super().__init__(player_id)
+        self.time_budget = time_budget
+
+    def get_description(self):
+        return """
+        A.I.가 테트로미노를 조작합니다.
+        """
+
+    def pop(self) -> Optional[TetrisKey]:
+        if len(self.queue) > 0:
+            return super().pop()
+
+        player = self.player
+        if player is None or not player.playing:
+            return None
+
+        # 새 테트로미노가 나오면 탐색 시작 (한 tick에 테트로미노 하나만 설치)
+        if player.tetromino is not self.tetromino:
+            if self.landed_tick == self.tick_counter:
+                return None
+
+            self.tetromino = player.tetromino
+            self.best = None
+            self.search = search_placements(
+                board_rows(player.board, player.tetromino),
+                player.width,
+                player.height,
+                player.tetromino,
+            )
+
+        if self.search is None:
+            return None # 이미 이동을 마침
+
+        if self.budget_tick != self.tick_counter:
+            self.budget_tick = self.tick_counter
+            self.budget_used = 0
+
+        started = time.perf_counter()
+        deadline = started + self.time_budget - self.budget_used
+
+        for placement in self.search:
+            if self.best is None or placement.score > self.best.score:
+                self.best = placement
+
+            if time.perf_counter() >= deadline:
+                self.budget_used += time.perf_counter() - started
+                return None # 다음 tick에 이어서 탐색
+        else:
+            self.budget_used += time.perf_counter() - started
+            self.search = None
+
+        if self.best is not None:
+            self.push_moves(self.tetromino, self.best)
+            self.landed_tick = self.tick_counter
+
+        return super().pop()
+
+    def push_moves(self, tetromino: Tetromino, placement: Placement):
+        """현재 테트로미노의 상태로부터 placement까지 이동하는 키들을 입력"""
+        rotations = (tetromino.rotation - placement.rotation) % len(tetromino.definition.rotations)
+        for _ in range(rotations):
+            self.push(TetrisKey.UP)
+
+        dx = placement.x - tetromino.position.x
+        for _ in range(abs(dx)):
+            self.push(TetrisKey.LEFT if dx < 0 else TetrisKey.RIGHT)
+
+        self.push(TetrisKey.LAND)
@@ -0,0 +1,124 @@
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+
+from mcpi_tetris.core.board import TetrisBoard
+from mcpi_tetris.core.tetromino import Tetromino, TetrominoRotation
+
+
+WEIGHT_AGGREGATE_HEIGHT = -0.510066
+WEIGHT_DESTROYED_LINES = 0.760666
+WEIGHT_HOLES = -0.35663
+WEIGHT_BUMPINESS = -0.184483
+
+
+class Placement(NamedTuple):
+    """테트로미노를 설치할 수 있는 최종 위치와 그 평가 점수"""
+
+    rotation: int
+    x: int
+    y: int
+    destroyed_lines: int
+    score: float
+
+
+def board_rows(board: TetrisBoard, tetromino: Optional[Tetromino] = None) -> List[int]:
+    """보드를 가로줄 비트마스크 목록으로 변환. tetromino가 주어지면 해당 블록들은 제외"""
+    rows = [
+        sum(1 << x for x, block in enumerate(row) if block is not None)
+        for row in board.dirty_blocks
+    ]
+
+    if tetromino is not None:
+        for x, y in tetromino.get_cells():
+            if 0 <= x < board.width and 0 <= y < board.height:
+                rows[y] &= ~(1 << x)
+
+    return rows
+
+
+def shift(mask: int, x: int) -> int:
+    return mask << x if x >= 0 else mask >> -x
+
+
+def collides(rows: List[int], width: int, height: int, rotation: TetrominoRotation, x: int, y: int) -> bool:
+    if x + rotation.min_x < 0 or x + rotation.max_x >= width:
+        return True
+
+    for dy, mask in rotation.mask:
+        row = y + dy
+        if row < 0 or row >= height or rows[row] & shift(mask, x):
+            return True
+
+    return False
+
+
+def evaluate(rows: List[int], width: int) -> Tuple[int, int, int]:
+    """(높이 합, 구멍 수, 울퉁불퉁한 정도)를 반환"""
+    heights = []
+    holes = 0
+
+    for x in range(width):
+        bit = 1 << x
+        height = 0
+        for y in reversed(range(len(rows))):
+            if rows[y] & bit:
+                height = y + 1
+                break
+
+        heights.append(height)
+        holes += sum(1 for y in range(height) if not rows[y] & bit)
+
+    bumpiness = sum(abs(heights[x] - heights[x + 1]) for x in range(width - 1))
+    return sum(heights), holes, bumpiness
+
+
+def place(rows: List[int], width: int, rotation: TetrominoRotation, x: int, y: int) -> Tuple[List[int], int]:
+    """테트로미노를 설치하고 완성된 줄을 파괴한 (새 가로줄 목록, 파괴된 줄 수)를 반환"""
+    rows = rows.copy()
+    for dy, mask in rotation.mask:
+        rows[y + dy] |= shift(mask, x)
+
+    full_row = (1 << width) - 1
+    remaining = [row for row in rows if row != full_row]
+    destroyed_lines = len(rows) - len(remaining)
+
+    return remaining + [0] * destroyed_lines, destroyed_lines
+
+
+def search_placements(rows: List[int], width: int, height: int, tetromino: Tetromino) -> Iterator[Placement]:
+    """
+    현재 위치에서 회전한 뒤 좌우로 이동하고 바로 떨어트려 도달할 수 있는 모든 위치를 평가.
+    시간 제한 안에서 나눠 실행할 수 있도록 위치 하나마다 결과를 반환함
+    """
+    definition = tetromino.definition
+    start_x = tetromino.position.x
+    start_y = tetromino.position.y
+    rotation = tetromino.rotation
+
+    for _ in range(len(definition.rotations)):
+        table = definition.get_rotation(rotation)
+        # UP 키와 같이 제자리에서 회전할 수 없으면 더 이상 회전할 수 없음
+        if collides(rows, width, height, table, start_x, start_y):
+            return
+
+        reachable = [start_x]
+        for step in (-1, 1):
+            x = start_x + step
+            while not collides(rows, width, height, table, x, start_y):
+                reachable.append(x)
+                x += step
+
+        for x in reachable:
+            y = start_y
+            while not collides(rows, width, height, table, x, y - 1):
+                y -= 1
+
+            placed, destroyed_lines = place(rows, width, table, x, y)
+            aggregate_height, holes, bumpiness = evaluate(placed, width)
+            score = WEIGHT_AGGREGATE_HEIGHT * aggregate_height \
+                + WEIGHT_DESTROYED_LINES * destroyed_lines \
+                + WEIGHT_HOLES * holes \
+                + WEIGHT_BUMPINESS * bumpiness
+
+            yield Placement(rotation, x, y, destroyed_lines, score)
+
+        rotation = (rotation - 1) % len(definition.rotations)
@@ -0,0 +1,90 @@
+import asyncio
+from socket import socket
+from typing import Awaitable, List
+
+from .game import TetrisGame
+from .player import TetrisPlayer
+
+
+class AsyncTetrisGame(TetrisGame):
+    """
+    asyncio 이벤트 루프 위에서 동작하는 TetrisGame.
+    tick 타이머와 네트워크/마인크래프트 I/O가 각각 별도의 task로 동작하므로 느린 I/O가 tick 타이머를 밀어내지 않음.
+    느린 디스플레이는 ThreadedDisplayAdapter로 감싸서 tick에서는 바뀐 칸들을 큐에 넣기만 하도록 함
+    """
+
+    def run(self):
+        try:
+            asyncio.run(self.run_async())
+        except KeyboardInterrupt:
+            # Force shutdown game (Ctrl+c)
+            self.print_message('Shutdown game ...')
+            self.print_message(f'Tick scheduler: {self.scheduler.report()}')
+            self.dump_profile()
+            self.stop()
+            self.close()
+        except Exception as e:
+            # I/O task가 죽으면 입력 없이 tick만 계속 돌게 되므로 게임을 끝냄
+            self.print_message(f'Game loop failed: {e!r}')
+            self.stop()
+            self.close()
+            raise
+
+    async def run_async(self):
+        tasks = [asyncio.create_task(self.tick_loop())]
+        tasks += [asyncio.create_task(coroutine) for coroutine in self.io_tasks()]
+
+        try:
+            await asyncio.gather(*tasks) # 어느 task든 예외로 끝나면 바로 다시 발생함
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def io_tasks(self) -> List[Awaitable]:
+        """tick과 별도로 실행될 I/O task들. 하위 클래스에서 네트워크, 마인크래프트 폴링 등을 추가"""
+        return []
+
+    async def tick_loop(self):
+        while True:
+            self.dump_requested_profile()
+            self.tick_timestamp = self.now()
+
+            with self.profiler.phase('tick'):
+                self.update()
+
+                with self.profiler.phase('posttick'):
+                    self.posttick()
+
+                self.pump_spectators()
+
+            with self.profiler.phase('sleep'):
+                await asyncio.sleep(self.scheduler.advance())
+            self.tick_counter += 1
+
+    def close_player(self, player: TetrisPlayer):
+        # 디스플레이 정리는 마인크래프트와 주고받으므로 이벤트 루프를 막지 않도록 쓰레드에서 실행
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            player.close() # 이벤트 루프가 끝난 후 (종료 중)
+            return
+
+        loop.run_in_executor(None, player.close)
+
+    async def wait_readable(self, socks: List[socket]):
+        """소켓들 중 하나에 읽을 데이터가 생기거나 새 연결이 들어올 때까지 기다림"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def onreadable():
+            if not future.done():
+                future.set_result(None)
+
+        for sock in socks:
+            loop.add_reader(sock, onreadable)
+
+        try:
+            await future
+        finally:
+            for sock in socks:
+                loop.remove_reader(sock)
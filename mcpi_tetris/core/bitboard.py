@@ -0,0 +1,67 @@
+from typing import List, Optional
+
+from .basic import Block
+from .board import TetrisBoard
+from .tetromino import Tetromino
+
+
+class BitboardTetrisBoard(TetrisBoard):
+    """
+    가로줄마다 정수 비트마스크를 함께 유지하는 TetrisBoard.
+    충돌 검사와 라인 완성 검사를 블록 단위 비교 대신 비트 연산으로 처리함
+    """
+
+    rows: List[int]
+    """각 가로줄의 점유 상태. x번째 비트가 1이면 (x, y)에 블록이 있음"""
+
+    full_row: int
+    """가로줄이 가득 찼을 때의 비트마스크"""
+
+    def __init__(self, width: int, height: int):
+        super().__init__(width, height)
+        self.rows = [0] * height
+        self.full_row = (1 << width) - 1
+
+    def set_cell(self, x: int, y: int, block: Optional[Block]):
+        super().set_cell(x, y, block)
+
+        if block is None:
+            self.rows[y] &= ~(1 << x)
+        else:
+            self.rows[y] |= 1 << x
+
+    def has_collision(self, tetromino: Tetromino) -> bool:
+        x = tetromino.position.x
+        y = tetromino.position.y
+
+        for dy, mask in tetromino.get_rotation().mask:
+            row = y + dy
+            # check out of bounds (vertical)
+            if row < 0 or row >= self.height:
+                return True
+
+            # check out of bounds (horizontal)
+            if x >= 0:
+                mask <<= x
+            elif mask & ((1 << -x) - 1):
+                return True
+            else:
+                mask >>= -x
+
+            if mask & ~self.full_row:
+                return True
+
+            # check collision with other blocks
+            if self.rows[row] & mask:
+                return True
+
+        return False
+
+    def line_completed(self, y: int) -> bool:
+        return self.rows[y] == self.full_row
+
+    def destroy_completed_lines(self) -> int:
+        if self.full_row not in self.rows:
+            return 0 # nothing to destroy
+
+        return super().destroy_completed_lines()
@@ -1,9 +1,14 @@
-from typing import List, Optional, Tuple
+from random import Random
+from typing import Dict, List, Optional, Tuple
 
-from .basic import Block, Position
+from .basic import Block, Color, Position
 from .tetromino import Tetromino
 
 
+ZOBRIST_SEED = 0x7E7215
+"""Zobrist 키를 만들 때 사용하는 고정 시드. 프로세스가 달라도 같은 보드는 같은 해시를 가짐"""
+
+
 class TetrisBoard:
     """테트리스 2차원 구조에 대한 클래스"""
 
@@ -12,11 +17,51 @@ class TetrisBoard:
     blocks: List[List[Optional[Block]]]
     dirty_blocks: List[List[Optional[Block]]]
 
+    dirty_rows: List[int]
+    """get_dirty 이후 set된 칸들. 가로줄마다 x번째 비트로 표시"""
+
+    has_dirty: bool
+    """dirty_rows에 표시된 칸이 하나라도 있는지 여부"""
+
+    column_heights: List[int]
+    """세로줄마다 가장 위에 있는 블록의 y + 1. 비어있는 세로줄은 0"""
+
+    zobrist_keys: List[List[List[int]]]
+    """칸 (y, x)에 색깔 c의 블록이 있을 때 XOR되는 64비트 키. zobrist_keys[y][x][c.value]"""
+
+    zobrist_key_cache: Dict[Tuple[int, int], List[List[List[int]]]] = {}
+    """보드 크기별로 공유되는 zobrist_keys"""
+
+    zobrist: int
+    """현재 보드 상태의 Zobrist 해시 값"""
+
     def __init__(self, width: int, height: int):
         self.width = width
         self.height = height
         self.blocks = [[None for x in range(width)] for y in range(height)]
         self.dirty_blocks = [[None for x in range(width)] for y in range(height)]
+        self.dirty_rows = [0] * height
+        self.has_dirty = False
+        self.column_heights = [0] * width
+        self.zobrist_keys = TetrisBoard.get_zobrist_keys(width, height)
+        self.zobrist = 0
+
+    @staticmethod
+    def get_zobrist_keys(width: int, height: int) -> List[List[List[int]]]:
+        if (width, height) not in TetrisBoard.zobrist_key_cache:
+            random = Random(ZOBRIST_SEED)
+            colors = max(color.value for color in Color) + 1
+            TetrisBoard.zobrist_key_cache[(width, height)] = [
+                [[random.getrandbits(64) for c in range(colors)] for x in range(width)]
+                for y in range(height)
+            ]
+
+        return TetrisBoard.zobrist_key_cache[(width, height)]
+
+    @property
+    def zobrist_hash(self) -> int:
+        """블록 위치와 색깔에 대한 64비트 Zobrist 해시. set할 때마다 O(1)로 갱신됨"""
+        return self.zobrist
 
     def get(self, position: Position) -> Optional[Block]:
         return self.dirty_blocks[position.y][position.x]
@@ -25,41 +70,100 @@ class TetrisBoard:
         if block is not None:
             block.position = position
 
-        self.dirty_blocks[position.y][position.x] = block
+        self.set_cell(position.x, position.y, block)
+
+    def set_cell(self, x: int, y: int, block: Optional[Block]):
+        """좌표 객체 없이 칸을 변경. 블록의 position은 호출하는 쪽에서 맞춰야 함"""
+        previous = self.dirty_blocks[y][x]
+        if previous is not None:
+            self.zobrist ^= self.zobrist_keys[y][x][previous.color.value]
+        if block is not None:
+            self.zobrist ^= self.zobrist_keys[y][x][block.color.value]
+
+        self.dirty_blocks[y][x] = block
+        self.dirty_rows[y] |= 1 << x
+        self.has_dirty = True
+
+        # 세로줄 높이 갱신
+        if block is not None:
+            if y >= self.column_heights[x]:
+                self.column_heights[x] = y + 1
+        elif y == self.column_heights[x] - 1:
+            while y > 0 and self.dirty_blocks[y - 1][x] is None:
+                y -= 1
+
+            self.column_heights[x] = y
 
     def set_tetromino(self, tetromino: Tetromino):
         for block in tetromino.get_blocks():
-            self.set(block.position, block)
+            self.set_cell(block.position.x, block.position.y, block)
 
     def remove_tetromino(self, tetromino: Tetromino):
-        for block in tetromino.get_blocks():
-            self.set(block.position, None)
+        for x, y in tetromino.get_cells():
+            self.set_cell(x, y, None)
 
     def get_dirty(self) -> List[Tuple[Position, Optional[Block]]]:
         collected_dirty = []
+        if not self.has_dirty:
+            return collected_dirty # nothing changed since last call
 
+        # set된 칸만 비교 (같은 블록으로 다시 set된 칸은 무시됨)
         for y in range(self.height):
-            for x in range(self.width):
-                if self.blocks[y][x] == self.dirty_blocks[y][x]:
-                    continue
+            row = self.dirty_rows[y]
+            if row == 0:
+                continue
+
+            self.dirty_rows[y] = 0
+            x = 0
+            while row:
+                if row & 1 and self.blocks[y][x] != self.dirty_blocks[y][x]:
+                    self.blocks[y][x] = self.dirty_blocks[y][x]
+                    collected_dirty.append((Position(x, y), self.blocks[y][x]))
 
-                self.blocks[y][x] = self.dirty_blocks[y][x]
-                collected_dirty.append((Position(x, y), self.blocks[y][x]))
+                row >>= 1
+                x += 1
 
+        self.has_dirty = False
         return collected_dirty
 
     def has_collision(self, tetromino: Tetromino) -> bool:
-        for block in tetromino.get_blocks():
+        for x, y in tetromino.get_cells():
             # check out of bounds
-            if block.position.x < 0 or block.position.y < 0 or block.position.x >= self.width or block.position.y >= self.height:
+            if x < 0 or y < 0 or x >= self.width or y >= self.height:
                 return True
 
             # check collision with other blocks
-            if self.get(block.position) is not None:
+            if self.dirty_blocks[y][x] is not None:
                 return True
 
         return False
     
+    def drop_distance(self, tetromino: Tetromino) -> int:
+        """
+        테트로미노가 충돌 없이 떨어질 수 있는 칸 수를 반환.
+        테트로미노는 보드에 놓여있지 않은 상태여야 함
+        """
+        x = tetromino.position.x
+        y = tetromino.position.y
+        distance = self.height
+
+        for dx, dy in tetromino.get_rotation().bottom:
+            column = x + dx
+            bottom = y + dy
+
+            if bottom >= self.column_heights[column]:
+                distance = min(distance, bottom - self.column_heights[column])
+                continue
+
+            # 블록 아래로 들어간 경우 빈칸을 직접 셈
+            fall = 0
+            while fall < distance and bottom - fall > 0 and self.dirty_blocks[bottom - fall - 1][column] is None:
+                fall += 1
+
+            distance = fall
+
+        return distance
+    
     def line_completed(self, y: int) -> bool:
         return all(map(lambda x: self.get(Position(x, y)) is not None, range(self.width)))
 
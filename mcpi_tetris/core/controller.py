@@ -1,8 +1,11 @@
 from collections import deque
 from enum import Enum
-from typing import Deque, Optional
+from typing import TYPE_CHECKING, Callable, Deque, Optional
 import keyboard
 
+if TYPE_CHECKING:
+    from .player import TetrisPlayer
+
 
 class TetrisKey(Enum):
     DOWN = 'DOWN'
@@ -16,6 +19,10 @@ class TetrisKey(Enum):
     START = 'START'
 
 
+UNDROPPABLE_KEYS = (TetrisKey.JOIN, TetrisKey.LEAVE, TetrisKey.START)
+"""큐가 가득 차도 버리지 않는 키들"""
+
+
 class Controller:
     """
     입력 장치를 나타내는 추상 클래스
@@ -25,6 +32,24 @@ class Controller:
     queue: Deque
     tick_counter: int = 0
 
+    player: Optional['TetrisPlayer'] = None
+    """이 컨트롤러로 조작중인 플레이어. 같은 프로세스에서 게임이 진행될 때만 설정됨"""
+
+    poll_interval: Optional[float] = None
+    """
+    pop()을 확인해야 하는 간격 (초). None이면 키가 push()로만 들어오므로 onpush가 불릴 때까지 기다려도 됨.
+    pop()에서 직접 입력을 확인하는 컨트롤러는 값을 정해야 함
+    """
+
+    onpush: Optional[Callable[[], None]] = None
+    """push()될 때마다 호출되는 함수. 키보드 후킹 쓰레드에서 불릴 수 있음"""
+
+    max_queue: Optional[int] = None
+    """큐에 쌓아둘 수 있는 최대 키 수. 가득 차면 새 키를 버림 (UNDROPPABLE_KEYS 제외). None이면 제한 없음"""
+
+    dropped_keys: int = 0
+    """큐가 가득 차서 버린 키 수"""
+
     def __init__(self, player_id: int):
         self.player_id = player_id
         self.queue = deque()
@@ -37,18 +62,33 @@ class Controller:
     def preinitialize(self):
         self.initialize()
 
+    def attach(self, player: 'TetrisPlayer'):
+        """플레이어가 만들어질 때 호출되는 함수"""
+        self.player = player
+
     def initialize(self):
         pass
 
     def push(self, key: TetrisKey):
+        if self.max_queue is not None and len(self.queue) >= self.max_queue and key not in UNDROPPABLE_KEYS:
+            self.dropped_keys += 1
+            return
+
         self.queue.appendleft(key)
 
+        if self.onpush is not None:
+            self.onpush()
+
     def pop(self) -> Optional[TetrisKey]:
         if len(self.queue) > 0:
             return self.queue.pop()
 
         return None
 
+    def has_pending_input(self) -> bool:
+        """pop()으로 꺼낼 입력이 남아있는지 여부"""
+        return len(self.queue) > 0
+
     def close(self):
         pass
 
@@ -145,6 +185,8 @@ class StdinController(Controller):
     표준 입력을 받는동안 쓰레드가 Blocking되기 때문에, 게임 실행과 동시에 사용하면 안됩니다.
     """
 
+    poll_interval: Optional[float] = 0
+
     def get_description(self):
         return """
         w: 테트로미노 회전
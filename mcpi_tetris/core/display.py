@@ -1,8 +1,12 @@
-from typing import TYPE_CHECKING, List, Optional
+from collections import deque
+from threading import Condition, Thread
+import time
+from typing import TYPE_CHECKING, Callable, Deque, Dict, List, Optional, Tuple, Union
 from .basic import Block, Color, Position
 
 if TYPE_CHECKING:
     from mcpi_tetris.core.player import TetrisPlayer
+    from mcpi_tetris.core.profiler import TickProfiler
 
 
 class DisplayAdapter:
@@ -61,6 +65,150 @@ class DisplayAdapter:
         pass
 
 
+class NullDisplayAdapter(DisplayAdapter):
+    """
+    아무것도 그리지 않는 디스플레이. 화면 없이 시뮬레이션만 돌릴 때 사용
+    """
+    pass
+
+
+class ThreadedDisplayAdapter(DisplayAdapter):
+    """
+    다른 디스플레이를 감싸서 전용 쓰레드에서 그리는 디스플레이.
+    게임 쓰레드는 바뀐 칸들을 큐에 넣기만 하므로 느린 디스플레이가 tick을 밀어내지 않음.
+    디스플레이가 밀리면 아직 그리지 못한 프레임에 다음 프레임을 합쳐서 (latest frame wins) 중간 프레임을 버림.
+    게임의 'flush' 구간은 큐에 넣는 시간만 재므로, 실제로 그린 시간('display')과 버린 프레임 수('display_dropped')는 쓰레드에서 따로 기록함
+    """
+
+    display: DisplayAdapter
+    """실제로 그림을 그리는 디스플레이"""
+
+    close_timeout: float
+    """close() 시 남은 작업이 끝나기를 기다리는 최대 시간 (초)"""
+
+    events: Deque[Union[Dict[Tuple[int, int], Tuple[Position, Optional[Block]]], Callable[[], None]]]
+    """쓰레드가 처리할 작업들. 프레임(좌표별 바뀐 칸) 또는 디스플레이 함수 호출이며, 들어온 순서대로 처리됨"""
+
+    pending: Dict[Tuple[int, int], Tuple[Position, Optional[Block]]]
+    """requestnextframe() 전까지 모으고 있는 바뀐 칸들"""
+
+    merged_frame: Optional[Dict[Tuple[int, int], Tuple[Position, Optional[Block]]]] = None
+    """큐의 마지막에 있어 아직 합칠 수 있는 프레임. 쓰레드가 가져가면 None"""
+
+    frames: int = 0
+    """요청된 프레임 수"""
+
+    dropped_frames: int = 0
+    """디스플레이가 밀려서 다음 프레임에 합쳐진 프레임 수"""
+
+    closed: bool = False
+
+    profiler: Optional['TickProfiler'] = None
+    """그린 시간과 버린 프레임을 기록할 프로파일러. 게임에 붙은 플레이어일 때만 사용"""
+
+    player_id: Optional[int] = None
+
+    condition: Condition
+    thread: Thread
+
+    def __init__(self, display: DisplayAdapter, close_timeout: float = 5):
+        super().__init__()
+        self.display = display
+        self.close_timeout = close_timeout
+        self.events = deque()
+        self.pending = {}
+        self.condition = Condition()
+        self.thread = Thread(target=self.work, name=f'{type(display).__name__}-worker', daemon=True)
+
+    def preinitialize(self, player: 'TetrisPlayer'):
+        self.player = player
+        self.width = player.width
+        self.height = player.height
+
+        game = getattr(player, 'game', None) # MirroredPlayer에는 게임이 없음
+        if game is not None:
+            self.profiler = game.profiler
+            self.player_id = player.controller.player_id
+
+        self.thread.start()
+        self.call(lambda: self.display.preinitialize(player))
+
+    def onblockchange(self, position: Position, block: Optional[Block]):
+        self.pending[(position.x, position.y)] = (position, block)
+
+    def requestnextframe(self):
+        if len(self.pending) == 0:
+            return
+
+        with self.condition:
+            self.frames += 1
+
+            if self.merged_frame is not None:
+                # 이전 프레임을 아직 그리지 못함. 같은 칸은 최신 블록으로 덮어씀
+                self.merged_frame.update(self.pending)
+                self.dropped_frames += 1
+
+                if self.profiler is not None:
+                    self.profiler.count('display_dropped', self.player_id)
+            else:
+                self.merged_frame = self.pending
+                self.events.append(self.pending)
+                self.condition.notify()
+
+        self.pending = {}
+
+    def onlinecompleted(self, destroyed_lines: int):
+        self.call(lambda: self.display.onlinecompleted(destroyed_lines))
+
+    def ongameover(self):
+        self.call(self.display.ongameover)
+
+    def close(self):
+        self.call(self.display.close)
+
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+
+        self.thread.join(self.close_timeout)
+
+    def call(self, function: Callable[[], None]):
+        """디스플레이 함수 호출을 프레임들과 같은 순서로 쓰레드에서 실행하도록 예약"""
+        with self.condition:
+            self.merged_frame = None # 호출 이후의 칸들이 호출 이전 프레임에 합쳐지지 않도록 함
+            self.events.append(function)
+            self.condition.notify()
+
+    def work(self):
+        while True:
+            with self.condition:
+                while len(self.events) == 0 and not self.closed:
+                    self.condition.wait()
+
+                if len(self.events) == 0:
+                    return # closed
+
+                event = self.events.popleft()
+                if event is self.merged_frame:
+                    self.merged_frame = None
+
+            try:
+                if callable(event):
+                    event()
+                else:
+                    started = time.perf_counter()
+
+                    for position, block in event.values():
+                        self.display.onblockchange(position, block)
+
+                    self.display.requestnextframe()
+
+                    if self.profiler is not None:
+                        self.profiler.record('display', time.perf_counter() - started, self.player_id)
+            except Exception as e:
+                print(f'[Display] {type(self.display).__name__} failed: {e!r}')
+
+
 class ConsoleDisplayAdapter(DisplayAdapter):
 
     pixels: List[List[Optional[Color]]]
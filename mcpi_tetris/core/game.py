@@ -1,11 +1,15 @@
-from typing import Dict
+from typing import Dict, Iterable, List, Optional, Tuple
 import time
 
-from mcpi_tetris.record.logger import FileAttachedKeyLogger
+from mcpi_tetris.record.logger import FileAttachedKeyLogger, SilentKeyLogger
 
+from .basic import Block, Position
 from .player import TetrisPlayer
 from .controller import Controller, KeyboardArrowController, TetrisKey
-from .display import ConsoleDisplayAdapter
+from .display import ConsoleDisplayAdapter, NullDisplayAdapter
+from .profiler import NullTickProfiler, TickProfiler
+from .scheduler import TickPolicy, TickScheduler
+from .spectator import SPECTATOR_SERVER_PORT, SpectatorServer
 from mcpi_tetris.config import config
 
 
@@ -26,12 +30,41 @@ class TetrisGame:
     tick_counter: int = 0
     """게임 내 시간 흐름을 나타내는 단위. 1초당 tick_rate틱"""
 
-    tick_timestamp: int = 0
+    tick_timestamp: float = 0
     """가장 최근의 tick이 실행되었던 시간"""
 
+    scheduler: TickScheduler
+    """tick 사이의 시간을 맞추는 스케줄러"""
+
+    profiler: TickProfiler
+    """tick의 구간별 실행 시간 측정. 프로파일링을 끄면 아무것도 기록하지 않음"""
+
+    immediate_input: bool = False
+    """tick 사이에 들어온 입력을 다음 tick까지 기다리지 않고 바로 적용할지 여부"""
+
+    spectator: Optional[SpectatorServer] = None
+    """보드를 관전자들에게 스트리밍하는 서버. 관전을 켜지 않으면 None"""
+
+    spectator_port: int = SPECTATOR_SERVER_PORT
+
+    profile_dump_requested: bool = False
+    """
+    시그널 핸들러가 프로파일 통계 출력을 요청함. 핸들러는 기록 중인 프로파일러의 lock을 잡고 있는
+    쓰레드에서 불릴 수 있으므로, 직접 출력하지 않고 다음 tick에서 출력함
+    """
+
     def __init__(self):
         self.controllers = {}
         self.players = {}
+        self.tick_rate = config.get('tick_rate') or self.tick_rate
+        self.scheduler = TickScheduler(self.tick_rate, TickPolicy(config.get('tick_policy') or TickPolicy.CATCH_UP.value))
+        self.profiler = TickProfiler() if config.get('profile') else NullTickProfiler()
+        self.immediate_input = bool(config.get('immediate_input', self.immediate_input))
+
+        if config.get('spectator'):
+            self.spectator = SpectatorServer(self, self.spectator_port)
+            self.spectator.serve()
+            self.print_message(f'Spectators can watch via socket (PORT={self.spectator_port})!')
 
     def add_controller(self, controller: Controller):
         self.controllers[controller.player_id] = controller
@@ -77,10 +110,21 @@ class TetrisGame:
             self.print_message(f'Player {player_id} is not in tetris.')
             return
 
-        self.players[player_id].close()
+        player = self.players[player_id]
+        if player.controller.dropped_keys > 0 or player.coalesced_keys > 0:
+            self.print_message(f'Player {player_id} input: dropped={player.controller.dropped_keys}, coalesced={player.coalesced_keys}')
+
+        self.close_player(player)
         del self.players[player_id]
+
+        if self.spectator is not None:
+            self.spectator.remove_player(player_id, self.tick_counter)
         self.print_message(f'Player {player_id} leave tetris.')
 
+    def close_player(self, player: TetrisPlayer):
+        """나간 플레이어의 디스플레이 등을 정리"""
+        player.close()
+
     def start(self):
         if self.playing:
             self.print_message('Tetris is already playing.')
@@ -115,51 +159,135 @@ class TetrisGame:
             except KeyboardInterrupt:
                 # Force shutdown game (Ctrl+c)
                 self.print_message('Shutdown game ...')
+                self.print_message(f'Tick scheduler: {self.scheduler.report()}')
+                self.dump_profile()
                 self.stop()
+                self.close()
                 break
 
+    def now(self) -> float:
+        """게임이 사용하는 현재 시각 (초). 시스템 시계가 바뀌어도 거꾸로 가지 않음"""
+        return time.monotonic()
+
     def sleep_until_next_tick(self):
-        tick_duration = 1 / self.tick_rate
+        if not self.immediate_input or not self.playing:
+            self.scheduler.wait()
+            return
+
+        # 게임 진행중에는 다음 tick까지 기다리는 동안 입력이 들어오면 바로 적용
+        self.scheduler.advance()
+        while True:
+            timeout = self.scheduler.time_until_deadline()
+            if timeout <= 0:
+                break
+
+            for player_id in self.wait_for_input(timeout):
+                self.apply_input(player_id)
+
+    def wait_for_input(self, timeout: float) -> Iterable[int]:
+        """
+        입력이 들어올 때까지 최대 timeout초 기다린 후, 입력을 받은 플레이어 ID들을 반환.
+        입력을 기다릴 수 없는 게임은 그냥 잠듦
+        """
+        self.scheduler.sleep(timeout)
+        return []
+
+    def apply_input(self, player_id: int):
+        """
+        tick을 기다리지 않고 플레이어의 입력을 처리한 뒤 바로 그림.
+        입력은 플레이어의 현재 tick_counter(다음 tick)로 기록되므로, 다음 tick에 처리한 것과 같은 결과가 됨
+        """
+        if not self.playing or not self.is_joined(player_id):
+            return
+
+        player = self.players[player_id]
+        if not player.playing:
+            return
+
+        with self.profiler.phase('input', player_id):
+            player.process_input()
+
+        player.flush_display()
 
-        previous_tick_elapsed = time.time() - self.tick_timestamp
-        sleep_duration = tick_duration - previous_tick_elapsed
+    def close(self):
+        """게임을 완전히 종료할 때 호출. stop()은 판이 끝날 때마다 호출되므로 소켓 등은 여기서 닫음"""
+        if self.spectator is not None:
+            self.spectator.close()
 
-        if sleep_duration > 0:
-            time.sleep(sleep_duration)
+    def dump_profile(self):
+        """프로파일링 중이면 구간별 통계를 출력"""
+        if self.profiler.enabled:
+            self.profiler.dump(config.get('profile_output'))
+
+    def request_profile_dump(self):
+        """다음 tick에서 프로파일 통계를 출력. 시그널 핸들러에서 불러도 안전함"""
+        self.profile_dump_requested = True
+
+    def dump_requested_profile(self):
+        if self.profile_dump_requested:
+            self.profile_dump_requested = False
+            self.dump_profile()
 
     def tick(self):
-        self.tick_timestamp = time.time()
-        self.pretick()
+        self.dump_requested_profile()
+        self.tick_timestamp = self.now()
+
+        with self.profiler.phase('tick'):
+            with self.profiler.phase('pretick'):
+                self.pretick()
+
+            self.update()
+
+            with self.profiler.phase('posttick'):
+                self.posttick()
 
+            self.pump_spectators()
+
+        with self.profiler.phase('sleep'):
+            self.sleep_until_next_tick()
+
+        self.tick_counter += 1
+
+    def update(self):
+        """I/O와 대기를 제외한 한 tick의 게임 진행"""
         # not playing (waiting)
         if not self.playing:
             # 모든 컨트롤러에 대한 입력을 확인하고,
             # 게임 참여 또는 나가기 확인
-            for controller in self.controllers.values():
-                while True:
-                    key = controller.pop()
-                    if key is None:
-                        break
-
-                    if key == TetrisKey.JOIN:
-                        self.join(controller.player_id)
-                    elif key == TetrisKey.LEAVE:
-                        self.leave(controller.player_id)
-                    elif key == TetrisKey.START:
-                        self.start()
+            with self.profiler.phase('controllers'):
+                self.drain_controllers()
 
         # playing
         if self.playing:
             for player_id in self.players:
-                self.players[player_id].tick()
+                self.tick_player(self.players[player_id])
 
             all_gameover = all(map(lambda player_id: self.players[player_id].playing == False, self.players))
             if all_gameover:
                 self.stop()
 
-        self.posttick()
-        self.sleep_until_next_tick()
-        self.tick_counter += 1
+    def drain_controllers(self):
+        """게임 대기중에 컨트롤러들의 입력을 확인하여 join, leave, start 처리"""
+        for controller in self.controllers.values():
+            while True:
+                key = controller.pop()
+                if key is None:
+                    break
+
+                if key == TetrisKey.JOIN:
+                    self.join(controller.player_id)
+                elif key == TetrisKey.LEAVE:
+                    self.leave(controller.player_id)
+                elif key == TetrisKey.START:
+                    self.start()
+
+    def tick_player(self, player: TetrisPlayer):
+        player.tick()
+
+    def pump_spectators(self):
+        if self.spectator is not None:
+            with self.profiler.phase('spectator'):
+                self.spectator.pump()
 
     def pretick(self):
         pass
@@ -174,6 +302,11 @@ class TetrisGame:
     def onlinecompleted(self, player_id: int, destroyed_lines: int):
         pass
 
+    def onboardchange(self, player_id: int, dirty: List[Tuple[Position, Optional[Block]]]):
+        """플레이어 보드의 바뀐 칸들이 디스플레이로 보내질 때 호출되는 함수"""
+        if self.spectator is not None:
+            self.spectator.publish(player_id, self.players[player_id].tick_counter, dirty)
+
 
 class ConsoleTetrisGame(TetrisGame):
 
@@ -193,3 +326,126 @@ class ConsoleTetrisGame(TetrisGame):
             controller=self.get_controller(player_id),
             display_adapter=ConsoleDisplayAdapter(),
         )
+
+
+class HeadlessTetrisGame(TetrisGame):
+    """
+    화면과 실제 시간 없이 동작하는 게임. tick 사이에 잠들지 않고 CPU가 허용하는 만큼 빠르게 진행함.
+    시간은 tick_counter로부터 계산되는 가상 시계를 사용
+    """
+
+    width: int
+    height: int
+
+    max_ticks: Optional[int]
+    """
+    최대로 진행할 tick 수. None이면 게임이 끝날 때까지 진행.
+    게임이 시작되지 않았거나 플레이어가 없는데 남은 입력도 없으면 더 진행할 수 없으므로 멈춤
+    """
+
+    verbose: bool = False
+    """게임 메시지 출력 여부"""
+
+    finished: bool = False
+    """게임이 시작된 후 끝났는지 여부"""
+
+    finished_players: Dict[int, TetrisPlayer]
+    """게임에서 나간 플레이어들. 결과를 확인하기 위해 보관"""
+
+    seed: Optional[int]
+    """플레이어들에게 적용할 시드 값. None이면 기본 시드 사용"""
+
+    elapsed: float = 0
+    """run()에 실제로 걸린 시간 (초)"""
+
+    simulated_ticks: int = 0
+    """run()에서 진행한 tick 수"""
+
+    def __init__(
+        self,
+        width: int = 10,
+        height: int = 20,
+        max_ticks: Optional[int] = None,
+        verbose: bool = False,
+        seed: Optional[int] = None,
+        tick_rate: Optional[int] = None,
+    ):
+        super().__init__()
+        self.width = width
+        self.height = height
+        self.max_ticks = max_ticks
+        self.verbose = verbose
+        self.seed = seed
+        self.finished_players = {}
+
+        if tick_rate is not None:
+            self.tick_rate = tick_rate
+            self.scheduler.tick_rate = tick_rate
+
+    def create_player(self, player_id: int) -> TetrisPlayer:
+        player = TetrisPlayer(
+            game=self,
+            width=self.width,
+            height=self.height,
+            controller=self.get_controller(player_id),
+            display_adapter=NullDisplayAdapter(),
+            seed=self.seed,
+        )
+        if not self.verbose:
+            player.setlogger(SilentKeyLogger(player))
+
+        return player
+
+    def print_message(self, message: str):
+        if self.verbose:
+            super().print_message(message)
+
+    def leave(self, player_id: int):
+        if self.is_joined(player_id):
+            self.finished_players[player_id] = self.players[player_id]
+
+        super().leave(player_id)
+
+    def poststop(self):
+        self.finished = True
+
+    def now(self) -> float:
+        return self.tick_counter / self.tick_rate
+
+    def sleep_until_next_tick(self):
+        pass
+
+    def run(self):
+        started = time.perf_counter()
+        started_tick = self.tick_counter
+
+        while not self.finished:
+            if self.max_ticks is not None and self.tick_counter >= self.max_ticks:
+                break
+
+            if self.is_idle():
+                break
+
+            self.tick()
+
+        self.elapsed = time.perf_counter() - started
+        self.simulated_ticks = self.tick_counter - started_tick
+
+    def is_idle(self) -> bool:
+        """
+        진행할 게임이 없고 (시작 전이거나 플레이어가 없음) 컨트롤러에 남은 입력도 없는지 여부.
+        headless 게임에는 실제 시간이 없으므로 이 상태에서는 tick을 진행해도 아무것도 바뀌지 않음
+        """
+        if self.playing and len(self.players) > 0:
+            return False
+
+        return not any(controller.has_pending_input() for controller in self.controllers.values())
+
+    def get_ticks_per_second(self) -> float:
+        if self.elapsed == 0:
+            return 0
+
+        return self.simulated_ticks / self.elapsed
+
+    def report(self) -> str:
+        return f'ticks={self.simulated_ticks}, elapsed={self.elapsed:.3f}s, ticks/s={self.get_ticks_per_second():,.0f}'
@@ -1,19 +1,134 @@
 from collections import deque
+import errno
+import secrets
+import selectors
 from socket import *
-from typing import Deque, Iterable, List, Optional
+import struct
+import time
+from typing import Deque, Dict, List, Optional, Sequence, Set, Tuple
 
 from .controller import TetrisKey
+from .spectator import (
+    FRAME_ACK, FRAME_SESSION, FRAME_VERSION,
+    SpectatorFrame, SpectatorSubscriber,
+    decode_frames as decode_board_frames, encode_ack, encode_session, encode_versions,
+)
 
 
 CONTROLLER_SERVER_PORT = 19966
 
+# 바이너리 프로토콜 (빅 엔디안)
+# [매직: 1바이트] [버전: 1바이트] [플래그: 1바이트] [내용 길이: 2바이트] [내용]
+#   내용: [플레이어 ID: varint] [세션 토큰: 16바이트, FLAG_SESSION일 때만] [epoch: varint, FLAG_EPOCH일 때만]
+#         ([키 코드: 1바이트] [seq: varint, FLAG_SEQ일 때만]) * 키 수
+# 한 프레임에 같은 플레이어의 키 여러 개를 묶어서 보낼 수 있음.
+# 첫 바이트가 매직이 아니면 예전 텍스트 프로토콜("49-RIGHT:")로 처리함.
+# 서버가 받을 수 없는 버전이면 받을 수 있는 버전들을 VERSION 프레임으로 알려주고 연결을 끊음.
+# 클라이언트는 가장 높은 공통 버전으로, 공통 버전이 없으면 텍스트 프로토콜로 다시 연결함
+PROTOCOL_MAGIC = 0xD7
+PROTOCOL_VERSION = 1
+
+SUPPORTED_PROTOCOL_VERSIONS = (1,)
+"""이 코드가 주고받을 수 있는 바이너리 프로토콜 버전들"""
+
+FLAG_SEQ = 0x01
+"""키마다 seq(tick 또는 순서 번호)가 붙어 있음"""
+
+FLAG_BOARD_SYNC = 0x02
+"""
+이 연결로 플레이어의 보드 상태를 받겠다는 요청. 키가 없는 프레임으로 보내도 됨.
+서버는 같은 연결로 spectator.py와 같은 형식의 프레임(keyframe, delta, piece)을 보냄
+"""
+
+FLAG_SESSION = 0x04
+"""
+연결의 첫 프레임. 토큰이 모두 0이면 새 세션을 요청하고, 아니면 끊어진 세션을 이어서 사용함.
+서버는 SESSION 프레임(토큰, 마지막으로 받은 seq)으로 응답하고, 이후 받은 키의 seq를 ACK 프레임으로 알려줌.
+클라이언트는 다시 연결하면 ACK를 받지 못한 키를 모두 다시 보내고, 서버는 이미 받은 seq를 버림
+"""
+
+FLAG_EPOCH = 0x08
+"""
+UDP datagram에 클라이언트의 epoch가 붙어 있음. 클라이언트가 시작할 때마다 새로 정하는 무작위 값이며,
+서버는 epoch가 바뀌었을 때만 seq를 처음부터 받음 (주소가 바뀌는 것만으로는 새 클라이언트로 보지 않음)
+"""
+
+SESSION_TOKEN_SIZE = 16
+
+NEW_SESSION = bytes(SESSION_TOKEN_SIZE)
+"""새 세션을 요청할 때 보내는 토큰"""
+
+FRAME_HEADER = struct.Struct('>BBBH')
+
+MAX_FRAME_BODY = 0xFFFF
+
+KEY_CODES = {
+    TetrisKey.DOWN: 1,
+    TetrisKey.UP: 2,
+    TetrisKey.LEFT: 3,
+    TetrisKey.RIGHT: 4,
+    TetrisKey.LAND: 5,
+    TetrisKey.JOIN: 6,
+    TetrisKey.LEAVE: 7,
+    TetrisKey.START: 8,
+}
+"""TetrisKey별 1바이트 키 코드. 한번 정한 코드는 바꾸지 않음"""
+
+KEYS_BY_CODE: List[Optional[TetrisKey]] = [None] * 256
+for _key, _code in KEY_CODES.items():
+    KEYS_BY_CODE[_code] = _key
+
+# UDP 입력 채널
+# datagram 하나에 바이너리 프레임 하나가 들어가며, 항상 FLAG_SEQ가 붙어 있음.
+# 새 키와 함께 직전에 보낸 키들도 다시 넣어 보내므로, datagram 하나를 잃어버려도 다음 datagram으로 복구됨
+DATAGRAM_REDUNDANCY = 4
+"""datagram마다 다시 넣어 보내는 최근 키 수 (새 키 포함)"""
+
+DATAGRAM_MAX_SIZE = 512
+
+DATAGRAM_MAX_KEYS = (DATAGRAM_MAX_SIZE - FRAME_HEADER.size - 10) // 6
+"""
+datagram 하나에 넣는 최대 키 수 (다시 넣는 키 포함). 플레이어 ID와 epoch는 varint로 5바이트까지,
+키는 키 코드 1바이트와 seq varint 5바이트까지이므로 DATAGRAM_MAX_SIZE를 넘지 않음
+"""
+
+# TCP keepalive. 와이파이가 끊기는 등 FIN 없이 사라진 연결을 이 정도 시간 안에 알아챔
+KEEPALIVE_IDLE = 10
+KEEPALIVE_INTERVAL = 2
+KEEPALIVE_COUNT = 3
+
+NOT_CONNECTED_ERRORS = (errno.ENOTCONN, errno.EINPROGRESS, errno.ECONNREFUSED)
+"""
+클라이언트 소켓이 아직 연결되지 않았을 때 send()가 낼 수 있는 에러들.
+보낼 데이터는 남겨두고, 연결 실패는 selector가 알려준 후 읽거나 쓸 때 처리함
+"""
+
+
+class ProtocolError(Exception):
+    """해석할 수 없는 데이터를 받음. 연결을 끊어야 함"""
+    pass
+
+
+class UnsupportedVersionError(ProtocolError):
+    """받을 수 없는 프로토콜 버전의 프레임을 받음. 받을 수 있는 버전들을 알려준 후 연결을 끊어야 함"""
+    pass
+
+
 class TetrisPacket:
     player_id: int
     key: TetrisKey
 
-    def __init__(self, player_id: str, key: TetrisKey):
+    seq: Optional[int]
+    """클라이언트가 붙인 tick 또는 순서 번호. 없으면 None"""
+
+    epoch: Optional[int]
+    """seq를 매긴 클라이언트의 epoch (UDP). 없으면 None"""
+
+    def __init__(self, player_id: int, key: TetrisKey, seq: Optional[int] = None, epoch: Optional[int] = None):
         self.player_id = player_id
         self.key = key
+        self.seq = seq
+        self.epoch = epoch
 
     @staticmethod
     def deserialize(raw: str) -> 'TetrisPacket':
@@ -24,76 +139,698 @@ class TetrisPacket:
         return f'{self.player_id}-{self.key.value}'
 
 
-class ControllerNetwork:
+def write_varint(out: bytearray, value: int):
+    if value < 0:
+        raise ValueError(f'varint cannot be negative: {value}')
+
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+
+    out.append(value)
+
+
+def read_varint(buffer: bytearray, offset: int, end: int) -> Tuple[int, int]:
+    """offset부터 varint를 읽어 (값, 다음 offset)을 반환"""
+    value = 0
+    shift = 0
+
+    while offset < end:
+        byte = buffer[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+
+        shift += 7
+
+    raise ProtocolError('truncated varint')
+
+
+def set_keepalive(sock: socket):
+    """TCP keepalive를 켬. 세부 옵션은 지원하는 플랫폼에서만 설정"""
+    sock.setsockopt(SOL_SOCKET, SO_KEEPALIVE, 1)
+
+    if 'TCP_KEEPIDLE' in globals(): # Linux
+        sock.setsockopt(IPPROTO_TCP, TCP_KEEPIDLE, KEEPALIVE_IDLE)
+        sock.setsockopt(IPPROTO_TCP, TCP_KEEPINTVL, KEEPALIVE_INTERVAL)
+        sock.setsockopt(IPPROTO_TCP, TCP_KEEPCNT, KEEPALIVE_COUNT)
+
+
+def encode_keys(
+    player_id: int,
+    keys: Sequence[TetrisKey],
+    seqs: Optional[Sequence[int]] = None,
+    board_sync: bool = False,
+    session: Optional[bytes] = None,
+    version: int = PROTOCOL_VERSION,
+    epoch: Optional[int] = None,
+) -> bytes:
+    """한 플레이어의 키들을 바이너리 프레임 하나로 만듦. session이 주어지면 세션 요청 프레임이 됨"""
+    body = bytearray()
+    write_varint(body, player_id)
+
+    if session is not None:
+        if len(session) != SESSION_TOKEN_SIZE:
+            raise ValueError(f'session token must be {SESSION_TOKEN_SIZE} bytes')
+
+        body += session
+
+    if epoch is not None:
+        write_varint(body, epoch)
+
+    for i, key in enumerate(keys):
+        body.append(KEY_CODES[key])
+        if seqs is not None:
+            write_varint(body, seqs[i])
+
+    if len(body) > MAX_FRAME_BODY:
+        raise ValueError('too many keys in one frame')
+
+    flags = FLAG_SEQ if seqs is not None else 0
+    if board_sync:
+        flags |= FLAG_BOARD_SYNC
+    if session is not None:
+        flags |= FLAG_SESSION
+    if epoch is not None:
+        flags |= FLAG_EPOCH
+
+    return FRAME_HEADER.pack(PROTOCOL_MAGIC, version, flags, len(body)) + body
+
+
+def decode_frames(
+    buffer: bytearray,
+    packets: List[TetrisPacket],
+    board_sync: Optional[Set[int]] = None,
+    sessions: Optional[List[Tuple[int, bytes]]] = None,
+) -> int:
+    """
+    버퍼에서 완성된 바이너리 프레임들을 해석하여 packets에 추가하고, 해석한 바이트 수를 반환.
+    문자열을 만들지 않고 버퍼에서 바로 읽음. board_sync가 주어지면 보드 동기화를 요청한 플레이어 ID를 추가하고,
+    sessions가 주어지면 세션 요청 (플레이어 ID, 토큰)을 추가함
+    """
+    offset = 0
+    length = len(buffer)
+
+    while length - offset >= FRAME_HEADER.size:
+        magic, version, flags, body_length = FRAME_HEADER.unpack_from(buffer, offset)
+        if magic != PROTOCOL_MAGIC:
+            raise ProtocolError(f'bad magic byte: {magic:#x}')
+
+        if version not in SUPPORTED_PROTOCOL_VERSIONS:
+            raise UnsupportedVersionError(f'unsupported protocol version: {version}')
+
+        start = offset + FRAME_HEADER.size
+        end = start + body_length
+        if end > length:
+            break # 아직 다 받지 못함
+
+        player_id, position = read_varint(buffer, start, end)
+        has_seq = flags & FLAG_SEQ
+
+        if flags & FLAG_BOARD_SYNC and board_sync is not None:
+            board_sync.add(player_id)
+
+        if flags & FLAG_SESSION:
+            if end - position < SESSION_TOKEN_SIZE:
+                raise ProtocolError('truncated session token')
+
+            if sessions is not None:
+                sessions.append((player_id, bytes(buffer[position:position + SESSION_TOKEN_SIZE])))
+
+            position += SESSION_TOKEN_SIZE
+
+        epoch = None
+        if flags & FLAG_EPOCH:
+            epoch, position = read_varint(buffer, position, end)
+
+        while position < end:
+            key = KEYS_BY_CODE[buffer[position]]
+            if key is None:
+                raise ProtocolError(f'unknown key code: {buffer[position]}')
+
+            position += 1
+            seq = None
+            if has_seq:
+                seq, position = read_varint(buffer, position, end)
+
+            packets.append(TetrisPacket(player_id, key, seq, epoch))
+
+        offset = end
+
+    return offset
+
+
+class DatagramChannel:
+    """
+    서버측 UDP 입력 채널. datagram마다 최근 키들이 중복해서 들어 있으므로
+    (플레이어 ID, seq)로 이미 받은 키는 버리고 새 키만 순서대로 반환함.
+    와이파이나 NAT 때문에 주소가 바뀌어도 seq는 이어지며, epoch가 바뀌면 클라이언트가 다시 시작한 것으로 보고 seq를 처음부터 받음
+    """
+
+    sock: socket
+
+    last_seqs: Dict[int, int]
+    """플레이어 ID별로 마지막으로 받은 seq"""
+
+    epochs: Dict[int, Optional[int]]
+    """플레이어 ID별로 마지막으로 받은 datagram의 epoch"""
+
+    read_buffer: bytearray
+
+    duplicates: int = 0
+    """중복이라 버린 키 수"""
+
+    invalid: int = 0
+    """해석할 수 없어서 버린 datagram 수"""
+
+    def __init__(self, port: int = CONTROLLER_SERVER_PORT):
+        self.sock = socket(AF_INET, SOCK_DGRAM)
+        self.sock.setsockopt(SOL_SOCKET, SO_REUSEADDR, 1)
+        self.sock.setblocking(False)
+        self.sock.bind(('0.0.0.0', port))
+
+        self.last_seqs = {}
+        self.epochs = {}
+        self.read_buffer = bytearray(DATAGRAM_MAX_SIZE)
+
+    def read(self) -> List[TetrisPacket]:
+        """도착한 datagram을 모두 읽어서 새 키들을 반환"""
+        packets = []
+
+        while True:
+            try:
+                received = self.sock.recv_into(self.read_buffer)
+            except (BlockingIOError, InterruptedError):
+                return packets
+            except OSError:
+                return packets # ICMP 에러 등. UDP는 연결이 없으므로 무시
+
+            frame = []
+            try:
+                decode_frames(self.read_buffer[:received], frame)
+            except ProtocolError:
+                self.invalid += 1
+                continue
+
+            for packet in frame:
+                if packet.seq is None:
+                    self.invalid += 1
+                    break
+
+                if packet.player_id not in self.epochs or self.epochs[packet.player_id] != packet.epoch:
+                    self.epochs[packet.player_id] = packet.epoch
+                    self.last_seqs.pop(packet.player_id, None)
+
+                last_seq = self.last_seqs.get(packet.player_id)
+                if last_seq is not None and packet.seq <= last_seq:
+                    self.duplicates += 1
+                    continue
+
+                self.last_seqs[packet.player_id] = packet.seq
+                packets.append(packet)
+
+    def close(self):
+        self.sock.close()
+
+
+class ControllerSession:
+    """
+    서버측 컨트롤러 세션. 연결이 끊겨도 session_timeout 동안 남아 있어서,
+    클라이언트가 같은 토큰으로 다시 연결하면 이미 받은 키를 버리고 이어서 받음.
+    컨트롤러와 플레이어는 마인크래프트 플레이어 ID로 찾으므로 연결이 바뀌어도 그대로임
+    """
+
+    token: bytes
+    player_id: int
+
+    last_seq: int = -1
+    """마지막으로 받은 seq. -1이면 아직 받지 않음"""
+
+    acked_seq: int = -1
+    """클라이언트에게 마지막으로 알려준 seq"""
+
+    connection: Optional['ControllerConnection'] = None
+    """세션을 사용중인 서버측 연결. 끊어졌으면 None"""
+
+    disconnected_at: float = 0
+    """연결이 끊어진 시각 (time.monotonic)"""
+
+    duplicates: int = 0
+    """다시 연결한 후 중복이라 버린 키 수"""
+
+    def __init__(self, token: bytes, player_id: int):
+        self.token = token
+        self.player_id = player_id
+
+
+class ControllerConnection:
+    """서버측 컨트롤러 연결 하나. 받은 데이터를 해석하고, 클라이언트에게 보낼 프레임들을 모아둠"""
+
     sock: socket
     tokens: Deque[str]
-    buffer: str
+    buffer: bytearray
+
+    address: Tuple[str, int]
+    """상대방 주소"""
+
+    legacy_protocol: Optional[bool] = None
+    """예전 텍스트 프로토콜을 사용하는지 여부. 첫 바이트를 보고 정하며, None이면 아직 모름"""
 
-    clients: List['ControllerNetwork']
+    read_buffer: bytearray
+    """recv_into에 재사용하는 버퍼"""
 
-    def __init__(self, sock: Optional[socket] = None):
-        if sock is None:
-            sock = socket(AF_INET, SOCK_STREAM)
+    read_budget: int = 1024
+    """
+    wait() 한번에 연결 하나로부터 읽는 최대 바이트 수. 나머지는 소켓 버퍼에 남아 다음 wait()에서 읽으며,
+    계속 밀리면 TCP 윈도우가 닫혀 키를 쏟아내는 클라이언트만 느려짐
+    """
 
+    max_text_buffer: int = 4096
+    """예전 텍스트 프로토콜에서 구분자(:) 없이 쌓일 수 있는 최대 바이트 수"""
+
+    received_keys: int = 0
+    """지금까지 받은 키 수"""
+
+    board_sync_players: Set[int]
+    """보드 동기화를 요청한 플레이어들"""
+
+    sender: SpectatorSubscriber
+    """보낼 프레임들 (세션, ACK, 보드). 프레임 단위로 보내서 서로 섞이지 않음"""
+
+    session: Optional[ControllerSession] = None
+    """연결이 사용중인 세션"""
+
+    session_requests: List[Tuple[int, bytes]]
+    """받았지만 아직 처리하지 않은 세션 요청들"""
+
+    def __init__(self, sock: socket, address: Tuple[str, int]):
         self.sock = sock
         self.sock.setblocking(False)
+        self.address = address
         self.tokens = deque()
-        self.buffer = ''
-        self.clients = []
-
-    def serve(self):
-        self.sock.bind(('0.0.0.0', CONTROLLER_SERVER_PORT))
-        self.sock.listen()
+        self.buffer = bytearray()
+        self.read_buffer = bytearray(4096)
+        self.board_sync_players = set()
+        self.sender = SpectatorSubscriber(sock, address)
+        self.session_requests = []
 
     def flush(self):
-        tokens = self.buffer.split(':')
-        if len(tokens) <= 1: # nothing to flush
+        """받은 데이터에서 완성된 텍스트 토큰들을 꺼냄 (예전 프로토콜)"""
+        end = self.buffer.rfind(b':')
+        if end < 0: # nothing to flush
             return
 
-        for token in tokens[:-1]:
-            self.tokens.appendleft(token)
+        self.tokens.extend(self.buffer[:end].decode('utf-8').split(':'))
+        del self.buffer[:end + 1]
+
+    def read(self) -> List[TetrisPacket]:
+        """받은 데이터를 해석. 프로토콜은 첫 바이트로 판단. 연결이 끊겼으면 EOFError"""
+        try:
+            received = self.sock.recv_into(self.read_buffer, self.read_budget)
+        except (BlockingIOError, InterruptedError):
+            return []
+
+        if received == 0:
+            raise EOFError('connection closed')
+
+        self.buffer += memoryview(self.read_buffer)[:received]
+
+        if self.legacy_protocol is None:
+            self.legacy_protocol = self.buffer[0] != PROTOCOL_MAGIC
+
+        packets = []
+        if self.legacy_protocol:
+            try:
+                self.flush()
+                packets += map(TetrisPacket.deserialize, self.tokens)
+            except (UnicodeDecodeError, ValueError, KeyError) as e:
+                raise ProtocolError(f'bad text token: {e!r}')
+            finally:
+                self.tokens.clear()
+
+            if len(self.buffer) > self.max_text_buffer:
+                raise ProtocolError('text token too long')
+        else:
+            consumed = decode_frames(self.buffer, packets, self.board_sync_players, self.session_requests)
+            del self.buffer[:consumed]
 
-        self.buffer = tokens[-1]
+        self.received_keys += len(packets)
+        return packets
+
+    def drop_output(self):
+        """쌓인 프레임들을 버림 (보드 프레임이 너무 밀림). 세션 상태는 다시 넣음"""
+        self.sender.drop(set())
+
+        session = self.session
+        if session is not None:
+            session.acked_seq = session.last_seq
+            self.sender.push(encode_session(session.player_id, session.token, session.last_seq))
+
+    def reject(self, frame: bytes):
+        """
+        마지막으로 frame을 보내고 연결을 닫을 준비를 함. 읽지 않은 데이터가 남은 채로 닫으면
+        RST가 가서 클라이언트가 frame을 읽지 못할 수 있으므로, 쓰기를 닫고 받은 데이터를 모두 버림
+        """
+        self.sender.drop(set())
+        self.sender.push(frame)
+        self.sender.send()
 
-    def _accept(self) -> Optional[socket]:
         try:
-            conn, addr = self.sock.accept()
-            conn.setblocking(False)
-            print(f'new socket connection from {addr}')
-            return conn
-        except BlockingIOError:
-            return None
-        except error:
-            return None
+            self.sock.shutdown(SHUT_WR)
+            while self.sock.recv_into(self.read_buffer) > 0:
+                pass
+        except OSError:
+            pass
+
+    def close(self):
+        self.sock.close()
+
+
+class ControllerServer:
+    """
+    컨트롤러 키 입력을 받는 서버. 연결마다 ControllerConnection을 만들고,
+    selector로 데이터가 도착한 연결만 읽음. 세션은 연결이 끊겨도 남아 있어서 다시 연결한 클라이언트가 이어서 사용함
+    """
+
+    sock: socket
+
+    clients: List[ControllerConnection]
+
+    selector: Optional[selectors.BaseSelector] = None
+    """서버 소켓과 클라이언트 소켓들을 감시하는 selector (Linux에서는 epoll). serve() 전에는 None"""
+
+    verbose: bool = True
+    """연결, 키 입력 로그 출력 여부"""
+
+    datagram: Optional[DatagramChannel] = None
+    """UDP 입력 채널. serve(udp=True)일 때만 사용"""
+
+    sessions: Dict[bytes, ControllerSession]
+    """서버가 관리하는 세션들 (토큰별)"""
+
+    session_timeout: float = 300
+    """끊어진 세션을 남겨두는 시간 (초)"""
+
+    last_session_expiry: float = 0
+
+    def __init__(self):
+        self.sock = socket(AF_INET, SOCK_STREAM)
+        self.sock.setblocking(False)
+        self.clients = []
+        self.sessions = {}
+
+    def serve(self, port: int = CONTROLLER_SERVER_PORT, udp: bool = False):
+        """port로 TCP 연결을 받음. udp가 참이면 같은 포트 번호로 UDP 키 입력도 받음"""
+        self.sock.setsockopt(SOL_SOCKET, SO_REUSEADDR, 1)
+        self.sock.bind(('0.0.0.0', port))
+        self.sock.listen(128)
+
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.sock, selectors.EVENT_READ)
+
+        if udp:
+            self.datagram = DatagramChannel(port)
+            self.selector.register(self.datagram.sock, selectors.EVENT_READ, self.datagram)
+
+    def _accept(self):
+        """대기중인 연결을 모두 받음"""
+        while True:
+            try:
+                conn, addr = self.sock.accept()
+            except (BlockingIOError, InterruptedError):
+                return
+            except error:
+                return
+
+            conn.setsockopt(IPPROTO_TCP, TCP_NODELAY, 1)
+            set_keepalive(conn) # FIN 없이 사라진 연결도 정리되도록
+
+            client = ControllerConnection(conn, addr)
+            self.clients.append(client)
+            self.selector.register(conn, selectors.EVENT_READ, client)
+
+            if self.verbose:
+                print(f'new socket connection from {addr}')
+
+    def _remove(self, client: ControllerConnection, reason: str):
+        """끊어졌거나 잘못된 데이터를 보낸 클라이언트를 정리"""
+        if self.verbose:
+            print(f'[Network] Client {client.address} removed: {reason}')
+
+        self.selector.unregister(client.sock)
+        self.clients.remove(client)
+        client.close()
+
+        session = client.session
+        if session is not None and session.connection is client:
+            session.connection = None
+            session.disconnected_at = time.monotonic()
 
     # message format:
-    # "49.right:34.land:96.join ..."
-    def recv(self) -> Iterable[TetrisPacket]:
-        # accept new clients
-        conn = self._accept()
-        if conn is not None:
-            self.clients.append(ControllerNetwork(conn))
+    # binary frames (see above) or "49-right:34-land:96-join ..." (legacy)
+    def recv(self) -> List[TetrisPacket]:
+        """기다리지 않고, 지금까지 받은 키 입력들을 반환"""
+        return self.wait(0)
+
+    def wait(self, timeout: Optional[float]) -> List[TetrisPacket]:
+        """
+        키 입력이 들어오거나 timeout초가 지날 때까지 기다린 후, 받은 키 입력들을 반환.
+        새 연결은 모두 받고, 데이터가 도착한 소켓만 읽으며, 끊어진 연결은 정리함
+        """
+        if self.selector is None:
+            return []
+
+        packets = []
+
+        try:
+            events = self.selector.select(timeout)
+        except (OSError, ValueError):
+            return packets # 소켓이 닫힘
+
+        for key, _ in events:
+            client = key.data
+            if client is None:
+                self._accept()
+                continue
 
-        tokens = []
+            if client is self.datagram:
+                packets += self.datagram.read()
+                continue
+
+            if client.sock.fileno() < 0:
+                continue # 이번 select 결과를 처리하는 중에 다른 연결로 대체됨
 
-        # receive data from client
-        for client in self.clients:
             try:
-                client.buffer += client.sock.recv(100).decode('utf-8')
-            except BlockingIOError:
-                pass
+                received = client.read()
 
-            client.flush()
-            tokens += client.tokens
-            client.tokens.clear()
+                for player_id, token in client.session_requests:
+                    self._open_session(client, player_id, token)
+            except EOFError:
+                self._remove(client, 'disconnected')
+                continue
+            except UnsupportedVersionError as e:
+                client.reject(encode_versions(SUPPORTED_PROTOCOL_VERSIONS))
+                self._remove(client, f'protocol error ({e})')
+                continue
+            except ProtocolError as e:
+                self._remove(client, f'protocol error ({e})')
+                continue
+            except OSError as e:
+                self._remove(client, f'socket error ({e})')
+                continue
 
-        packets = list(map(TetrisPacket.deserialize, tokens))
-        if len(packets) > 0:
-            print(f'[Network] Recv key from client: {", ".join(map(lambda packet: str(packet.key), packets))}')
+            client.session_requests.clear()
+            packets += self._discard_duplicates(client, received)
 
+        self.pump()
         return packets
 
-    def connect(self, address) -> bool:
+    def _open_session(self, client: ControllerConnection, player_id: int, token: bytes):
+        """
+        세션 요청을 처리. 모르는 토큰이면 (만료되었거나 서버가 다시 시작함) 새 세션을 만듦.
+        연결 하나는 세션 하나만 사용할 수 있으며, 다른 플레이어의 세션을 이어서 사용하려고 하면 ProtocolError
+        """
+        if client.session is not None:
+            raise ProtocolError('session already open on this connection')
+
+        session = self.sessions.get(token) if token != NEW_SESSION else None
+
+        if session is not None and session.player_id != player_id:
+            raise ProtocolError(f'session belongs to player {session.player_id}, not {player_id}')
+
+        if session is None:
+            session = ControllerSession(secrets.token_bytes(SESSION_TOKEN_SIZE), player_id)
+            self.sessions[session.token] = session
+        elif session.connection is not None and session.connection is not client:
+            # 클라이언트는 이미 끊긴 것으로 보고 다시 연결했지만, 서버는 아직 알아채지 못한 연결
+            self._remove(session.connection, 'replaced by resumed session')
+
+        if self.verbose:
+            print(f'[Network] Client {client.address} {"resumed" if session.last_seq >= 0 else "opened"} session of player {player_id} (last seq={session.last_seq})')
+
+        session.connection = client
+        session.acked_seq = session.last_seq
+        client.session = session
+        client.sender.push(encode_session(player_id, session.token, session.last_seq))
+
+    def _discard_duplicates(self, client: ControllerConnection, packets: List[TetrisPacket]) -> List[TetrisPacket]:
+        """세션을 사용하는 연결에서 이미 받은 seq의 키를 버림 (다시 연결한 클라이언트가 ACK를 받지 못한 키를 다시 보냄)"""
+        session = client.session
+        if session is None:
+            return packets
+
+        fresh = []
+        for packet in packets:
+            if packet.seq is not None:
+                if packet.seq <= session.last_seq:
+                    session.duplicates += 1
+                    continue
+
+                session.last_seq = packet.seq
+
+            fresh.append(packet)
+
+        return fresh
+
+    def pump(self):
+        """받은 키들의 ACK를 넣고, 연결마다 쌓인 프레임을 보낼 수 있는 만큼 보냄. 오래 끊어진 세션은 지움"""
+        if self.selector is None:
+            return
+
+        for client in list(self.clients):
+            session = client.session
+            if session is not None and session.last_seq > session.acked_seq:
+                session.acked_seq = session.last_seq
+                client.sender.push(encode_ack(session.player_id, session.last_seq))
+
+            if client.sender.buffered > 0 and not client.sender.send():
+                self._remove(client, 'send failed')
+
+        now = time.monotonic()
+        if now - self.last_session_expiry >= 1:
+            self.last_session_expiry = now
+            for token, session in list(self.sessions.items()):
+                if session.connection is None and now - session.disconnected_at > self.session_timeout:
+                    del self.sessions[token]
+
+    def close(self):
+        if self.selector is not None:
+            for client in self.clients:
+                client.close()
+
+            self.clients.clear()
+            self.sessions.clear()
+            self.selector.close()
+            self.selector = None
+
+        if self.datagram is not None:
+            self.datagram.close()
+            self.datagram = None
+
+        self.sock.close()
+
+
+class ControllerClient:
+    """
+    호스트로 키 입력을 보내는 클라이언트 연결.
+    세션을 사용하면 키마다 seq를 붙이고, ACK를 받지 못한 키는 다시 연결할 때 다시 보냄.
+    UDP를 사용하면 키 입력은 datagram으로 보내고 TCP 연결은 대체 경로로 남겨둠
+    """
+
+    sock: socket
+    buffer: bytearray
+
+    verbose: bool = False
+    """보내는 키 로그 출력 여부. 키마다 출력하므로 입력이 많으면 전송보다 출력이 느려짐"""
+
+    legacy_protocol: bool = False
+    """예전 텍스트 프로토콜로 보낼지 여부"""
+
+    protocol_version: int = PROTOCOL_VERSION
+    """보낼 때 사용하는 바이너리 프로토콜 버전. 서버가 받을 수 없다고 하면 공통 버전으로 낮춤"""
+
+    version_rejected: bool = False
+    """서버가 프로토콜 버전을 거절하여, 바꾼 버전으로 바로 다시 연결해야 함"""
+
+    read_buffer: bytearray
+    """recv_into에 재사용하는 버퍼"""
+
+    outgoing: bytearray
+    """아직 보내지 못한 데이터. 소켓 버퍼가 가득 차면 쌓였다가 flush_outgoing()에서 이어서 보냄"""
+
+    datagram_sock: Optional[socket] = None
+    """UDP 소켓. connect(udp=True)일 때만 사용하며, 보내기에 실패하면 TCP로 돌아감"""
+
+    datagram_history: Deque[Tuple[int, TetrisKey, int]]
+    """최근에 UDP로 보낸 (플레이어 ID, 키, seq)들. 다음 datagram에 다시 넣어 보냄"""
+
+    datagram_queue: Deque[Tuple[int, TetrisKey, int]]
+    """seq를 붙였지만 아직 UDP로 보내지 못한 (플레이어 ID, 키, seq)들"""
+
+    datagram_epoch: int
+    """datagram에 붙이는 epoch. 클라이언트마다 무작위로 정하며, 서버는 epoch가 바뀌면 seq를 처음부터 받음"""
+
+    next_seq: int = 0
+    """다음 키에 붙일 seq"""
+
+    datagram_repeated: bool = True
+    """마지막 datagram을 이미 한번 더 보냈는지 여부"""
+
+    board_sync_players: Set[int]
+    """보드 동기화를 요청한 플레이어들. 다시 연결할 때 다시 요청함"""
+
+    server_address: Optional[str] = None
+    """연결한 서버 주소. 다시 연결할 때 사용"""
+
+    session_player_id: Optional[int] = None
+    """세션을 시작한 플레이어 ID. None이면 세션을 사용하지 않음 (seq, ACK 없음)"""
+
+    session_token: bytes = NEW_SESSION
+    """서버가 준 세션 토큰. 받기 전에는 NEW_SESSION"""
+
+    session_confirmed: bool = False
+    """마지막으로 연결한 후 서버로부터 SESSION 프레임을 받았는지 여부"""
+
+    unacked: Deque[Tuple[int, TetrisKey, int]]
+    """TCP로 보냈지만 아직 ACK를 받지 못한 (플레이어 ID, 키, seq)들"""
+
+    max_resend_batch: int = 256
+    """다시 연결할 때 프레임 하나에 묶어 보내는 최대 키 수"""
+
+    user_timeout: int = 10000
+    """보낸 데이터가 이 시간 (ms) 안에 확인되지 않으면 연결이 끊어진 것으로 봄 (Linux만)"""
+
+    def __init__(self, legacy_protocol: bool = False):
+        self.sock = socket(AF_INET, SOCK_STREAM)
+        self.sock.setblocking(False)
+        self.legacy_protocol = legacy_protocol
+        self.buffer = bytearray()
+        self.read_buffer = bytearray(4096)
+        self.outgoing = bytearray()
+        self.board_sync_players = set()
+        self.unacked = deque()
+        self.datagram_history = deque(maxlen=DATAGRAM_REDUNDANCY)
+        self.datagram_queue = deque()
+        self.datagram_epoch = secrets.randbits(31)
+
+    def connect(self, address, udp: bool = False) -> bool:
+        """
+        서버에 TCP로 연결. udp가 참이면 키 입력은 UDP로 보내고 TCP 연결은 대체 경로로 남겨둠.
+        연결을 기다리지 않으며, 네트워크에 닿을 수 없는 경우처럼 바로 실패하면 OSError
+        """
+        if udp and not self.legacy_protocol:
+            self.datagram_sock = socket(AF_INET, SOCK_DGRAM)
+            self.datagram_sock.setblocking(False)
+            self.datagram_sock.connect((address, CONTROLLER_SERVER_PORT))
+
+        self.server_address = address
+        self.sock.setsockopt(IPPROTO_TCP, TCP_NODELAY, 1) # 키 하나하나가 바로 전송되어야 함
+        set_keepalive(self.sock)
+
+        if 'TCP_USER_TIMEOUT' in globals(): # Linux. 보낸 키가 확인되지 않으면 keepalive보다 먼저 끊김을 알아챔
+            self.sock.setsockopt(IPPROTO_TCP, TCP_USER_TIMEOUT, self.user_timeout)
+
         try:
             self.sock.connect((address, CONTROLLER_SERVER_PORT))
         except BlockingIOError:
@@ -101,12 +838,249 @@ class ControllerNetwork:
 
         return True
 
-    def send(self, player_id: int, key: TetrisKey):
-        print(f'[Network] Send key to server: {key}')
-        raw = TetrisPacket(player_id, key).serialize() + ':'
-        self.sock.send(raw.encode())
+    def start_session(self, player_id: int):
+        """
+        서버에 세션을 요청. 이후 TCP로 보내는 키에는 seq가 붙고, ACK를 받을 때까지 unacked에 남아서
+        reconnect() 때 다시 보냄. 바이너리 프로토콜에서만 가능
+        """
+        self.session_player_id = player_id
+        self.session_confirmed = False
+        self.outgoing += encode_keys(player_id, [], session=self.session_token, version=self.protocol_version)
+        self.flush_outgoing()
+
+    def reconnect(self) -> bool:
+        """
+        같은 서버에 새 TCP 연결을 만들고, 세션을 이어서 요청한 후 ACK를 받지 못한 키들을 다시 보냄.
+        보드 동기화도 다시 요청하며, 서버는 keyframe부터 다시 보냄.
+        연결이 바로 실패하면 OSError. 다시 부르면 처음부터 다시 시도함
+        """
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+        self.sock = socket(AF_INET, SOCK_STREAM)
+        self.sock.setblocking(False)
+        self.buffer.clear()
+        self.outgoing.clear() # 보내다 만 프레임. 키들은 unacked에 남아 있음
+        self.version_rejected = False
+
+        connected = self.connect(self.server_address)
+
+        if self.legacy_protocol:
+            # 공통 버전이 없어 텍스트 프로토콜로 바꿈. 서버는 거절한 연결의 키를 처리하지 않았으므로 모두 다시 보냄
+            for player_id, key, _ in self.unacked:
+                self.outgoing += (TetrisPacket(player_id, key).serialize() + ':').encode()
+
+            self.unacked.clear()
+        elif self.session_player_id is not None:
+            self.session_confirmed = False
+            self.outgoing += encode_keys(self.session_player_id, [], session=self.session_token, version=self.protocol_version)
+
+            for player_id in dict.fromkeys(player_id for player_id, _, _ in self.unacked):
+                history = [(key, seq) for history_player_id, key, seq in self.unacked if history_player_id == player_id]
+                for i in range(0, len(history), self.max_resend_batch):
+                    batch = history[i:i + self.max_resend_batch]
+                    self.outgoing += encode_keys(player_id, [key for key, _ in batch], [seq for _, seq in batch], version=self.protocol_version)
+
+        for player_id in self.board_sync_players:
+            self.outgoing += encode_keys(player_id, [], board_sync=True, version=self.protocol_version)
+
+        self.flush_outgoing()
+        return connected
+
+    def acknowledge(self, seq: int):
+        """서버가 seq까지 받았으므로 더 이상 다시 보내지 않음"""
+        while len(self.unacked) > 0 and self.unacked[0][2] <= seq:
+            self.unacked.popleft()
+
+    def send(self, player_id: int, key: TetrisKey, seq: Optional[int] = None):
+        if self.verbose:
+            print(f'[Network] Send key to server: {key}')
+
+        self.send_keys(player_id, [key], None if seq is None else [seq])
+
+    def send_datagram(self, player_id: int, keys: Sequence[TetrisKey]):
+        """새 키들에 seq를 붙이고 UDP로 보냄. 소켓 버퍼가 가득 차면 BlockingIOError이며, 보내지 못한 키는 다음에 보냄"""
+        for key in keys:
+            self.datagram_queue.append((player_id, key, self.next_seq))
+            self.next_seq += 1
+
+        self.flush_datagrams()
+
+    def flush_datagrams(self):
+        """
+        보내지 못한 키들을 datagram으로 보냄. datagram마다 같은 플레이어의 최근에 보낸 키들을 함께 넣고,
+        DATAGRAM_MAX_KEYS를 넘으면 여러 datagram으로 나눔. 보낸 키만 datagram_history로 옮김
+        """
+        while len(self.datagram_queue) > 0:
+            player_id = self.datagram_queue[0][0]
+            history = [entry for entry in self.datagram_history if entry[0] == player_id]
+
+            batch = []
+            for entry in self.datagram_queue:
+                if entry[0] != player_id or len(history) + len(batch) >= DATAGRAM_MAX_KEYS:
+                    break
+
+                batch.append(entry)
+
+            self.datagram_repeated = False
+            self.datagram_sock.send(self.encode_datagram(player_id, history + batch))
+
+            for _ in batch:
+                self.datagram_queue.popleft()
+
+            self.datagram_history.extend(batch)
+
+    def encode_datagram(self, player_id: int, entries: Sequence[Tuple[int, TetrisKey, int]]) -> bytes:
+        return encode_keys(
+            player_id,
+            [key for _, key, _ in entries],
+            [seq for _, _, seq in entries],
+            version=self.protocol_version,
+            epoch=self.datagram_epoch,
+        )
+
+    def repeat_datagram(self):
+        """
+        마지막 datagram을 한번 더 보냄. 다음 키 입력이 없으면 잃어버린 datagram을 복구할 수 없으므로,
+        입력이 멈췄을 때 호출함. 서버는 중복을 버리므로 여러 번 받아도 괜찮음.
+        소켓 버퍼가 가득 차서 보내지 못한 키가 남아 있으면 그 키들을 보냄
+        """
+        if self.datagram_sock is None:
+            return
+
+        try:
+            if len(self.datagram_queue) > 0:
+                self.flush_datagrams()
+                return
+
+            if self.datagram_repeated or len(self.datagram_history) == 0:
+                return
+
+            self.datagram_repeated = True
+            player_id = self.datagram_history[-1][0]
+            self.datagram_sock.send(self.encode_datagram(player_id, [entry for entry in self.datagram_history if entry[0] == player_id]))
+        except OSError:
+            pass
+
+    def send_keys(self, player_id: int, keys: Sequence[TetrisKey], seqs: Optional[Sequence[int]] = None):
+        """같은 플레이어의 키들을 한번에 보냄"""
+        if self.datagram_sock is not None:
+            try:
+                self.send_datagram(player_id, keys)
+                return
+            except (BlockingIOError, InterruptedError):
+                return # 소켓 버퍼가 가득 참. 보내지 못한 키는 datagram_queue에 남음
+            except OSError as e:
+                print(f'[Network] UDP send failed, falling back to TCP: {e}')
+                self.datagram_sock.close()
+                self.datagram_sock = None
+
+                # 보내지 못한 키들 (이번 키 포함)을 TCP로 보냄
+                queue = list(self.datagram_queue)
+                self.datagram_queue.clear()
+                for queue_player_id in dict.fromkeys(entry[0] for entry in queue):
+                    self.send_keys(queue_player_id, [key for entry_player_id, key, _ in queue if entry_player_id == queue_player_id])
+
+                return
+
+        if self.legacy_protocol:
+            raw = ''.join(TetrisPacket(player_id, key).serialize() + ':' for key in keys).encode()
+        elif self.session_player_id is not None and seqs is None:
+            seqs = range(self.next_seq, self.next_seq + len(keys))
+            self.next_seq += len(keys)
+            self.unacked.extend(zip([player_id] * len(keys), keys, seqs))
+            raw = encode_keys(player_id, keys, seqs, version=self.protocol_version)
+        else:
+            raw = encode_keys(player_id, keys, seqs, version=self.protocol_version)
+
+        self.outgoing += raw
+        self.flush_outgoing()
+
+    def request_board_sync(self, player_id: int):
+        """서버에게 이 연결로 player_id의 보드 상태를 보내달라고 요청. 바이너리 프로토콜에서만 가능"""
+        self.board_sync_players.add(player_id)
+        self.outgoing += encode_keys(player_id, [], board_sync=True, version=self.protocol_version)
+        self.flush_outgoing()
+
+    def read_board(self) -> List[SpectatorFrame]:
+        """
+        서버로부터 받은 프레임들을 해석하여 보드 프레임들을 반환. 연결이 끊겼으면 EOFError.
+        세션, ACK 프레임은 여기서 처리함
+        """
+        try:
+            received = self.sock.recv_into(self.read_buffer)
+        except (BlockingIOError, InterruptedError):
+            return []
+
+        if received == 0:
+            raise EOFError('connection closed')
+
+        self.buffer += memoryview(self.read_buffer)[:received]
+
+        frames = []
+        for frame in decode_board_frames(self.buffer):
+            if frame.kind == FRAME_SESSION:
+                self.session_token = frame.token
+                self.session_confirmed = True
+                self.acknowledge(frame.seq)
+            elif frame.kind == FRAME_ACK:
+                self.acknowledge(frame.seq)
+            elif frame.kind == FRAME_VERSION:
+                self.downgrade(frame.versions)
+                raise EOFError('protocol version rejected by host')
+            else:
+                frames.append(frame)
+
+        return frames
+
+    def downgrade(self, versions: Sequence[int]):
+        """
+        서버가 받을 수 있는 버전들 중 가장 높은 공통 버전을 사용. 공통 버전이 없으면 텍스트 프로토콜을 사용하며,
+        텍스트 프로토콜에는 세션, 보드 동기화, UDP가 없음. 다시 연결하면 바꾼 버전으로 보냄
+        """
+        common = set(versions) & set(SUPPORTED_PROTOCOL_VERSIONS)
+        if len(common) > 0:
+            self.protocol_version = max(common)
+            print(f'[Network] Host accepts protocol versions {tuple(versions)}, switching to version {self.protocol_version}')
+        else:
+            self.legacy_protocol = True
+            self.session_player_id = None
+            self.board_sync_players.clear()
+            print(f'[Network] Host accepts protocol versions {tuple(versions)}, switching to legacy text protocol')
+
+            if self.datagram_sock is not None:
+                self.datagram_sock.close()
+                self.datagram_sock = None
+
+        self.version_rejected = True
+
+    def flush_outgoing(self) -> bool:
+        """쌓인 데이터를 소켓이 받을 수 있는 만큼 보냄. 모두 보냈으면 True"""
+        while len(self.outgoing) > 0:
+            try:
+                sent = self.sock.send(self.outgoing)
+            except (BlockingIOError, InterruptedError):
+                return False # 소켓 버퍼가 가득 찼거나 아직 연결중
+            except OSError as e:
+                if e.errno in NOT_CONNECTED_ERRORS:
+                    return False
+
+                raise
+
+            del self.outgoing[:sent]
+
+        return True
+
+    def has_pending_output(self) -> bool:
+        return len(self.outgoing) > 0
 
     def close(self):
+        if self.datagram_sock is not None:
+            self.datagram_sock.close()
+            self.datagram_sock = None
+
         try:
             self.sock.shutdown(SHUT_RDWR)
         except Exception as e:
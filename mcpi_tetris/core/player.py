@@ -1,14 +1,16 @@
 
-from typing import List, Optional, TYPE_CHECKING
+from typing import List, Optional, Tuple, Type, TYPE_CHECKING
 from random import Random
 import time
 
+from mcpi_tetris.config import config
 from mcpi_tetris.record.logger import KeyLogger
 
-from .basic import Position
+from .basic import Block, Position
 from .controller import Controller, TetrisKey
 from .display import DisplayAdapter
 from .board import TetrisBoard
+from .bitboard import BitboardTetrisBoard
 from .tetromino import DefaultTetrominoDefinitions, Tetromino, TetrominoDefinition
 
 if TYPE_CHECKING:
@@ -39,6 +41,9 @@ class TetrisPlayer:
     tetromino: Tetromino
     """현재 조작중인 테트로미노"""
 
+    tetromino_count: int = 0
+    """지금까지 나온 테트로미노 수"""
+
     board: TetrisBoard
     """블록 2차원 자료구조. None일 경우 비어있다는 뜻"""
 
@@ -48,8 +53,17 @@ class TetrisPlayer:
     tick_counter: int = 0
     """게임 내 시간 흐름을 나타내는 단위. 1초당 tick_rate틱"""
 
-    speed_incrementer_tick_rate: int = 200
-    """스피드가 올라가는 속도. 기본값=200틱마다 스피드 1씩 증가"""
+    simulation_rate: int = 20
+    """1초당 중력, 스피드를 계산하는 횟수. tick_rate와 무관하게 고정되어 있어서 tick_rate를 올려도 게임 속도가 같음"""
+
+    simulation_steps: int = 0
+    """지금까지 진행한 중력, 스피드 계산(step) 횟수"""
+
+    simulation_accumulator: int = 0
+    """tick마다 simulation_rate씩 쌓이고, tick_rate만큼 쌓일 때마다 step을 1번 진행 (정수 고정 timestep)"""
+
+    speed_increment_seconds: float = 10
+    """스피드가 올라가는 간격 (초). 기본값=10초마다 스피드 1씩 증가"""
 
     speed: int = 1
     """테트로미노가 떨어지는 속도"""
@@ -63,6 +77,25 @@ class TetrisPlayer:
     random: Random
     """플레이어에 독립적인 랜덤 인스턴스"""
 
+    max_keys_per_tick: Optional[int] = None
+    """tick마다 처리할 최대 키 수. 나머지는 컨트롤러 큐에 남아 다음 tick에 처리됨. None이면 제한 없음"""
+
+    input_tick: int = -1
+    """input_count를 세고 있는 tick"""
+
+    input_count: int = 0
+    """input_tick에 처리한 키 수. coalesce_moves로 건너뛴 키는 세지 않음"""
+
+    coalesce_moves: bool = True
+    """
+    벽 등에 막혀 실패한 이동, 회전 키가 연달아 들어오면 다시 시도하지 않고 건너뜀.
+    상태가 바뀌지 않았으므로 같은 키는 또 실패하며, 결과는 건너뛰지 않았을 때와 같음.
+    건너뛴 키는 처리 비용이 거의 없으므로 max_keys_per_tick에 포함하지 않음
+    """
+
+    coalesced_keys: int = 0
+    """coalesce_moves로 건너뛴 키 수"""
+
     logger: KeyLogger
 
     def __init__(
@@ -73,6 +106,8 @@ class TetrisPlayer:
         display_adapter: DisplayAdapter,
         controller: Controller,
         tetromino_definitions: Optional[List[TetrominoDefinition]] = None,
+        board_class: Optional[Type[TetrisBoard]] = None,
+        seed: Optional[int] = None,
     ):
         self.game = game
         self.width = width
@@ -90,15 +125,25 @@ class TetrisPlayer:
             DefaultTetrominoDefinitions.SHAPE_Z,
             DefaultTetrominoDefinitions.SHAPE_T,
         ]
-        self.board = TetrisBoard(width, height)
+        if board_class is None:
+            board_class = BitboardTetrisBoard if config.get('bitboard') else TetrisBoard
 
-        self.seed = 1640170508
+        self.board = board_class(width, height)
+
+        self.max_keys_per_tick = config.get('max_keys_per_tick') or None
+        self.coalesce_moves = not config.get('no_coalesce')
+
+        self.seed = seed if seed is not None else 1640170508
         self.random = Random()
         self.random.seed(self.seed)
 
         self.logger = KeyLogger(self)
 
+        # 첫 tick에서 바로 step이 진행되도록 미리 채워둠
+        self.simulation_accumulator = max(0, self.game.tick_rate - self.simulation_rate)
+
         self.display_adapter.preinitialize(self)
+        self.controller.attach(self)
         self.controller.preinitialize()
 
         self.next_tetromino()
@@ -115,6 +160,7 @@ class TetrisPlayer:
             self.random.choice(self.tetromino_definitions),
             Position(self.width // 2, self.height - 1)
         )
+        self.tetromino_count += 1
 
         # Check Game Over
         if self.board.has_collision(self.tetromino):
@@ -150,11 +196,7 @@ class TetrisPlayer:
     def land(self):
         """테트로미노를 즉각 떨어트리는 함수"""
         self.board.remove_tetromino(self.tetromino)
-
-        while not self.board.has_collision(self.tetromino):
-            self.tetromino.fall()
-
-        self.tetromino.rise() # 충돌이 된 후 한번 올려주기
+        self.tetromino.position.y -= self.board.drop_distance(self.tetromino)
         self.board.set_tetromino(self.tetromino)
 
         destroyed_lines = self.board.destroy_completed_lines()
@@ -163,86 +205,165 @@ class TetrisPlayer:
         
         self.next_tetromino()
 
+    def get_ghost_position(self) -> Position:
+        """현재 테트로미노를 바로 설치했을 때 도착할 중심점 좌표"""
+        self.board.remove_tetromino(self.tetromino)
+        distance = self.board.drop_distance(self.tetromino)
+        self.board.set_tetromino(self.tetromino)
+
+        return Position(self.tetromino.position.x, self.tetromino.position.y - distance)
+
     def onlinecompleted(self, destroyed_lines: int):
         self.destroyed_lines += destroyed_lines
         self.display_adapter.onlinecompleted(destroyed_lines)
         self.game.onlinecompleted(self.controller.player_id, destroyed_lines)
 
-    def rotate(self):
-        """테트로미노를 회전함"""
+    def rotate(self) -> bool:
+        """테트로미노를 회전함. 막혀서 회전하지 못했으면 False"""
         self.board.remove_tetromino(self.tetromino)
         self.tetromino.rotate()
 
-        if self.board.has_collision(self.tetromino):
+        moved = not self.board.has_collision(self.tetromino)
+        if not moved:
             self.tetromino.rotate_reverse() # undo rotate
 
         self.board.set_tetromino(self.tetromino)
+        return moved
     
-    def left(self):
-        """테트로미노를 왼쪽 방향으로 움직임"""
+    def left(self) -> bool:
+        """테트로미노를 왼쪽 방향으로 움직임. 막혀서 움직이지 못했으면 False"""
         self.board.remove_tetromino(self.tetromino)
         self.tetromino.left()
 
-        if self.board.has_collision(self.tetromino):
+        moved = not self.board.has_collision(self.tetromino)
+        if not moved:
             self.tetromino.right()
         
         self.board.set_tetromino(self.tetromino)
+        return moved
 
-    def right(self):
-        """테트로미노를 오른쪽 방향으로 움직임"""
+    def right(self) -> bool:
+        """테트로미노를 오른쪽 방향으로 움직임. 막혀서 움직이지 못했으면 False"""
         self.board.remove_tetromino(self.tetromino)
         self.tetromino.right()
 
-        if self.board.has_collision(self.tetromino):
+        moved = not self.board.has_collision(self.tetromino)
+        if not moved:
             self.tetromino.left()
 
         self.board.set_tetromino(self.tetromino)
+        return moved
 
     def get_tetromino_fall_ticks(self) -> int:
+        """테트로미노가 한 칸 떨어지는 간격 (step 단위)"""
         return max(5, 20 - self.speed)
 
+    def get_tetromino_fall_seconds(self) -> float:
+        """테트로미노가 한 칸 떨어지는 간격 (초)"""
+        return self.get_tetromino_fall_ticks() / self.simulation_rate
+
+    def get_speed_increment_steps(self) -> int:
+        """스피드가 올라가는 간격 (step 단위)"""
+        return round(self.speed_increment_seconds * self.simulation_rate)
+
     def tick(self):
+        self.update()
+        self.flush_display()
+
+    def update(self):
+        """디스플레이 갱신을 제외한 한 tick의 진행 (입력 처리, 중력, 스피드)"""
+        profiler = self.game.profiler
+        player_id = self.controller.player_id
+
         if self.playing:
-            # 컨트롤러의 tick_counter값을 업데이트
-            self.controller.tick_counter = self.tick_counter
-
-            # 키 이벤트 확인
-            while True:
-                key = self.controller.pop()
-                if key is None:
-                    break
-
-                if key == TetrisKey.UP:
-                    self.rotate()
-                elif key == TetrisKey.DOWN:
-                    self.fall()
-                elif key == TetrisKey.LEFT:
-                    self.left()
-                elif key == TetrisKey.RIGHT:
-                    self.right()
-                elif key == TetrisKey.LAND:
-                    self.land()
-
-                else:
-                    continue # 다른 키는 무시
-
-                # 키 입력 기록
+            with profiler.phase('input', player_id):
+                self.process_input()
+
+            with profiler.phase('gravity', player_id):
+                self.apply_gravity()
+
+        self.tick_counter += 1
+
+    def process_input(self):
+        """컨트롤러에 쌓인 키 입력들을 처리"""
+        # 컨트롤러의 tick_counter값을 업데이트
+        self.controller.tick_counter = self.tick_counter
+
+        if self.input_tick != self.tick_counter:
+            self.input_tick = self.tick_counter
+            self.input_count = 0
+
+        blocked_key = None # 바로 앞에서 실패한 이동, 회전 키
+
+        # 키 이벤트 확인
+        while self.max_keys_per_tick is None or self.input_count < self.max_keys_per_tick:
+            key = self.controller.pop()
+            if key is None:
+                break
+
+            if self.coalesce_moves and key == blocked_key:
+                self.coalesced_keys += 1
                 self.logger.onkeypress(key)
+                continue
 
-            # 테트로미노가 떨어질 타이밍인지 확인
-            if self.tick_counter % self.get_tetromino_fall_ticks() == 0:
+            moved = True
+            if key == TetrisKey.UP:
+                moved = self.rotate()
+            elif key == TetrisKey.DOWN:
                 self.fall()
+            elif key == TetrisKey.LEFT:
+                moved = self.left()
+            elif key == TetrisKey.RIGHT:
+                moved = self.right()
+            elif key == TetrisKey.LAND:
+                self.land()
 
-            # 테트로미노의 스피드를 점점 증가 (최초엔 skip하기 위해 1을 더함)
-            if (self.tick_counter + 1) % self.speed_incrementer_tick_rate == 0:
-                self.speed += 1
+            else:
+                continue # 다른 키는 무시
 
-        # 디스플레이 업데이트
-        self.flush_display()
-        self.tick_counter += 1
+            blocked_key = None if moved else key
+            self.input_count += 1
+
+            # 키 입력 기록
+            self.logger.onkeypress(key)
+
+    def apply_gravity(self):
+        """이번 tick 동안 흐른 시간만큼 step을 진행"""
+        self.simulation_accumulator += self.simulation_rate
+
+        while self.simulation_accumulator >= self.game.tick_rate:
+            self.simulation_accumulator -= self.game.tick_rate
+            self.step()
+
+            if not self.playing:
+                break
+
+    def step(self):
+        """떨어질 타이밍이면 테트로미노를 떨어트리고, 스피드를 증가"""
+        # 테트로미노가 떨어질 타이밍인지 확인
+        if self.simulation_steps % self.get_tetromino_fall_ticks() == 0:
+            self.fall()
+
+        # 테트로미노의 스피드를 점점 증가 (최초엔 skip하기 위해 1을 더함)
+        if (self.simulation_steps + 1) % self.get_speed_increment_steps() == 0:
+            self.speed += 1
+
+        self.simulation_steps += 1
 
     def flush_display(self):
+        with self.game.profiler.phase('flush', self.controller.player_id):
+            self.apply_display(self.collect_display())
+
+    def collect_display(self) -> List[Tuple[Position, Optional[Block]]]:
+        """마지막으로 수집한 이후 바뀐 칸들을 수집"""
         dirty = self.board.get_dirty()
+        if len(dirty) > 0:
+            self.game.onboardchange(self.controller.player_id, dirty)
+
+        return dirty
+
+    def apply_display(self, dirty: List[Tuple[Position, Optional[Block]]]):
+        """수집한 칸들을 디스플레이에 그림"""
         if len(dirty) == 0:
             return # no updates
 
@@ -0,0 +1,175 @@
+from collections import deque
+from threading import Lock
+from typing import Deque, Dict, List, Optional, Tuple
+import time
+
+
+class ProfilerPhase:
+    """with 문으로 감싼 구간의 실행 시간을 TickProfiler에 기록"""
+
+    profiler: 'TickProfiler'
+    name: str
+    player_id: Optional[int]
+    started: float = 0
+
+    def __init__(self, profiler: 'TickProfiler', name: str, player_id: Optional[int] = None):
+        self.profiler = profiler
+        self.name = name
+        self.player_id = player_id
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.record(self.name, time.perf_counter() - self.started, self.player_id)
+        return False
+
+
+class TickProfiler:
+    """
+    tick의 구간(phase)별 실행 시간을 최근 window개씩 모아서 p50/p95/p99/max를 계산하는 프로파일러.
+    플레이어별 구간은 전체 합계와 플레이어별로 따로 기록됨.
+    디스플레이 쓰레드처럼 게임 쓰레드가 아닌 곳에서도 기록할 수 있음
+    """
+
+    window: int
+    """구간마다 보관할 최근 기록 수"""
+
+    samples: Dict[Tuple[str, Optional[int]], Deque[float]]
+    """(구간 이름, 플레이어 ID)별 최근 실행 시간들 (초). 플레이어 ID가 None이면 전체"""
+
+    counts: Dict[Tuple[str, Optional[int]], int]
+    """(구간 이름, 플레이어 ID)별 전체 기록 수"""
+
+    events: Dict[Tuple[str, Optional[int]], int]
+    """(이벤트 이름, 플레이어 ID)별 발생 횟수. 시간이 아닌 횟수만 세는 항목 (버린 프레임 등)"""
+
+    lock: Lock
+
+    enabled: bool = True
+
+    def __init__(self, window: int = 1000):
+        self.window = window
+        self.samples = {}
+        self.counts = {}
+        self.events = {}
+        self.lock = Lock()
+
+    def phase(self, name: str, player_id: Optional[int] = None) -> ProfilerPhase:
+        """with profiler.phase('pretick'): ... 형태로 구간을 측정"""
+        return ProfilerPhase(self, name, player_id)
+
+    def record(self, name: str, seconds: float, player_id: Optional[int] = None):
+        self._record((name, None), seconds)
+        if player_id is not None:
+            self._record((name, player_id), seconds)
+
+    def _record(self, key: Tuple[str, Optional[int]], seconds: float):
+        with self.lock:
+            samples = self.samples.get(key)
+            if samples is None:
+                samples = self.samples[key] = deque(maxlen=self.window)
+                self.counts[key] = 0
+
+            samples.append(seconds)
+            self.counts[key] += 1
+
+    def count(self, name: str, player_id: Optional[int] = None, amount: int = 1):
+        """시간 없이 이벤트 횟수만 기록"""
+        with self.lock:
+            for key in [(name, None)] + ([] if player_id is None else [(name, player_id)]):
+                self.events[key] = self.events.get(key, 0) + amount
+
+    def reset(self):
+        with self.lock:
+            self.samples.clear()
+            self.counts.clear()
+            self.events.clear()
+
+    def percentiles(self, name: str, player_id: Optional[int] = None) -> Optional[Dict[str, float]]:
+        """최근 기록의 p50, p95, p99, max (초). 기록이 없으면 None"""
+        with self.lock:
+            samples = self.samples.get((name, player_id))
+            if not samples:
+                return None
+
+            values = sorted(samples)
+        last = len(values) - 1
+
+        return {
+            'p50': values[round(last * 0.50)],
+            'p95': values[round(last * 0.95)],
+            'p99': values[round(last * 0.99)],
+            'max': values[last],
+        }
+
+    def report(self) -> List[str]:
+        """구간별 통계를 한 줄씩 반환. 플레이어별 통계는 해당 구간 아래에 표시"""
+        lines = []
+
+        def order(key: Tuple[str, Optional[int]]):
+            return key[0], -1 if key[1] is None else key[1]
+
+        with self.lock:
+            keys = sorted(self.samples, key=order)
+            events = sorted(self.events.items(), key=lambda item: order(item[0]))
+
+        for name, player_id in keys:
+            stats = self.percentiles(name, player_id)
+            label = name if player_id is None else f'  player {player_id}'
+
+            lines.append(
+                f'{label:<16} n={self.counts[(name, player_id)]:<8} ' +
+                ' '.join(f'{key}={value * 1000:.2f}ms' for key, value in stats.items())
+            )
+
+        for (name, player_id), count in events:
+            label = name if player_id is None else f'  player {player_id}'
+            lines.append(f'{label:<16} count={count}')
+
+        return lines
+
+    def dump(self, path: Optional[str] = None):
+        """통계를 출력하고, path가 주어지면 파일에도 기록"""
+        lines = self.report()
+        if len(lines) == 0:
+            lines = ['no samples']
+
+        for line in lines:
+            print(f'[Profiler] {line}')
+
+        if path is not None:
+            with open(path, 'a') as f:
+                f.write(f'# {time.strftime("%Y-%m-%d %H:%M:%S")}\n')
+                f.write('\n'.join(lines) + '\n')
+
+
+class NullProfilerPhase(ProfilerPhase):
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class NullTickProfiler(TickProfiler):
+    """아무것도 기록하지 않는 프로파일러. 프로파일링을 끈 경우에 사용"""
+
+    enabled: bool = False
+
+    null_phase: ProfilerPhase
+
+    def __init__(self):
+        super().__init__(window=0)
+        self.null_phase = NullProfilerPhase(self, '')
+
+    def phase(self, name: str, player_id: Optional[int] = None) -> ProfilerPhase:
+        return self.null_phase
+
+    def record(self, name: str, seconds: float, player_id: Optional[int] = None):
+        pass
+
+    def count(self, name: str, player_id: Optional[int] = None, amount: int = 1):
+        pass
@@ -0,0 +1,129 @@
+from enum import Enum
+from typing import Optional
+import time
+
+
+class TickPolicy(Enum):
+    """게임이 정해진 시간보다 늦어졌을 때의 처리 방법"""
+
+    CATCH_UP = 'catch_up'
+    """밀린 tick들을 쉬지 않고 연달아 실행하여 따라잡음. 게임 속도가 유지됨"""
+
+    SKIP = 'skip'
+    """늦은 tick을 바로 실행하고, 밀린 tick들은 버린 후 그 시점부터 다시 일정하게 실행"""
+
+
+class TickScheduler:
+    """
+    time.monotonic()과 고정된 deadline을 사용하는 tick 스케줄러.
+    tick마다 다음 deadline을 정해진 간격만큼 미루므로, 잠드는 시간의 오차가 쌓이지 않음
+    """
+
+    tick_rate: int
+    """1초당 tick을 실행할 횟수"""
+
+    policy: TickPolicy
+
+    max_catch_up: int
+    """CATCH_UP에서 한번에 따라잡을 최대 tick 수. 이보다 더 밀리면 나머지는 버림"""
+
+    deadline: Optional[float] = None
+    """다음 tick이 시작되어야 하는 시각. 첫 tick 전에는 None"""
+
+    started_at: Optional[float] = None
+    """첫 tick이 시작된 시각"""
+
+    ticks: int = 0
+    """wait()을 거쳐 실행된 tick 수"""
+
+    late_ticks: int = 0
+    """deadline보다 늦게 시작된 tick 수"""
+
+    skipped_ticks: int = 0
+    """실행하지 않고 버린 tick 수"""
+
+    max_lateness: float = 0
+    """가장 많이 늦었던 시간 (초)"""
+
+    def __init__(self, tick_rate: int, policy: TickPolicy = TickPolicy.CATCH_UP, max_catch_up: int = 5):
+        self.tick_rate = tick_rate
+        self.policy = policy
+        self.max_catch_up = max_catch_up
+
+    @property
+    def period(self) -> float:
+        return 1 / self.tick_rate
+
+    def clock(self) -> float:
+        return time.monotonic()
+
+    def sleep(self, seconds: float):
+        time.sleep(seconds)
+
+    def time_until_next_tick(self) -> float:
+        """다음 tick까지 남은 시간. 이미 늦었으면 0 이하"""
+        if self.deadline is None:
+            return 0
+
+        return self.deadline + self.period - self.clock()
+
+    def time_until_deadline(self) -> float:
+        """advance() 이후, 정해진 다음 tick의 deadline까지 남은 시간. 이미 지났으면 0 이하"""
+        if self.deadline is None:
+            return 0
+
+        return self.deadline - self.clock()
+
+    def wait(self):
+        """다음 tick의 deadline까지 잠듦. 늦었다면 정책에 따라 바로 반환"""
+        delay = self.advance()
+        if delay > 0:
+            self.sleep(delay)
+
+    def advance(self) -> float:
+        """
+        다음 tick의 deadline을 정하고 지연 통계를 갱신한 뒤, 다음 tick까지 기다려야 하는 시간을 반환.
+        직접 잠들 수 없는 경우(asyncio 등)에 사용
+        """
+        now = self.clock()
+
+        if self.deadline is None:
+            # 첫 tick은 지금 막 시작된 것으로 봄
+            self.started_at = now
+            self.deadline = now
+
+        self.deadline += self.period
+        self.ticks += 1
+
+        lateness = now - self.deadline
+        if lateness <= 0:
+            return -lateness
+
+        self.late_ticks += 1
+        self.max_lateness = max(self.max_lateness, lateness)
+
+        missed = int(lateness / self.period)
+        if self.policy == TickPolicy.SKIP:
+            self.skipped_ticks += missed
+            self.deadline = now
+        elif missed > self.max_catch_up:
+            self.skipped_ticks += missed - self.max_catch_up
+            self.deadline += (missed - self.max_catch_up) * self.period
+
+        return 0
+
+    def get_effective_tick_rate(self) -> float:
+        """첫 tick부터 지금까지 실제로 실행된 1초당 tick 수"""
+        if self.started_at is None:
+            return 0
+
+        elapsed = self.clock() - self.started_at
+        if elapsed <= 0:
+            return 0
+
+        return self.ticks / elapsed
+
+    def report(self) -> str:
+        return f'ticks={self.ticks}, late={self.late_ticks}, skipped={self.skipped_ticks}, ' \
+            f'max_lateness={self.max_lateness * 1000:.1f}ms, ' \
+            f'effective_rate={self.get_effective_tick_rate():.2f}/{self.tick_rate}'
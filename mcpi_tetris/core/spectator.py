@@ -0,0 +1,395 @@
+from collections import deque
+from socket import *
+import struct
+from typing import TYPE_CHECKING, Deque, Dict, Iterable, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+from .basic import Block, Position
+from .board import TetrisBoard
+
+if TYPE_CHECKING:
+    from .game import TetrisGame
+
+
+SPECTATOR_SERVER_PORT = 19967
+
+# 프레임 형식 (빅 엔디안)
+# [길이: 2바이트] [종류: 1바이트] [플레이어 ID: 4바이트] [tick: 4바이트] [내용]
+#   KEYFRAME: [width: 1] [height: 1] [칸마다 색깔: width * height (아래 줄부터, 빈 칸은 0)]
+#   DELTA:    [칸 수: 2] [x: 1, y: 1, 색깔: 1] * 칸 수
+#   REMOVED:  내용 없음
+#   PIECE:    [테트로미노 번호: 4] [색깔: 1] [회전: 1] [x: 1] [y: 1] [진행중: 1]  (보드 동기화에서만 사용)
+#   SESSION:  [세션 토큰: 16] [마지막으로 받은 seq: 4, 없으면 -1]  (컨트롤러 연결에서만 사용)
+#   ACK:      [마지막으로 받은 seq: 4]  (컨트롤러 연결에서만 사용)
+#   VERSION:  [버전 수: 1] [버전: 1] * 버전 수  (컨트롤러 연결에서만 사용. 서버가 받을 수 있는 바이너리 프로토콜 버전들)
+FRAME_KEYFRAME = ord('K')
+"""보드 전체"""
+
+FRAME_DELTA = ord('D')
+"""지난 프레임 이후 바뀐 칸들"""
+
+FRAME_REMOVED = ord('R')
+"""플레이어가 게임에서 나감"""
+
+FRAME_PIECE = ord('P')
+"""조작중인 테트로미노의 상태가 바뀜"""
+
+FRAME_SESSION = ord('S')
+"""컨트롤러 연결의 세션이 만들어지거나 이어짐"""
+
+FRAME_ACK = ord('A')
+"""서버가 여기까지의 키를 받았음"""
+
+FRAME_VERSION = ord('V')
+"""서버가 받을 수 없는 프로토콜 버전이라 연결을 끊음. 받을 수 있는 버전들을 알려줌"""
+
+FRAME_LENGTH = struct.Struct('>H')
+FRAME_HEADER = struct.Struct('>BiI')
+KEYFRAME_SIZE = struct.Struct('>BB')
+DELTA_COUNT = struct.Struct('>H')
+PIECE_STATE = struct.Struct('>IBBbbB')
+SESSION_STATE = struct.Struct('>16si')
+ACK_STATE = struct.Struct('>i')
+
+
+class PieceState(NamedTuple):
+    serial: int
+    """플레이어에게 지금까지 나온 테트로미노 수. 바뀌면 새 테트로미노"""
+
+    color: int
+    rotation: int
+    x: int
+    y: int
+
+    playing: bool
+    """게임 진행 중인지 여부 (게임 오버면 False)"""
+
+
+class SpectatorFrame(NamedTuple):
+    kind: int
+    player_id: int
+    tick: int
+
+    width: int
+    height: int
+    """KEYFRAME일 때만 의미 있음"""
+
+    cells: List[Tuple[int, int, int]]
+    """(x, y, 색깔 값). 빈 칸은 0. KEYFRAME이면 모든 칸"""
+
+    piece: Optional[PieceState] = None
+    """PIECE일 때만 의미 있음"""
+
+    token: Optional[bytes] = None
+    """SESSION일 때만 의미 있음"""
+
+    seq: int = -1
+    """SESSION, ACK일 때만 의미 있음. 서버가 마지막으로 받은 seq"""
+
+    versions: Tuple[int, ...] = ()
+    """VERSION일 때만 의미 있음. 서버가 받을 수 있는 프로토콜 버전들"""
+
+
+def color_value(block: Optional[Block]) -> int:
+    return 0 if block is None else block.color.value
+
+
+def encode_frame(kind: int, player_id: int, tick: int, body: bytes = b'') -> bytes:
+    frame = FRAME_HEADER.pack(kind, player_id, tick) + body
+    return FRAME_LENGTH.pack(len(frame)) + frame
+
+
+def encode_keyframe(player_id: int, tick: int, board: TetrisBoard) -> bytes:
+    """디스플레이에 마지막으로 반영된 보드 상태(board.blocks) 전체"""
+    body = bytearray(KEYFRAME_SIZE.pack(board.width, board.height))
+    for row in board.blocks:
+        body += bytes(color_value(block) for block in row)
+
+    return encode_frame(FRAME_KEYFRAME, player_id, tick, bytes(body))
+
+
+def encode_delta(player_id: int, tick: int, dirty: List[Tuple[Position, Optional[Block]]]) -> bytes:
+    """TetrisBoard.get_dirty()의 결과"""
+    body = bytearray(DELTA_COUNT.pack(len(dirty)))
+    for position, block in dirty:
+        body += bytes((position.x, position.y, color_value(block)))
+
+    return encode_frame(FRAME_DELTA, player_id, tick, bytes(body))
+
+
+def encode_removed(player_id: int, tick: int) -> bytes:
+    return encode_frame(FRAME_REMOVED, player_id, tick)
+
+
+def encode_piece(player_id: int, tick: int, piece: PieceState) -> bytes:
+    return encode_frame(FRAME_PIECE, player_id, tick, PIECE_STATE.pack(*piece))
+
+
+def encode_session(player_id: int, token: bytes, seq: int) -> bytes:
+    return encode_frame(FRAME_SESSION, player_id, 0, SESSION_STATE.pack(token, seq))
+
+
+def encode_ack(player_id: int, seq: int) -> bytes:
+    return encode_frame(FRAME_ACK, player_id, 0, ACK_STATE.pack(seq))
+
+
+def encode_versions(versions: Sequence[int]) -> bytes:
+    return encode_frame(FRAME_VERSION, 0, 0, bytes([len(versions), *versions]))
+
+
+def decode_frames(buffer: bytearray) -> List[SpectatorFrame]:
+    """버퍼에서 완성된 프레임들을 꺼내서 해석. 해석한 만큼 버퍼에서 지워짐"""
+    frames = []
+    offset = 0
+
+    while len(buffer) - offset >= FRAME_LENGTH.size:
+        length, = FRAME_LENGTH.unpack_from(buffer, offset)
+        start = offset + FRAME_LENGTH.size
+        end = start + length
+        if end > len(buffer):
+            break # 아직 다 받지 못함
+
+        kind, player_id, tick = FRAME_HEADER.unpack_from(buffer, start)
+        body = start + FRAME_HEADER.size
+        width = height = 0
+        cells = []
+        piece = None
+        token = None
+        seq = -1
+        versions = ()
+
+        if kind == FRAME_KEYFRAME:
+            width, height = KEYFRAME_SIZE.unpack_from(buffer, body)
+            colors = buffer[body + KEYFRAME_SIZE.size:end]
+            cells = [(i % width, i // width, colors[i]) for i in range(width * height)]
+        elif kind == FRAME_DELTA:
+            count, = DELTA_COUNT.unpack_from(buffer, body)
+            data = buffer[body + DELTA_COUNT.size:end]
+            cells = [(data[i], data[i + 1], data[i + 2]) for i in range(0, count * 3, 3)]
+        elif kind == FRAME_PIECE:
+            serial, color, rotation, x, y, playing = PIECE_STATE.unpack_from(buffer, body)
+            piece = PieceState(serial, color, rotation, x, y, bool(playing))
+        elif kind == FRAME_SESSION:
+            token, seq = SESSION_STATE.unpack_from(buffer, body)
+        elif kind == FRAME_ACK:
+            seq, = ACK_STATE.unpack_from(buffer, body)
+        elif kind == FRAME_VERSION:
+            count = buffer[body]
+            versions = tuple(buffer[body + 1:body + 1 + count])
+
+        frames.append(SpectatorFrame(kind, player_id, tick, width, height, cells, piece, token, seq, versions))
+        offset = end
+
+    del buffer[:offset]
+    return frames
+
+
+class SpectatorSubscriber:
+    """읽기 전용 관전자 연결 하나와 아직 보내지 못한 프레임들"""
+
+    sock: socket
+    address: Tuple[str, int]
+
+    frames: Deque[bytes]
+    """보낼 프레임들"""
+
+    offset: int = 0
+    """맨 앞 프레임에서 이미 보낸 바이트 수"""
+
+    buffered: int = 0
+    """아직 보내지 못한 바이트 수"""
+
+    stale_players: Set[int]
+    """다음 전송 때 delta 대신 keyframe을 받아야 하는 플레이어들"""
+
+    dropped: int = 0
+    """밀려서 버린 프레임 수"""
+
+    def __init__(self, sock: socket, address: Tuple[str, int]):
+        self.sock = sock
+        self.address = address
+        self.frames = deque()
+        self.stale_players = set()
+
+    def push(self, frame: bytes):
+        self.frames.append(frame)
+        self.buffered += len(frame)
+
+    def drop(self, player_ids: Set[int]):
+        """보내지 못한 프레임들을 버리고 모든 플레이어를 keyframe부터 다시 받도록 함. 보내는 중인 프레임은 유지"""
+        head = self.frames[0] if self.offset > 0 else None
+
+        self.dropped += len(self.frames) - (0 if head is None else 1)
+        self.frames.clear()
+        self.buffered = 0
+
+        if head is not None:
+            self.frames.append(head)
+            self.buffered = len(head) - self.offset
+
+        self.stale_players = set(player_ids)
+
+    def send(self) -> bool:
+        """소켓이 받을 수 있는 만큼 보냄. 연결이 끊겼으면 False"""
+        while len(self.frames) > 0:
+            frame = self.frames[0]
+            try:
+                sent = self.sock.send(memoryview(frame)[self.offset:])
+            except (BlockingIOError, InterruptedError):
+                return True
+            except OSError:
+                return False
+
+            self.buffered -= sent
+            self.offset += sent
+            if self.offset < len(frame):
+                return True # 소켓 버퍼가 가득 참
+
+            self.frames.popleft()
+            self.offset = 0
+
+        return True
+
+    def close(self):
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+
+class KeyframePolicy:
+    """
+    keyframe과 버퍼링 정책. SpectatorServer와 BoardSyncServer가 함께 사용함.
+    연결의 버퍼가 max_buffer를 넘으면 쌓인 프레임을 버리고 keyframe부터 다시 보내며, keyframe_interval마다 keyframe을 다시 보냄.
+    연결(subscriber)은 buffered, push(frame), drop(player_ids), stale_players를 가져야 함
+    """
+
+    max_buffer: int = 64 * 1024
+    """연결마다 쌓아둘 수 있는 최대 바이트 수"""
+
+    keyframe_interval: int = 200
+    """모든 연결에 keyframe을 다시 보내는 간격 (tick)"""
+
+    last_keyframe_tick: int = 0
+
+    def enqueue(self, subscriber, frame: bytes, player_ids: Iterable[int]):
+        """프레임을 연결의 버퍼에 넣음. 버퍼가 넘치면 대신 쌓인 프레임을 버리고 player_ids를 keyframe부터 다시 보내도록 함"""
+        if subscriber.buffered + len(frame) > self.max_buffer:
+            subscriber.drop(set(player_ids))
+            return
+
+        subscriber.push(frame)
+
+    def keyframe_due(self, tick: int) -> bool:
+        """keyframe_interval이 지났으면 True. 이번 tick을 마지막 keyframe 시각으로 기록"""
+        if tick - self.last_keyframe_tick < self.keyframe_interval:
+            return False
+
+        self.last_keyframe_tick = tick
+        return True
+
+
+class SpectatorServer:
+    """
+    게임 보드를 읽기 전용 관전자들에게 스트리밍하는 서버.
+    tick마다 바뀐 칸들(delta)을 보내고, 처음 접속했을 때와 keyframe_interval마다 보드 전체(keyframe)를 보냄.
+    소켓은 모두 non-blocking이며, 관전자가 밀려서 버퍼가 max_buffer를 넘으면 쌓인 프레임을 버리고 keyframe부터 다시 보냄
+    """
+
+    game: 'TetrisGame'
+    sock: socket
+    port: int
+
+    subscribers: List[SpectatorSubscriber]
+
+    policy: KeyframePolicy
+    """관전자마다 쌓아둘 최대 바이트 수와 keyframe 간격"""
+
+    def __init__(self, game: 'TetrisGame', port: int = SPECTATOR_SERVER_PORT):
+        self.game = game
+        self.port = port
+        self.subscribers = []
+        self.policy = KeyframePolicy()
+
+        self.sock = socket(AF_INET, SOCK_STREAM)
+        self.sock.setsockopt(SOL_SOCKET, SO_REUSEADDR, 1)
+        self.sock.setblocking(False)
+
+    def serve(self):
+        self.sock.bind(('0.0.0.0', self.port))
+        self.sock.listen()
+
+    def publish(self, player_id: int, tick: int, dirty: List[Tuple[Position, Optional[Block]]]):
+        """한 플레이어의 바뀐 칸들을 모든 관전자의 버퍼에 넣음. 실제 전송은 pump()에서 함"""
+        if len(self.subscribers) == 0 or len(dirty) == 0:
+            return
+
+        frame = None
+        for subscriber in self.subscribers:
+            if player_id in subscriber.stale_players:
+                continue # 어차피 keyframe을 받음
+
+            if frame is None:
+                frame = encode_delta(player_id, tick, dirty)
+
+            self.policy.enqueue(subscriber, frame, self.game.players)
+
+    def remove_player(self, player_id: int, tick: int):
+        frame = encode_removed(player_id, tick)
+        for subscriber in self.subscribers:
+            subscriber.stale_players.discard(player_id)
+            subscriber.push(frame) # 버리면 관전자 화면에 나간 플레이어가 남으므로 항상 보냄
+
+    def pump(self):
+        """새 관전자를 받고, 필요한 keyframe을 넣은 후, 모든 관전자에게 보낼 수 있는 만큼 보냄"""
+        self.accept()
+
+        if self.policy.keyframe_due(self.game.tick_counter):
+            for subscriber in self.subscribers:
+                subscriber.stale_players.update(self.game.players)
+
+        keyframes: Dict[int, bytes] = {}
+        closed = []
+
+        for subscriber in self.subscribers:
+            for player_id in list(subscriber.stale_players):
+                player = self.game.players.get(player_id)
+                subscriber.stale_players.discard(player_id)
+                if player is None:
+                    continue
+
+                if player_id not in keyframes:
+                    keyframes[player_id] = encode_keyframe(player_id, player.tick_counter, player.board)
+
+                subscriber.push(keyframes[player_id])
+
+            if not subscriber.send():
+                closed.append(subscriber)
+
+        for subscriber in closed:
+            print(f'[Spectator] Spectator {subscriber.address} disconnected')
+            subscriber.close()
+            self.subscribers.remove(subscriber)
+
+    def accept(self):
+        while True:
+            try:
+                conn, address = self.sock.accept()
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                return
+
+            conn.setblocking(False)
+            conn.setsockopt(IPPROTO_TCP, TCP_NODELAY, 1)
+
+            subscriber = SpectatorSubscriber(conn, address)
+            subscriber.stale_players.update(self.game.players)
+            self.subscribers.append(subscriber)
+            print(f'[Spectator] New spectator from {address}')
+
+    def close(self):
+        for subscriber in self.subscribers:
+            subscriber.close()
+
+        self.subscribers.clear()
+        self.sock.close()
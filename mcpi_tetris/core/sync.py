@@ -0,0 +1,267 @@
+from typing import TYPE_CHECKING, Dict, List, Optional, Set, Tuple
+
+from .basic import Block, Color, Position
+from .board import TetrisBoard
+from .controller import Controller
+from .display import DisplayAdapter
+from .network import ControllerConnection, ControllerServer
+from .player import TetrisPlayer
+from .spectator import (
+    FRAME_DELTA, FRAME_KEYFRAME, FRAME_PIECE, FRAME_REMOVED,
+    KeyframePolicy, PieceState, SpectatorFrame,
+    encode_delta, encode_keyframe, encode_piece, encode_removed,
+)
+from .tetromino import DefaultTetrominoDefinitions, Tetromino, TetrominoDefinition
+
+if TYPE_CHECKING:
+    from .game import TetrisGame
+
+
+def piece_state(player: TetrisPlayer) -> PieceState:
+    tetromino = player.tetromino
+    return PieceState(
+        player.tetromino_count,
+        tetromino.definition.color.value,
+        tetromino.rotation,
+        tetromino.position.x,
+        tetromino.position.y,
+        player.playing and player.game.playing, # 게임 시작 전에는 입력이 무시되므로 진행중이 아님
+    )
+
+
+class BoardSubscriber:
+    """
+    보드 동기화를 요청한 컨트롤러 연결 하나. 프레임은 세션, ACK 프레임과 섞이지 않도록
+    연결의 sender에 넣고, 실제 전송은 ControllerServer.pump()에서 함
+    """
+
+    connection: ControllerConnection
+
+    player_ids: Set[int]
+    """이 연결로 보드를 받는 플레이어들 (connection.board_sync_players와 같은 객체)"""
+
+    players: Dict[int, TetrisPlayer]
+    """마지막으로 keyframe을 보낸 플레이어 객체. 다시 join하면 객체가 바뀌므로 keyframe부터 다시 보냄"""
+
+    pieces: Dict[int, PieceState]
+    """플레이어별로 마지막으로 보낸 테트로미노 상태"""
+
+    stale_players: Set[int]
+    """다음 전송 때 delta 대신 keyframe을 받아야 하는 플레이어들"""
+
+    def __init__(self, connection: ControllerConnection):
+        self.connection = connection
+        self.player_ids = connection.board_sync_players
+        self.players = {}
+        self.pieces = {}
+        self.stale_players = set()
+
+    @property
+    def buffered(self) -> int:
+        return self.connection.sender.buffered
+
+    def push(self, frame: bytes):
+        self.connection.sender.push(frame)
+
+    def drop(self, player_ids: Set[int]):
+        """밀려서 보내지 못한 프레임들을 버리고 player_ids를 keyframe부터 다시 보냄"""
+        self.connection.drop_output()
+        self.stale_players = player_ids
+        self.pieces.clear()
+
+    def is_closed(self) -> bool:
+        return self.connection.sock.fileno() < 0
+
+
+class BoardSyncServer:
+    """
+    각 플레이어의 보드를 그 플레이어가 키를 보내는 컨트롤러 연결로 스트리밍함.
+    형식과 버퍼링 정책(KeyframePolicy)은 SpectatorServer와 같고, 조작중인 테트로미노의 상태(piece)를 추가로 보냄.
+    클라이언트가 직접 보드를 그리므로 호스트는 렌더링을 하지 않아도 됨
+    """
+
+    game: 'TetrisGame'
+    network: ControllerServer
+
+    subscribers: Dict[ControllerConnection, BoardSubscriber]
+
+    policy: KeyframePolicy
+    """연결마다 쌓아둘 최대 바이트 수와 keyframe 간격"""
+
+    def __init__(self, game: 'TetrisGame', network: ControllerServer):
+        self.game = game
+        self.network = network
+        self.subscribers = {}
+        self.policy = KeyframePolicy()
+
+    def get_subscribers(self, player_id: int) -> List[BoardSubscriber]:
+        return [subscriber for subscriber in self.subscribers.values() if player_id in subscriber.player_ids]
+
+    def publish(self, player_id: int, tick: int, dirty: List[Tuple[Position, Optional[Block]]]):
+        """한 플레이어의 바뀐 칸들과 테트로미노 상태를 해당 연결의 버퍼에 넣음. 실제 전송은 pump()에서 함"""
+        player = self.game.players[player_id]
+
+        for subscriber in self.get_subscribers(player_id):
+            if player_id in subscriber.stale_players or subscriber.players.get(player_id) is not player:
+                continue # 어차피 keyframe을 받음
+
+            self.policy.enqueue(subscriber, encode_delta(player_id, tick, dirty), subscriber.player_ids)
+            self.publish_piece(subscriber, player_id, player)
+
+    def publish_piece(self, subscriber: BoardSubscriber, player_id: int, player: TetrisPlayer):
+        piece = piece_state(player)
+        if subscriber.pieces.get(player_id) != piece:
+            subscriber.pieces[player_id] = piece
+            self.policy.enqueue(subscriber, encode_piece(player_id, player.tick_counter, piece), subscriber.player_ids)
+
+    def remove_player(self, player_id: int, tick: int):
+        frame = encode_removed(player_id, tick)
+        for subscriber in self.get_subscribers(player_id):
+            subscriber.players.pop(player_id, None)
+            subscriber.pieces.pop(player_id, None)
+            subscriber.stale_players.discard(player_id)
+            subscriber.push(frame)
+
+    def pump(self):
+        """새 요청을 받고, 필요한 keyframe과 테트로미노 상태를 넣음. 전송은 network.pump()에서 함"""
+        for connection in self.network.clients:
+            if len(connection.board_sync_players) > 0 and connection not in self.subscribers:
+                self.subscribers[connection] = BoardSubscriber(connection)
+
+        if self.policy.keyframe_due(self.game.tick_counter):
+            for subscriber in self.subscribers.values():
+                subscriber.stale_players.update(subscriber.player_ids)
+
+        closed = []
+
+        for subscriber in self.subscribers.values():
+            if subscriber.is_closed():
+                closed.append(subscriber)
+                continue
+
+            for player_id in subscriber.player_ids:
+                player = self.game.players.get(player_id)
+                if player is None:
+                    continue
+
+                if player_id in subscriber.stale_players or subscriber.players.get(player_id) is not player:
+                    subscriber.stale_players.discard(player_id)
+                    subscriber.players[player_id] = player
+                    subscriber.pieces.pop(player_id, None)
+                    subscriber.push(encode_keyframe(player_id, player.tick_counter, player.board))
+
+                self.publish_piece(subscriber, player_id, player) # 게임 오버 등 칸이 바뀌지 않는 변화
+
+        for subscriber in closed:
+            del self.subscribers[subscriber.connection] # 소켓은 ControllerServer가 정리함
+
+    def close(self):
+        self.subscribers.clear()
+
+
+class MirroredPlayer:
+    """
+    호스트가 보내준 보드 프레임으로 재구성한 플레이어 상태.
+    DisplayAdapter와 Controller(A.I.)가 TetrisPlayer 대신 사용할 수 있도록 필요한 속성만 가짐
+    """
+
+    player_id: int
+    width: int = 0
+    height: int = 0
+
+    display_adapter: DisplayAdapter
+    controller: Controller
+
+    board: Optional[TetrisBoard] = None
+    """마지막으로 받은 보드. keyframe을 받기 전에는 None"""
+
+    tetromino: Optional[Tetromino] = None
+    """조작중인 테트로미노. 새 테트로미노가 나올 때만 객체가 바뀜"""
+
+    tetromino_serial: int = -1
+
+    playing: bool = False
+    tick_counter: int = 0
+
+    definitions: Dict[int, TetrominoDefinition]
+    """색깔 값별 테트로미노 정의. 기본 테트로미노들은 색깔이 모두 다름"""
+
+    def __init__(self, player_id: int, display_adapter: DisplayAdapter, controller: Controller):
+        self.player_id = player_id
+        self.display_adapter = display_adapter
+        self.controller = controller
+        self.definitions = {
+            definition.color.value: definition
+            for definition in [
+                DefaultTetrominoDefinitions.SHAPE_I,
+                DefaultTetrominoDefinitions.SHAPE_J,
+                DefaultTetrominoDefinitions.SHAPE_L,
+                DefaultTetrominoDefinitions.SHAPE_O,
+                DefaultTetrominoDefinitions.SHAPE_S,
+                DefaultTetrominoDefinitions.SHAPE_Z,
+                DefaultTetrominoDefinitions.SHAPE_T,
+            ]
+        }
+
+        self.controller.attach(self)
+
+    def apply(self, frames: List[SpectatorFrame]):
+        """받은 프레임들을 보드에 반영하고, 바뀐 칸들을 디스플레이에 그림"""
+        for frame in frames:
+            if frame.player_id != self.player_id:
+                continue
+
+            self.tick_counter = frame.tick
+            self.controller.tick_counter = frame.tick
+
+            if frame.kind == FRAME_KEYFRAME:
+                if self.board is None or (self.width, self.height) != (frame.width, frame.height):
+                    self.width = frame.width
+                    self.height = frame.height
+                    self.board = TetrisBoard(self.width, self.height)
+                    self.display_adapter.preinitialize(self)
+
+                self.set_cells(frame.cells)
+            elif frame.kind == FRAME_DELTA and self.board is not None:
+                self.set_cells(frame.cells)
+            elif frame.kind == FRAME_PIECE:
+                self.set_piece(frame.piece)
+            elif frame.kind == FRAME_REMOVED:
+                self.playing = False
+                self.tetromino = None
+
+        self.flush_display()
+
+    def set_cells(self, cells: List[Tuple[int, int, int]]):
+        for x, y, color in cells:
+            self.board.set_cell(x, y, None if color == 0 else Block(Position(x, y), Color(color)))
+
+    def set_piece(self, piece: PieceState):
+        was_playing = self.playing
+        self.playing = piece.playing
+
+        if self.tetromino is None or piece.serial != self.tetromino_serial:
+            self.tetromino = Tetromino(self.definitions[piece.color], Position(piece.x, piece.y))
+            self.tetromino_serial = piece.serial
+
+        self.tetromino.position = Position(piece.x, piece.y)
+        self.tetromino.rotation = piece.rotation
+
+        if was_playing and not self.playing:
+            self.display_adapter.ongameover()
+
+    def flush_display(self):
+        if self.board is None:
+            return
+
+        dirty = self.board.get_dirty()
+        if len(dirty) == 0:
+            return
+
+        for position, block in dirty:
+            self.display_adapter.onblockchange(position, block)
+
+        self.display_adapter.requestnextframe()
+
+    def close(self):
+        self.display_adapter.close()
@@ -1,18 +1,78 @@
 from copy import deepcopy
-from typing import List, Tuple
+from typing import List, NamedTuple, Optional, Tuple
 
 from .basic import Block, Color, Position
 
 
 TetrominoState = Tuple[Block, Block, Block, Block]
 
+TetrominoMask = Tuple[Tuple[int, int], ...]
+"""회전 상태별 (y 오프셋, 가로줄 비트마스크) 목록. x 오프셋 0이 최하위 비트"""
+
+
+class TetrominoRotation(NamedTuple):
+    """한 회전 상태에 대해 미리 계산해둔 불변 테이블. 모든 좌표는 테트로미노 중심점 기준 오프셋"""
+
+    cells: Tuple[Tuple[int, int], ...]
+    """블록들의 (x, y) 오프셋"""
+
+    min_x: int
+    max_x: int
+    min_y: int
+    max_y: int
+
+    bottom: Tuple[Tuple[int, int], ...]
+    """세로줄마다 가장 아래에 있는 블록의 (x, y) 오프셋"""
+
+    left: Tuple[Tuple[int, int], ...]
+    """가로줄마다 가장 왼쪽에 있는 블록의 (x, y) 오프셋"""
+
+    right: Tuple[Tuple[int, int], ...]
+    """가로줄마다 가장 오른쪽에 있는 블록의 (x, y) 오프셋"""
+
+    mask: TetrominoMask
+
+    @staticmethod
+    def build(state: TetrominoState) -> 'TetrominoRotation':
+        cells = tuple((block.position.x, block.position.y) for block in state)
+        xs = [x for x, _ in cells]
+        ys = [y for _, y in cells]
+
+        bottom = {}
+        left = {}
+        right = {}
+        rows = {}
+        for x, y in cells:
+            bottom[x] = min(bottom.get(x, y), y)
+            left[y] = min(left.get(y, x), x)
+            right[y] = max(right.get(y, x), x)
+            rows[y] = rows.get(y, 0) | (1 << x)
+
+        return TetrominoRotation(
+            cells=cells,
+            min_x=min(xs),
+            max_x=max(xs),
+            min_y=min(ys),
+            max_y=max(ys),
+            bottom=tuple(sorted(bottom.items())),
+            left=tuple((x, y) for y, x in sorted(left.items())),
+            right=tuple((x, y) for y, x in sorted(right.items())),
+            mask=tuple(sorted(rows.items())),
+        )
+
 
 class TetrominoDefinition:
     """테트로미노 모양 정의. (작대기, 사각형 등)"""
     
+    color: Color
+    """테트로미노의 색깔"""
+
     states: List[TetrominoState]
     """테트로미노를 구성하는 블록들. 중심 좌표로부터 상대적인 좌표로 블록 구성"""
 
+    rotations: Tuple[TetrominoRotation, ...]
+    """states와 같은 순서로 미리 계산해둔 회전 테이블"""
+
     width: int = 0
     """테트로미노의 가로 길이"""
 
@@ -21,6 +81,7 @@ class TetrominoDefinition:
     
     def __init__(self, color: Color, states_str: List[str]):
         """문자열로 부터 테트로미노를 생성"""
+        self.color = color
         self.states = []
 
         for state_str in states_str:
@@ -43,6 +104,14 @@ class TetrominoDefinition:
                     y -= 1
 
             self.states.append(tuple(state))
+
+        self.rotations = tuple(TetrominoRotation.build(state) for state in self.states)
+
+    def get_rotation(self, rotation: int) -> TetrominoRotation:
+        return self.rotations[rotation % len(self.rotations)]
+
+    def get_mask(self, rotation: int) -> TetrominoMask:
+        return self.rotations[rotation % len(self.rotations)].mask
     
     def get_state(self, rotation: int):
         return deepcopy(self.states[rotation % len(self.states)])
@@ -55,16 +124,26 @@ class Tetromino:
 
     definition: TetrominoDefinition
 
-    state: TetrominoState
-    """현재 테트로미노. 위치 정보까지 포함되어 있음"""
-
     rotation: int = 0
-    """현재 테트로미노의 회전상태에 따른 인덱스 번호. state = states[rotation]"""
+    """현재 테트로미노의 회전상태에 따른 인덱스 번호. 항상 0 <= rotation < len(definition.rotations)"""
+
+    blocks: Optional[TetrominoState] = None
+    """가장 최근에 get_blocks로 만든 블록들. 위치나 회전이 바뀔 때만 다시 만듦"""
+
+    blocks_key: Optional[Tuple[int, int, int]] = None
+    """blocks를 만들 때의 (x, y, rotation)"""
 
     def __init__(self, definition: TetrominoDefinition, position: Position):
         self.definition = definition
         self.position = position
-        self.state = self.definition.get_state(self.rotation)
+
+    @property
+    def state(self) -> TetrominoState:
+        """현재 회전 상태의 블록들. 정의에 공유된 객체이므로 수정하면 안됨"""
+        return self.definition.states[self.rotation]
+
+    def get_rotation(self) -> TetrominoRotation:
+        return self.definition.rotations[self.rotation]
 
     def fall(self):
         self.position.y -= 1
@@ -79,16 +158,26 @@ class Tetromino:
         self.position.x += 1
 
     def rotate(self):
-        self.rotation -= 1
-        self.state = self.definition.get_state(self.rotation)
+        self.rotation = (self.rotation - 1) % len(self.definition.rotations)
  
     def rotate_reverse(self):
-        self.rotation += 1
-        self.state = self.definition.get_state(self.rotation)
+        self.rotation = (self.rotation + 1) % len(self.definition.rotations)
+
+    def get_cells(self) -> Tuple[Tuple[int, int], ...]:
+        """현재 테트로미노의 위치 오프셋까지 포함한 (x, y) 좌표들을 반환"""
+        x = self.position.x
+        y = self.position.y
+        return tuple((x + dx, y + dy) for dx, dy in self.definition.rotations[self.rotation].cells)
 
-    def get_blocks(self):
+    def get_blocks(self) -> TetrominoState:
         """현재 테트로미노의 위치 오프셋까지 포함한 블록들을 반환"""
-        return tuple(Block(block.position + self.position, block.color) for block in self.state)
+        key = (self.position.x, self.position.y, self.rotation)
+        if self.blocks_key != key:
+            color = self.definition.color
+            self.blocks = tuple(Block(Position(x, y), color) for x, y in self.get_cells())
+            self.blocks_key = key
+
+        return self.blocks
 
 
 class DefaultTetrominoDefinitions:
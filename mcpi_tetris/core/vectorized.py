@@ -0,0 +1,231 @@
+from random import Random
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from .controller import TetrisKey
+from .tetromino import DefaultTetrominoDefinitions, TetrominoDefinition
+
+
+ACTIONS = (None, TetrisKey.UP, TetrisKey.DOWN, TetrisKey.LEFT, TetrisKey.RIGHT, TetrisKey.LAND)
+"""step()에 넘기는 행동 번호와 TetrisKey의 대응. 0은 아무 입력도 없음"""
+
+ACTION_NONE = 0
+ACTION_UP = 1
+ACTION_DOWN = 2
+ACTION_LEFT = 3
+ACTION_RIGHT = 4
+ACTION_LAND = 5
+
+
+class VectorizedTetrisSimulator:
+    """
+    N개의 테트리스 보드를 (N, height, width) uint8 배열 하나로 묶어 lockstep으로 진행하는 시뮬레이터.
+    TetrisPlayer와 같은 테트로미노 정의, 회전 방향, 스폰 위치, 시드별 테트로미노 순서, 중력 규칙을 따름.
+    칸의 값은 블록 색깔(Color.value)이고 0은 빈칸. boards에는 조작중인 테트로미노가 포함되지 않음
+    """
+
+    count: int
+    width: int
+    height: int
+
+    definitions: List[TetrominoDefinition]
+
+    offsets: np.ndarray
+    """(테트로미노 종류, 회전, 블록, xy) 오프셋 테이블. 회전은 4개로 맞추기 위해 반복됨"""
+
+    rotation_counts: np.ndarray
+    colors: np.ndarray
+
+    boards: np.ndarray
+    """(N, height, width) 설치된 블록들"""
+
+    kinds: np.ndarray
+    rotations: np.ndarray
+    xs: np.ndarray
+    ys: np.ndarray
+    """조작중인 테트로미노의 종류, 회전 상태, 중심점 좌표"""
+
+    alive: np.ndarray
+    """게임 진행 중인지 여부"""
+
+    ticks: np.ndarray
+    speeds: np.ndarray
+    destroyed_lines: np.ndarray
+
+    randoms: List[Random]
+    """보드마다 독립적인 랜덤 인스턴스. TetrisPlayer.random과 같은 순서로 테트로미노를 뽑음"""
+
+    speed_incrementer_tick_rate: int = 200
+    """TetrisPlayer.get_speed_increment_steps()와 같음. 이 시뮬레이터의 tick은 TetrisPlayer의 step 하나에 해당"""
+
+    def __init__(
+        self,
+        count: int,
+        width: int = 10,
+        height: int = 20,
+        seeds: Optional[Sequence[int]] = None,
+        tetromino_definitions: Optional[List[TetrominoDefinition]] = None,
+    ):
+        self.count = count
+        self.width = width
+        self.height = height
+
+        self.definitions = tetromino_definitions if tetromino_definitions is not None else [
+            DefaultTetrominoDefinitions.SHAPE_I,
+            DefaultTetrominoDefinitions.SHAPE_J,
+            DefaultTetrominoDefinitions.SHAPE_L,
+            DefaultTetrominoDefinitions.SHAPE_O,
+            DefaultTetrominoDefinitions.SHAPE_S,
+            DefaultTetrominoDefinitions.SHAPE_Z,
+            DefaultTetrominoDefinitions.SHAPE_T,
+        ]
+
+        self.offsets = np.array([
+            [definition.get_rotation(rotation).cells for rotation in range(4)]
+            for definition in self.definitions
+        ], dtype=np.int16)
+        self.rotation_counts = np.array([len(definition.rotations) for definition in self.definitions], dtype=np.int16)
+        self.colors = np.array([definition.color.value for definition in self.definitions], dtype=np.uint8)
+
+        self.boards = np.zeros((count, height, width), dtype=np.uint8)
+        self.kinds = np.zeros(count, dtype=np.int16)
+        self.rotations = np.zeros(count, dtype=np.int16)
+        self.xs = np.zeros(count, dtype=np.int16)
+        self.ys = np.zeros(count, dtype=np.int16)
+        self.alive = np.ones(count, dtype=bool)
+        self.ticks = np.zeros(count, dtype=np.int64)
+        self.speeds = np.ones(count, dtype=np.int64)
+        self.destroyed_lines = np.zeros(count, dtype=np.int64)
+
+        if seeds is None:
+            seeds = [1640170508] * count
+
+        self.randoms = [Random(seed) for seed in seeds]
+        self.spawn(np.arange(count))
+
+    def get_tetromino_fall_ticks(self) -> np.ndarray:
+        """TetrisPlayer.get_tetromino_fall_ticks와 같은 규칙"""
+        return np.maximum(5, 20 - self.speeds)
+
+    def collides(self, indices: np.ndarray, rotations: np.ndarray, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+        """indices 보드들에서 주어진 회전, 좌표에 테트로미노를 놓으면 충돌하는지 여부"""
+        offsets = self.offsets[self.kinds[indices], rotations]
+        cell_xs = xs[:, None] + offsets[..., 0]
+        cell_ys = ys[:, None] + offsets[..., 1]
+
+        out_of_bounds = (cell_xs < 0) | (cell_xs >= self.width) | (cell_ys < 0) | (cell_ys >= self.height)
+        occupied = self.boards[
+            indices[:, None],
+            np.clip(cell_ys, 0, self.height - 1),
+            np.clip(cell_xs, 0, self.width - 1),
+        ] != 0
+
+        return (out_of_bounds | occupied).any(axis=1)
+
+    def spawn(self, indices: np.ndarray):
+        """새 테트로미노를 만들고, 스폰 위치가 막힌 보드는 게임 오버 처리"""
+        if len(indices) == 0:
+            return
+
+        choices = range(len(self.definitions))
+        self.kinds[indices] = [self.randoms[index].choice(choices) for index in indices]
+        self.rotations[indices] = 0
+        self.xs[indices] = self.width // 2
+        self.ys[indices] = self.height - 1
+
+        game_over = self.collides(indices, self.rotations[indices], self.xs[indices], self.ys[indices])
+        self.alive[indices[game_over]] = False
+
+    def lock(self, indices: np.ndarray):
+        """테트로미노를 보드에 설치하고, 완성된 라인을 파괴한 뒤 다음 테트로미노를 만듦"""
+        if len(indices) == 0:
+            return
+
+        offsets = self.offsets[self.kinds[indices], self.rotations[indices]]
+        cell_xs = self.xs[indices, None] + offsets[..., 0]
+        cell_ys = self.ys[indices, None] + offsets[..., 1]
+        self.boards[indices[:, None], cell_ys, cell_xs] = self.colors[self.kinds[indices]][:, None]
+
+        boards = self.boards[indices]
+        completed = (boards != 0).all(axis=2)
+        destroyed = completed.sum(axis=1)
+
+        cleared = destroyed > 0
+        if cleared.any():
+            # 완성되지 않은 줄을 순서대로 아래로 모으고, 위쪽 남은 줄은 비움
+            order = np.argsort(completed[cleared], axis=1, kind='stable')
+            shifted = np.take_along_axis(boards[cleared], order[:, :, None], axis=1)
+            shifted[np.arange(self.height)[None, :] >= (self.height - destroyed[cleared])[:, None]] = 0
+            self.boards[indices[cleared]] = shifted
+            self.destroyed_lines[indices] += destroyed
+
+        self.spawn(indices)
+
+    def move(self, indices: np.ndarray, rotations: np.ndarray, dx: int):
+        """충돌하지 않는 보드에서만 회전 또는 좌우 이동을 적용"""
+        if len(indices) == 0:
+            return
+
+        xs = self.xs[indices] + dx
+        accepted = ~self.collides(indices, rotations, xs, self.ys[indices])
+        self.rotations[indices[accepted]] = rotations[accepted]
+        self.xs[indices[accepted]] = xs[accepted]
+
+    def fall(self, indices: np.ndarray):
+        """TetrisPlayer.fall과 같이 한 칸 떨어트리고, 떨어질 수 없으면 설치"""
+        if len(indices) == 0:
+            return
+
+        landed = self.collides(indices, self.rotations[indices], self.xs[indices], self.ys[indices] - 1)
+        self.ys[indices[~landed]] -= 1
+        self.lock(indices[landed])
+
+    def land(self, indices: np.ndarray):
+        """TetrisPlayer.land와 같이 바로 떨어트린 후 설치"""
+        falling = indices
+        while len(falling) > 0:
+            blocked = self.collides(falling, self.rotations[falling], self.xs[falling], self.ys[falling] - 1)
+            falling = falling[~blocked]
+            self.ys[falling] -= 1
+
+        self.lock(indices)
+
+    def step(self, actions: Optional[np.ndarray] = None):
+        """
+        모든 보드를 한 tick 진행. actions는 보드마다 하나의 행동 번호(ACTION_*)이며,
+        TetrisPlayer.tick과 같이 입력을 먼저 처리한 뒤 중력과 스피드를 적용함.
+        게임 오버된 보드는 더 이상 진행하지 않음
+        """
+        alive = self.alive.copy()
+
+        if actions is not None:
+            actions = np.asarray(actions)
+
+            up = np.flatnonzero(alive & (actions == ACTION_UP))
+            self.move(up, (self.rotations[up] - 1) % self.rotation_counts[self.kinds[up]], 0)
+
+            left = np.flatnonzero(alive & (actions == ACTION_LEFT))
+            self.move(left, self.rotations[left], -1)
+
+            right = np.flatnonzero(alive & (actions == ACTION_RIGHT))
+            self.move(right, self.rotations[right], 1)
+
+            self.fall(np.flatnonzero(alive & (actions == ACTION_DOWN)))
+            self.land(np.flatnonzero(alive & (actions == ACTION_LAND)))
+
+        # 테트로미노가 떨어질 타이밍인지 확인 (입력 처리 중 게임 오버된 보드는 제외)
+        gravity = self.alive & alive & (self.ticks % self.get_tetromino_fall_ticks() == 0)
+        self.fall(np.flatnonzero(gravity))
+
+        self.speeds[alive & ((self.ticks + 1) % self.speed_incrementer_tick_rate == 0)] += 1
+        self.ticks[alive] += 1
+
+    def render(self, index: int) -> np.ndarray:
+        """index번째 보드에 조작중인 테트로미노까지 그린 (height, width) 배열"""
+        board = self.boards[index].copy()
+        if self.alive[index]:
+            offsets = self.offsets[self.kinds[index], self.rotations[index]]
+            board[self.ys[index] + offsets[:, 1], self.xs[index] + offsets[:, 0]] = self.colors[self.kinds[index]]
+
+        return board
@@ -105,6 +105,9 @@ class RPiGPIOJoystickController(Controller):
 
     joystick: Joystick
 
+    poll_interval: Optional[float] = 0.01
+    """GPIO 이벤트는 Joystick의 큐에 쌓이므로 주기적으로 확인"""
+
     def __init__(self, player_id: int):
         super().__init__(player_id)
         self.queue = deque()
@@ -17,8 +17,15 @@ class McpiDisplayAdapter(DisplayAdapter):
     player_id: int
     """테트리스를 조작하는 플레이어의 엔티티 ID"""
 
-    def __init__(self, minecraft: Minecraft, player_id: int = None):
+    owns_connection: bool
+    """
+    디스플레이 전용 마인크래프트 연결인지 여부. 참이면 close()에서 연결도 닫음.
+    연결은 한 쓰레드에서만 사용해야 하며, 호스트에서는 ThreadedDisplayAdapter의 쓰레드가 모든 호출을 순서대로 실행함
+    """
+
+    def __init__(self, minecraft: Minecraft, player_id: int = None, owns_connection: bool = False):
         self.minecraft = minecraft
+        self.owns_connection = owns_connection
 
         if player_id is None:
             player_id = self.minecraft.getPlayerEntityIds()[0]
@@ -86,8 +93,12 @@ class McpiDisplayAdapter(DisplayAdapter):
                     self.minecraft.setBlock(pos.x + x, pos.y + y, pos.z, WOOL.id, 7) # WOOL (grey)
 
     def close(self):
-        pos = self.display_pos
+        try:
+            pos = self.display_pos
 
-        for y in range(-1, self.height + 1):
-            for x in range(-1, self.width + 1):
-                self.minecraft.setBlock(pos.x + x, pos.y + y, pos.z, AIR.id)
+            for y in range(-1, self.height + 1):
+                for x in range(-1, self.width + 1):
+                    self.minecraft.setBlock(pos.x + x, pos.y + y, pos.z, AIR.id)
+        finally:
+            if self.owns_connection:
+                self.minecraft.conn.socket.close()
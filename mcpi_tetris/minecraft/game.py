@@ -1,58 +1,126 @@
-from typing import Dict
-import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Dict, Iterable, List, Optional, Set, Tuple
 from mcpi.minecraft import Minecraft
-from mcpi_tetris.core.network import ControllerNetwork, CONTROLLER_SERVER_PORT
+from mcpi_tetris.config import config
+from mcpi_tetris.core.network import ControllerServer, CONTROLLER_SERVER_PORT
+from mcpi_tetris.core.basic import Block, Position
 from mcpi_tetris.core.controller import Controller
+from mcpi_tetris.core.display import NullDisplayAdapter, ThreadedDisplayAdapter
+from mcpi_tetris.core.async_game import AsyncTetrisGame
 from mcpi_tetris.core.game import TetrisGame, TetrisPlayer
+from mcpi_tetris.core.network import TetrisPacket
+from mcpi_tetris.core.sync import BoardSyncServer
 from mcpi_tetris.hardware.lcd import LCD
 from mcpi_tetris.hardware.led import LED
 
 from .display import McpiDisplayAdapter
 
 
+def show_leaderboard(lcd: LCD, scores: Iterable[Tuple[int, int]]):
+    """(플레이어 ID, 부순 줄 수) 중 상위 두 플레이어를 LCD에 표시"""
+    ranking = sorted(scores, key=lambda score: -score[1])
+
+    for line, (player_id, lines) in enumerate(ranking[:2], start=1):
+        lcd.send(line, f'Player {player_id}: {lines}')
+
+
 class McpiTetrisGame(TetrisGame):
 
     minecraft: Minecraft
     controllers: Dict[str, Controller]
-    network: ControllerNetwork
+    network: ControllerServer
+
+    minecraft_address: str
+    minecraft_port: int
 
     led: LED
     lcd: LCD
 
-    turn_on_led_until: int = 0
+    turn_on_led_until: float = 0
+    """LED를 끌 시각 (게임 시계 기준). 0이면 꺼져 있음"""
+
+    led_duration: float = 2
+    """라인을 부쉈을 때 LED를 켜두는 시간 (초)"""
 
-    def __init__(self, minecraft: Minecraft):
+    board_sync: Optional[BoardSyncServer] = None
+    """컨트롤러 연결로 각 플레이어의 보드를 보내는 서버. --board-sync일 때만 사용"""
+
+    remote_display: bool = False
+    """호스트는 보드를 그리지 않고, 보드 동기화를 받은 클라이언트가 직접 그림"""
+
+    def __init__(self, minecraft: Minecraft, address: str = 'localhost', port: int = 4711):
         super().__init__()
         self.minecraft = minecraft
+        self.minecraft_address = address
+        self.minecraft_port = port
         self.print_message('Tetris game open!')
 
-        self.network = ControllerNetwork()
-        self.network.serve()
-        self.print_message(f'Also accepts controller input via socket (PORT={CONTROLLER_SERVER_PORT})!')
+        self.open_network()
 
         self.led = LED()
         self.lcd = LCD()
 
+    def open_network(self):
+        """컨트롤러 입력을 받을 소켓을 엶"""
+        self.network = ControllerServer()
+        self.network.serve(udp=config.get('udp', False))
+        self.print_message(f'Also accepts controller input via socket (PORT={CONTROLLER_SERVER_PORT})!')
+
+        self.remote_display = bool(config.get('remote_display', self.remote_display))
+        if config.get('board_sync') or self.remote_display:
+            self.board_sync = BoardSyncServer(self, self.network)
+            self.print_message('Boards are streamed to controller clients!')
+
     def create_controller(self, player_id: int) -> Controller:
-        return Controller(player_id) # 빈 컨트롤러 사용
+        controller = Controller(player_id) # 빈 컨트롤러 사용
+        controller.max_queue = config.get('input_queue_limit') or None # 키를 쏟아내는 클라이언트 대비
+        return controller
+
+    def create_minecraft(self) -> Minecraft:
+        return Minecraft.create(self.minecraft_address, self.minecraft_port)
 
     def create_player(self, player_id: int) -> TetrisPlayer:
+        if self.remote_display:
+            display_adapter = NullDisplayAdapter() # 클라이언트가 직접 그림
+        else:
+            # 디스플레이마다 별도의 연결과 쓰레드에서 그려서, 느린 디스플레이가 다른 플레이어의 tick을 막지 않도록 함
+            display_adapter = ThreadedDisplayAdapter(McpiDisplayAdapter(self.create_minecraft(), player_id, owns_connection=True))
+
         return TetrisPlayer(
             game=self,
             width=10,
             height=20,
             controller=self.get_controller(player_id),
-            display_adapter=McpiDisplayAdapter(self.minecraft, player_id)
+            display_adapter=display_adapter,
         )
 
+    def leave(self, player_id: int):
+        joined = self.is_joined(player_id)
+        super().leave(player_id)
+
+        if joined and self.board_sync is not None:
+            self.board_sync.remove_player(player_id, self.tick_counter)
+
     def print_message(self, message: str):
         print(f'[Tetris] {message}')
         self.minecraft.postToChat(f'[Tetris] {message}')
 
     def pretick(self):
-        # join, leave 감지하여 상태 업데이트
+        with self.profiler.phase('minecraft'):
+            player_ids = self.minecraft.getPlayerEntityIds()
+
+        self.sync_players(player_ids)
+
+        with self.profiler.phase('network'):
+            packets = self.network.recv()
+
+        self.dispatch_packets(packets)
+
+    def sync_players(self, player_ids: Iterable[int]):
+        """join, leave 감지하여 상태 업데이트"""
         old_players = set(self.controllers.keys())
-        new_players = set(self.minecraft.getPlayerEntityIds())
+        new_players = set(player_ids)
 
         # 떠난 플레이어 감지
         for player_id in old_players:
@@ -68,33 +136,120 @@ class McpiTetrisGame(TetrisGame):
                 self.print_message(f'Player {player_id} join the world')
                 self.add_controller(self.create_controller(player_id))
 
-        # 소켓으로부터 데이터를 받은 후 controller에 push
-        for packet in self.network.recv():
+    def dispatch_packets(self, packets: Iterable[TetrisPacket]) -> Set[int]:
+        """소켓으로부터 받은 데이터를 controller에 push. 입력을 받은 플레이어 ID들을 반환"""
+        player_ids = set()
+
+        for packet in packets:
             player_id = packet.player_id
             key = packet.key
 
             if player_id in self.controllers:
                 self.controllers[player_id].push(key)
+                player_ids.add(player_id)
+
+        return player_ids
+
+    def wait_for_input(self, timeout: float) -> Iterable[int]:
+        with self.profiler.phase('network'):
+            packets = self.network.wait(timeout)
+
+        return self.dispatch_packets(packets)
 
     def posttick(self):
         if self.turn_on_led_until != 0:
-            if time.time() > self.turn_on_led_until:
-                self.led.off()
+            if self.now() > self.turn_on_led_until:
+                with self.profiler.phase('led'):
+                    self.led.off()
+
                 self.turn_on_led_until = 0
 
-    def poststop(self):
+    def pump_spectators(self):
+        super().pump_spectators()
+
+        if self.board_sync is not None:
+            with self.profiler.phase('board_sync'):
+                self.board_sync.pump()
+
+        with self.profiler.phase('network_send'):
+            self.network.pump() # 보드 프레임과 ACK 전송
+
+    def onboardchange(self, player_id: int, dirty: List[Tuple[Position, Optional[Block]]]):
+        super().onboardchange(player_id, dirty)
+
+        if self.board_sync is not None:
+            self.board_sync.publish(player_id, self.players[player_id].tick_counter, dirty)
+
+    def close(self):
+        super().close()
+
+        if self.board_sync is not None:
+            self.board_sync.close()
+
         self.network.close()
 
     def onlinecompleted(self, player_id: int, destroyed_lines: int):
-        self.led.on(0x00FF00)
-        self.turn_on_led_until = time.time() + 2
+        with self.profiler.phase('led'):
+            self.led.on(0x00FF00)
+            self.turn_on_led_until = self.now() + self.led_duration
+
+        with self.profiler.phase('lcd'):
+            show_leaderboard(self.lcd, ((player_id, player.destroyed_lines) for player_id, player in self.players.items()))
+
+
+class AsyncMcpiTetrisGame(AsyncTetrisGame, McpiTetrisGame):
+    """
+    McpiTetrisGame의 asyncio 버전. 컨트롤러 소켓은 데이터가 도착하는 즉시 읽고,
+    마인크래프트 플레이어 목록은 별도 연결에서 쓰레드로 폴링함.
+    채팅 메시지와 나간 플레이어의 디스플레이 정리도 쓰레드에서 하므로, 이벤트 루프는 마인크래프트를 기다리지 않음
+    """
 
-        players = sorted(self.players.values(), key=lambda player: -player.destroyed_lines)
+    poll_minecraft: Minecraft
+    """플레이어 목록 폴링 전용 마인크래프트 연결"""
 
-        i = 0
-        for player in players:
-            i += 1
-            if i > 2:
-                break
+    chat_executor: ThreadPoolExecutor
+    """채팅 메시지를 순서대로 보내는 쓰레드. minecraft 연결은 이 쓰레드에서만 사용함"""
 
-            self.lcd.send(i, f'Player {player.controller.player_id}: {player.destroyed_lines}')
+    player_poll_interval: float = 0.5
+    """플레이어 join, leave를 확인하는 간격 (초)"""
+
+    def __init__(self, minecraft: Minecraft, address: str = 'localhost', port: int = 4711):
+        self.chat_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='chat')
+        super().__init__(minecraft, address, port)
+        self.poll_minecraft = self.create_minecraft()
+
+    def print_message(self, message: str):
+        print(f'[Tetris] {message}')
+        self.chat_executor.submit(self.post_chat, f'[Tetris] {message}')
+
+    def post_chat(self, message: str):
+        try:
+            self.minecraft.postToChat(message)
+        except Exception as e:
+            print(f'[Tetris] Failed to post chat: {e!r}')
+
+    def close(self):
+        super().close()
+        self.chat_executor.shutdown() # 남은 메시지를 모두 보냄
+
+    def io_tasks(self) -> List[Awaitable]:
+        return [self.network_loop(), self.minecraft_loop()]
+
+    async def network_loop(self):
+        while True:
+            socks = [self.network.sock] + [client.sock for client in self.network.clients]
+            if self.network.datagram is not None:
+                socks.append(self.network.datagram.sock) # tick_loop은 pretick()을 부르지 않으므로 여기서 읽어야 함
+
+            await self.wait_readable(socks)
+            player_ids = self.dispatch_packets(self.network.recv())
+
+            if self.immediate_input:
+                for player_id in player_ids:
+                    self.apply_input(player_id)
+
+    async def minecraft_loop(self):
+        while True:
+            player_ids = await asyncio.to_thread(self.poll_minecraft.getPlayerEntityIds)
+            self.sync_players(player_ids)
+            await asyncio.sleep(self.player_poll_interval)
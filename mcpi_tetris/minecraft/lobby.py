@@ -0,0 +1,390 @@
+from multiprocessing import Process, Queue
+import os
+import queue
+import signal
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from mcpi.minecraft import Minecraft
+from mcpi_tetris.config import config
+from mcpi_tetris.core.controller import TetrisKey
+from mcpi_tetris.core.network import ControllerServer, CONTROLLER_SERVER_PORT, TetrisPacket
+from mcpi_tetris.core.spectator import SPECTATOR_SERVER_PORT
+from mcpi_tetris.hardware.hardware import Hardware
+from mcpi_tetris.hardware.lcd import LCD
+from mcpi_tetris.hardware.led import LED
+
+from .game import McpiTetrisGame, show_leaderboard
+
+
+ROOM_JOIN = 'join'
+"""플레이어가 방에 들어옴"""
+
+ROOM_LEAVE = 'leave'
+"""플레이어가 방에서 나감"""
+
+ROOM_KEY = 'key'
+"""플레이어의 키 입력"""
+
+ROOM_CLOSE = 'close'
+"""방을 닫음"""
+
+RoomMessage = Tuple[str, Optional[int], Optional[TetrisKey]]
+"""로비에서 방 프로세스로 보내는 메시지. (종류, 플레이어 ID, 키)"""
+
+LineEvent = Tuple[int, int, int]
+"""방 프로세스에서 로비로 보내는 라인 완성 알림. (방 번호, 플레이어 ID, 플레이어가 지금까지 부순 줄 수)"""
+
+
+class RoomTetrisGame(McpiTetrisGame):
+    """
+    로비가 만든 프로세스 안에서 동작하는 방 하나의 게임.
+    소켓이나 플레이어 목록을 직접 확인하지 않고, 로비가 inbox로 보내주는 메시지로 join, leave, 키 입력을 받음
+    """
+
+    room_id: int
+    inbox: Queue
+
+    outbox: Queue
+    """로비로 라인 완성을 알리는 큐. LED, LCD는 로비가 켬"""
+
+    closed: bool = False
+    """로비가 방을 닫았는지 여부"""
+
+    def __init__(self, room_id: int, inbox: Queue, outbox: Queue, address: str = 'localhost', port: int = 4711):
+        self.room_id = room_id
+        self.inbox = inbox
+        self.outbox = outbox
+        self.spectator_port = SPECTATOR_SERVER_PORT + room_id # 방마다 관전 포트가 다름
+        super().__init__(Minecraft.create(address, port), address, port)
+
+    def open_network(self):
+        pass # 컨트롤러 소켓은 로비가 받음
+
+    def print_message(self, message: str):
+        print(f'[Room {self.room_id}] {message}')
+        self.minecraft.postToChat(f'[Room {self.room_id}] {message}')
+
+    def run(self):
+        try:
+            while not self.closed:
+                self.tick()
+        except KeyboardInterrupt:
+            pass
+
+        self.print_message(f'Tick scheduler: {self.scheduler.report()}')
+        self.dump_profile()
+        self.stop()
+        self.close()
+
+    def pretick(self):
+        with self.profiler.phase('inbox'):
+            messages = self.drain_inbox()
+
+        self.dispatch_messages(messages)
+
+    def drain_inbox(self) -> List[RoomMessage]:
+        messages = []
+        while True:
+            try:
+                messages.append(self.inbox.get_nowait())
+            except queue.Empty:
+                return messages
+
+    def dispatch_messages(self, messages: Iterable[RoomMessage]) -> Set[int]:
+        """로비로부터 받은 메시지를 처리. 키 입력을 받은 플레이어 ID들을 반환"""
+        player_ids = set()
+
+        for kind, player_id, key in messages:
+            if kind == ROOM_JOIN:
+                if player_id not in self.controllers:
+                    self.print_message(f'Player {player_id} entered the room')
+                    self.add_controller(self.create_controller(player_id))
+            elif kind == ROOM_LEAVE:
+                if player_id in self.controllers:
+                    self.print_message(f'Player {player_id} left the room')
+                    self.remove_controller(player_id)
+            elif kind == ROOM_KEY:
+                if player_id in self.controllers:
+                    self.controllers[player_id].push(key)
+                    player_ids.add(player_id)
+            elif kind == ROOM_CLOSE:
+                self.closed = True
+
+        return player_ids
+
+    def wait_for_input(self, timeout: float) -> Iterable[int]:
+        try:
+            message = self.inbox.get(timeout=timeout)
+        except queue.Empty:
+            return []
+
+        return self.dispatch_messages([message] + self.drain_inbox())
+
+    def onlinecompleted(self, player_id: int, destroyed_lines: int):
+        self.outbox.put((self.room_id, player_id, self.players[player_id].destroyed_lines))
+
+    def close(self):
+        if self.spectator is not None:
+            self.spectator.close()
+
+
+def run_room(room_id: int, inbox: Queue, outbox: Queue, address: str, port: int, cpu: Optional[int]):
+    """방 프로세스의 진입점"""
+    if cpu is not None and hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, {cpu})
+
+    # LED, LCD는 로비 프로세스만 사용. 라인 완성은 outbox로 로비에 알림
+    Hardware.enabled = False
+
+    game = RoomTetrisGame(room_id, inbox, outbox, address, port)
+    if hasattr(signal, 'SIGUSR1'):
+        signal.signal(signal.SIGUSR1, lambda signum, frame: game.request_profile_dump())
+
+    game.run()
+
+
+class Room:
+    """로비에서 관리하는 방 하나"""
+
+    room_id: int
+
+    inbox: Queue
+    """방 프로세스로 메시지를 보내는 큐"""
+
+    process: Process
+
+    player_ids: Set[int]
+    """방에 있는 플레이어들"""
+
+    cpu: Optional[int]
+    """방 프로세스를 고정할 CPU 코어. None이면 고정하지 않음"""
+
+    def __init__(self, room_id: int, outbox: Queue, address: str, port: int, cpu: Optional[int] = None):
+        self.room_id = room_id
+        self.inbox = Queue()
+        self.player_ids = set()
+        self.cpu = cpu
+        self.process = Process(
+            target=run_room,
+            args=(room_id, self.inbox, outbox, address, port, cpu),
+            name=f'tetris-room-{room_id}',
+            daemon=True,
+        )
+
+    def send(self, kind: str, player_id: Optional[int] = None, key: Optional[TetrisKey] = None):
+        self.inbox.put((kind, player_id, key))
+
+
+class McpiLobby:
+    """
+    여러 개의 방(RoomTetrisGame)을 각각의 프로세스에서 실행하는 로비.
+    컨트롤러 소켓과 마인크래프트 플레이어 목록은 로비가 확인하고, 플레이어 ID에 따라 해당 방으로 보냄.
+    채팅으로 '/room N'을 입력하면 N번 방으로 이동
+    """
+
+    minecraft: Minecraft
+    network: ControllerServer
+
+    minecraft_address: str
+    minecraft_port: int
+
+    rooms: Dict[int, Room]
+    """방 번호(1부터 시작)별 방"""
+
+    player_rooms: Dict[int, int]
+    """플레이어 ID별로 들어가 있는 방 번호"""
+
+    room_capacity: int = 8
+    """새 플레이어를 자동으로 배정할 때 방 하나에 들어갈 최대 플레이어 수"""
+
+    player_poll_interval: float = 0.5
+    """플레이어 join, leave와 채팅을 확인하는 간격 (초)"""
+
+    last_player_poll: float = 0
+
+    line_events: Queue
+    """모든 방이 라인 완성을 알리는 큐"""
+
+    scores: Dict[int, int]
+    """플레이어 ID별로 지금 방에서 부순 줄 수. LCD에 상위 두 플레이어를 표시"""
+
+    led: LED
+    lcd: LCD
+
+    turn_on_led_until: float = 0
+    """LED를 끌 시각 (time.monotonic 기준). 0이면 꺼져 있음"""
+
+    led_duration: float = 2
+    """라인을 부쉈을 때 LED를 켜두는 시간 (초)"""
+
+    def __init__(self, minecraft: Minecraft, room_count: int, address: str = 'localhost', port: int = 4711):
+        self.minecraft = minecraft
+        self.minecraft_address = address
+        self.minecraft_port = port
+        self.player_rooms = {}
+        self.line_events = Queue()
+        self.scores = {}
+
+        cpus = os.cpu_count() or 1
+        self.rooms = {
+            room_id: Room(room_id, self.line_events, address, port, cpu=(room_id - 1) % cpus)
+            for room_id in range(1, room_count + 1)
+        }
+
+    def print_message(self, message: str):
+        print(f'[Lobby] {message}')
+        self.minecraft.postToChat(f'[Lobby] {message}')
+
+    def start(self):
+        for room in self.rooms.values():
+            room.process.start()
+
+        self.led = LED()
+        self.lcd = LCD()
+
+        self.network = ControllerServer()
+        self.network.serve(udp=config.get('udp', False))
+        self.print_message(f'Tetris lobby open with {len(self.rooms)} rooms! (PORT={CONTROLLER_SERVER_PORT})')
+        self.print_message('Type "/room <number>" in chat to move to another room.')
+
+    def run(self):
+        self.start()
+
+        while True:
+            try:
+                self.update()
+            except KeyboardInterrupt:
+                self.print_message('Shutdown lobby ...')
+                self.stop()
+                break
+
+    def update(self):
+        now = time.monotonic()
+        if now - self.last_player_poll >= self.player_poll_interval:
+            self.last_player_poll = now
+            self.sync_players(self.minecraft.getPlayerEntityIds())
+
+            for post in self.minecraft.events.pollChatPosts():
+                self.oncommand(post.entityId, post.message)
+
+        # 다음 폴링 시각까지 키 입력을 기다렸다가 바로 방으로 보냄
+        timeout = max(0, self.last_player_poll + self.player_poll_interval - time.monotonic())
+        self.route_packets(self.network.wait(timeout))
+
+        self.update_hardwares()
+
+    def update_hardwares(self):
+        """방에서 온 라인 완성 알림으로 LED를 켜고 LCD 순위를 갱신. LED는 led_duration이 지나면 끔"""
+        events = []
+        while True:
+            try:
+                events.append(self.line_events.get_nowait())
+            except queue.Empty:
+                break
+
+        now = time.monotonic()
+        if len(events) > 0:
+            for room_id, player_id, destroyed_lines in events:
+                if self.player_rooms.get(player_id) == room_id: # 방을 옮기기 전에 보낸 알림은 무시
+                    self.scores[player_id] = destroyed_lines
+
+            self.led.on(0x00FF00)
+            self.turn_on_led_until = now + self.led_duration
+            show_leaderboard(self.lcd, self.scores.items())
+        elif self.turn_on_led_until != 0 and now > self.turn_on_led_until:
+            self.led.off()
+            self.turn_on_led_until = 0
+
+    def request_profile_dump(self):
+        """모든 방 프로세스에 프로파일 통계 출력을 요청"""
+        if not hasattr(signal, 'SIGUSR1'):
+            return
+
+        for room in self.rooms.values():
+            if room.process.pid is not None:
+                os.kill(room.process.pid, signal.SIGUSR1)
+
+    def stop(self):
+        for room in self.rooms.values():
+            room.send(ROOM_CLOSE)
+
+        for room in self.rooms.values():
+            room.process.join(5)
+
+        self.network.close()
+
+    def sync_players(self, player_ids: Iterable[int]):
+        """마인크래프트 플레이어 join, leave를 감지하여 방에 배정하거나 방에서 뺌"""
+        new_players = set(player_ids)
+
+        for player_id in list(self.player_rooms):
+            if player_id not in new_players:
+                self.leave_room(player_id)
+
+        for player_id in new_players:
+            if player_id not in self.player_rooms:
+                self.enter_room(player_id, self.find_room().room_id)
+
+    def find_room(self) -> Room:
+        """새 플레이어가 들어갈 방. 자리가 있는 방 중 가장 앞 번호, 모두 찼으면 가장 적은 방"""
+        for room in self.rooms.values():
+            if len(room.player_ids) < self.room_capacity:
+                return room
+
+        return min(self.rooms.values(), key=lambda room: len(room.player_ids))
+
+    def enter_room(self, player_id: int, room_id: int):
+        room = self.rooms[room_id]
+        room.player_ids.add(player_id)
+        room.send(ROOM_JOIN, player_id)
+
+        self.player_rooms[player_id] = room_id
+        self.print_message(f'Player {player_id} entered room {room_id}')
+
+    def leave_room(self, player_id: int):
+        room = self.rooms[self.player_rooms.pop(player_id)]
+        room.player_ids.discard(player_id)
+        room.send(ROOM_LEAVE, player_id)
+
+        self.scores.pop(player_id, None) # 다른 방에서는 0줄부터 다시 시작
+
+    def move_room(self, player_id: int, room_id: int):
+        if room_id not in self.rooms:
+            self.print_message(f'Room {room_id} does not exist. (1~{len(self.rooms)})')
+            return
+
+        if self.player_rooms.get(player_id) == room_id:
+            self.print_message(f'Player {player_id} is already in room {room_id}')
+            return
+
+        if player_id in self.player_rooms:
+            self.leave_room(player_id)
+
+        self.enter_room(player_id, room_id)
+
+    def oncommand(self, player_id: int, message: str):
+        """채팅 명령어 처리. '/room'은 방 목록, '/room N'은 방 이동"""
+        tokens = message.strip().split()
+        if len(tokens) == 0 or tokens[0] != '/room':
+            return
+
+        if len(tokens) == 1:
+            for room in self.rooms.values():
+                self.print_message(f'Room {room.room_id}: {len(room.player_ids)} players')
+            return
+
+        try:
+            room_id = int(tokens[1])
+        except ValueError:
+            self.print_message('Usage: /room <number>')
+            return
+
+        self.move_room(player_id, room_id)
+
+    def route_packets(self, packets: Iterable[TetrisPacket]):
+        """소켓으로 받은 키 입력을 플레이어가 있는 방으로 보냄"""
+        for packet in packets:
+            room_id = self.player_rooms.get(packet.player_id)
+            if room_id is not None:
+                self.rooms[room_id].send(ROOM_KEY, packet.player_id, packet.key)
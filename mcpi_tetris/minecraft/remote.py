@@ -1,37 +1,231 @@
+import random
+import selectors
+from socket import socket, socketpair
 import time
+from typing import List, Optional, Tuple
 from mcpi.minecraft import Minecraft
-from mcpi_tetris.core.network import ControllerNetwork
+from mcpi_tetris.core.network import ControllerClient
 from mcpi_tetris.core.controller import Controller, TetrisKey
+from mcpi_tetris.core.display import DisplayAdapter, NullDisplayAdapter
+from mcpi_tetris.core.sync import MirroredPlayer
 
 
 class McpiRemoteControl:
+    """
+    컨트롤러 입력을 호스트로 보내는 클라이언트.
+    컨트롤러가 push()하면 바로 깨어나서, 그 사이에 쌓인 키들을 한번에 보냄.
+    보드 동기화를 사용하면 호스트가 보내주는 보드를 직접 그림.
+    바이너리 프로토콜에서는 세션을 사용하므로, 연결이 끊기면 점점 길게 기다리며 다시 연결하여 이어서 보냄
+    """
 
     minecraft: Minecraft
     controller: Controller
-    network: ControllerNetwork
+    network: ControllerClient
 
-    def __init__(self, minecraft: Minecraft, controller: Controller, address: str):
+    selector: selectors.BaseSelector
+
+    mirror: Optional[MirroredPlayer] = None
+    """호스트에게 받은 플레이어 보드. 보드 동기화를 사용하지 않으면 None"""
+
+    network_events: int = 0
+    """selector가 네트워크 소켓에서 감시중인 이벤트"""
+
+    waker: Tuple[socket, socket]
+    """(읽는 쪽, 쓰는 쪽). 컨트롤러 쓰레드가 쓰는 쪽에 1바이트를 써서 select 중인 run()을 깨움"""
+
+    datagram_repeat_delay: float = 0.05
+    """입력이 멈추고 이만큼 지나면 마지막 UDP 패킷을 한번 더 보냄 (초)"""
+
+    max_batch: int = 64
+    """한번에 묶어서 보낼 최대 키 수"""
+
+    reconnect_delay: float = 0.5
+    """처음 다시 연결하기 전에 기다리는 시간 (초). 실패할 때마다 두 배씩 늘어남"""
+
+    max_reconnect_delay: float = 8
+    """다시 연결하기 전에 기다리는 최대 시간 (초)"""
+
+    reconnect_attempts: int = 0
+    """세션이 이어진 후로 연속으로 다시 연결한 횟수"""
+
+    def __init__(
+        self,
+        minecraft: Minecraft,
+        controller: Controller,
+        address: str,
+        legacy_protocol: bool = False,
+        udp: bool = False,
+        display_adapter: Optional[DisplayAdapter] = None,
+        board_sync: bool = False,
+    ):
         self.minecraft = minecraft
         self.controller = controller
+
+        self.waker = socketpair()
+        for sock in self.waker:
+            sock.setblocking(False)
+
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.waker[0], selectors.EVENT_READ)
+
+        self.controller.onpush = self.wakeup
         self.controller.preinitialize()
 
-        self.network = ControllerNetwork()
-        self.network.connect(address)
+        self.network = ControllerClient(legacy_protocol=legacy_protocol)
+        self.network.connect(address, udp=udp)
+
+        if not legacy_protocol:
+            self.network.start_session(controller.player_id)
+
+        if display_adapter is not None or board_sync:
+            if legacy_protocol:
+                print('[Network] Board sync is not supported with legacy protocol')
+            else:
+                self.mirror = MirroredPlayer(controller.player_id, display_adapter or NullDisplayAdapter(), controller)
+                self.watch_network(selectors.EVENT_READ)
+                self.network.request_board_sync(controller.player_id)
+
+    def wakeup(self):
+        """다른 쓰레드에서 불러도 안전함"""
+        try:
+            self.waker[1].send(b'\0')
+        except (BlockingIOError, InterruptedError):
+            pass # 이미 깨울 예정
+
+    def drain_keys(self) -> List[TetrisKey]:
+        keys = []
+        while len(keys) < self.max_batch:
+            key = self.controller.pop()
+            if key is None:
+                break
+
+            keys.append(key)
+
+        return keys
+
+    def send_keys(self, keys: List[TetrisKey]):
+        if self.network.verbose:
+            print(f'[Network] Send key to server: {", ".join(map(str, keys))}')
+
+        self.network.send_keys(self.controller.player_id, keys)
+
+    def get_timeout(self) -> Optional[float]:
+        """다음에 깨어나야 할 때까지 남은 시간 (초). None이면 키 입력이 있을 때까지 기다림"""
+        timeout = self.controller.poll_interval
 
-    def send_key(self, key: TetrisKey):
-        self.network.send(self.controller.player_id, key)
+        if self.network.datagram_sock is not None and not self.network.datagram_repeated:
+            timeout = self.datagram_repeat_delay if timeout is None else min(timeout, self.datagram_repeat_delay)
+
+        return timeout
+
+    def watch_network(self, events: int):
+        """selector가 감시하는 네트워크 소켓 이벤트를 바꿈. 바뀌지 않았으면 아무것도 하지 않음"""
+        if events == self.network_events:
+            return
+
+        if self.network_events == 0:
+            self.selector.register(self.network.sock, events)
+        elif events == 0:
+            self.selector.unregister(self.network.sock)
+        else:
+            self.selector.modify(self.network.sock, events)
+
+        self.network_events = events
+
+    def wait(self):
+        """키 입력, 보드 프레임 도착, 소켓 쓰기 가능, 또는 timeout까지 기다림. 호스트와 연결이 끊기면 EOFError"""
+        events = selectors.EVENT_READ if self.mirror is not None or self.network.session_player_id is not None else 0
+        if self.network.has_pending_output():
+            events |= selectors.EVENT_WRITE
+
+        self.watch_network(events)
+
+        ready = self.selector.select(self.get_timeout())
+        if len(ready) == 0:
+            self.network.repeat_datagram() # 마지막 UDP 패킷을 잃어버렸을 경우를 대비
+
+        for key, mask in ready:
+            if key.fileobj is self.waker[0]:
+                try:
+                    while self.waker[0].recv(4096):
+                        pass
+                except (BlockingIOError, InterruptedError):
+                    pass
+                continue
+
+            if mask & selectors.EVENT_WRITE:
+                self.network.flush_outgoing()
+
+            if mask & selectors.EVENT_READ:
+                frames = self.network.read_board()
+                if self.mirror is not None:
+                    self.mirror.apply(frames)
+
+                if self.network.session_confirmed:
+                    self.reconnect_attempts = 0
+
+    def reconnect(self):
+        """
+        호스트에 다시 연결. 여러 클라이언트가 동시에 끊겼을 때 한꺼번에 몰리지 않도록
+        기다리는 시간을 실패할 때마다 두 배로 늘리고 무작위로 흩뜨림.
+        연결이 바로 실패하면 (네트워크에 닿을 수 없음 등) 더 기다렸다가 다시 시도함.
+        연결 거부처럼 나중에 알게 되는 실패는 run()에서 다시 이 함수를 부름
+        """
+        while True:
+            if self.network.version_rejected:
+                delay = 0 # 호스트가 알려준 버전으로 바로 다시 연결
+            else:
+                delay = min(self.reconnect_delay * 2 ** self.reconnect_attempts, self.max_reconnect_delay)
+                delay *= random.uniform(0.5, 1)
+                self.reconnect_attempts += 1
+
+            print(f'[Network] Reconnecting in {delay:.1f}s ({len(self.network.unacked)} keys to resend) ...')
+            time.sleep(delay)
+
+            self.watch_network(0) # 닫을 소켓을 selector에서 뺌
+            try:
+                self.network.reconnect()
+                return
+            except OSError as e:
+                print(f'[Network] Reconnect failed ({e})')
 
     def run(self):
         while True:
             try:
-                key = self.controller.pop()
-                if key is None:
-                    time.sleep(0.05)
-                    continue
+                keys = self.drain_keys()
+                if len(keys) > 0:
+                    self.send_keys(keys)
+                    continue # 그 사이에 들어온 키가 있는지 다시 확인
+
+                self.wait()
 
-                self.send_key(key)
+            except (EOFError, OSError) as e:
+                print(f'[Network] Disconnected from host ({e})')
+                if self.network.session_player_id is None and not self.network.version_rejected:
+                    self.close()
+                    break
+
+                try:
+                    self.reconnect()
+                except KeyboardInterrupt:
+                    print('Shutdown ...')
+                    self.close()
+                    break
 
             except KeyboardInterrupt:
                 print('Shutdown ...')
-                self.network.close()
+                self.close()
                 break
+
+    def close(self):
+        self.controller.onpush = None
+        self.controller.close()
+
+        if self.mirror is not None:
+            self.mirror.close()
+
+        self.network.close()
+        self.selector.close()
+
+        for sock in self.waker:
+            sock.close()
@@ -1,31 +1,53 @@
 from collections import deque
-from typing import Deque, List, Optional, Tuple
+from typing import Deque, Dict, List, Optional, Tuple
 from mcpi_tetris.core.controller import Controller, TetrisKey
 from mcpi_tetris.config import config
 
 
+def read_play_log(path: str) -> Tuple[Dict[str, str], List[Tuple[int, TetrisKey]]]:
+    """기록된 플레이 로그 파일을 읽어 (헤더, [(tick, key), ...])를 반환"""
+    with open(path, 'r', encoding='utf-8') as file:
+        lines = file.read().split('\n')
+
+    header = {key: value for key, value in map(lambda token: token.split('='), lines[0].split(','))}
+    logs = []
+
+    for line in lines[1:]:
+        if len(line.strip()) == 0:
+            continue
+
+        tick, key = line.split(':')
+        logs.append((int(tick), TetrisKey[key]))
+
+    return header, logs
+
+
 class RecordedController(Controller):
 
     logs: Deque[Tuple[int, TetrisKey]]
 
+    poll_interval: Optional[float] = 0.05
+
+    path: Optional[str]
+    """재생할 로그 파일 경로. None이면 --play-recorded 옵션으로 주어진 파일 사용"""
+
+    def __init__(self, player_id: int, path: Optional[str] = None):
+        super().__init__(player_id)
+        self.path = path
+
     def initialize(self):
         self.logs = deque()
 
         # Join self
         self.logs.append((0, TetrisKey.JOIN))
 
-        filename = config.get('play_recorded')
-        with open(f'logs/play-{filename}.log', 'r', encoding='utf-8') as file:
-            lines = file.read().split('\n')
-            data = {key: value for key, value in map(lambda token: token.split('='), lines[0].split(','))}
+        path = self.path
+        if path is None:
+            filename = config.get('play_recorded')
+            path = f'logs/play-{filename}.log'
 
-            for line in lines[1:]:
-                if len(line.strip()) == 0:
-                    continue
-
-                tick, key = line.split(':')
-                tick = int(tick)
-                self.logs.append((tick, TetrisKey[key]))
+        _, logs = read_play_log(path)
+        self.logs.extend(logs)
 
     def pop(self) -> Optional[TetrisKey]:
         if len(self.logs) == 0:
@@ -37,3 +59,6 @@ class RecordedController(Controller):
             return key
 
         return None
+
+    def has_pending_input(self) -> bool:
+        return len(self.logs) > 0
@@ -21,6 +21,12 @@ class KeyLogger:
         pass
 
 
+class SilentKeyLogger(KeyLogger):
+
+    def onkeypress(self, key: TetrisKey):
+        pass
+
+
 class FileAttachedKeyLogger(KeyLogger):
 
     file: TextIOWrapper
@@ -32,7 +38,7 @@ class FileAttachedKeyLogger(KeyLogger):
 
         Path('logs').mkdir(parents=True, exist_ok=True)
         self.file = open(f'logs/play-{self.seed}.log', 'w', encoding='utf-8')
-        self.file.write(f'width={player.width},height={player.height},player_id={player.controller.player_id},seed={player.seed}\n')
+        self.file.write(f'width={player.width},height={player.height},player_id={player.controller.player_id},seed={player.seed},tick_rate={player.game.tick_rate}\n')
 
     def onkeypress(self, key: TetrisKey):
         super().onkeypress(key)
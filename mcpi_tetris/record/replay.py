@@ -0,0 +1,72 @@
+from concurrent.futures import ProcessPoolExecutor
+from glob import glob
+from hashlib import sha1
+from pathlib import Path
+from typing import Iterable, Iterator, List, NamedTuple, Optional
+
+from mcpi_tetris.core.board import TetrisBoard
+from mcpi_tetris.core.game import HeadlessTetrisGame
+
+from .controller import RecordedController, read_play_log
+
+
+class ReplayResult(NamedTuple):
+    path: str
+    destroyed_lines: int
+    ticks: int
+    board_hash: str
+    zobrist_hash: int
+
+
+def hash_board(board: TetrisBoard) -> str:
+    """보드의 최종 상태(칸마다 블록 색깔)에 대한 해시"""
+    digest = sha1()
+    for row in board.dirty_blocks:
+        digest.update(bytes(0 if block is None else block.color.value for block in row))
+
+    return digest.hexdigest()
+
+
+def replay_log(path: str, max_ticks: Optional[int] = None) -> ReplayResult:
+    """로그 헤더의 width, height, player_id, seed, tick_rate로 headless 게임을 만들어 로그를 재생"""
+    header, _ = read_play_log(path)
+    player_id = int(header.get('player_id', 1))
+
+    game = HeadlessTetrisGame(
+        width=int(header['width']),
+        height=int(header['height']),
+        max_ticks=max_ticks,
+        seed=int(header['seed']),
+        tick_rate=int(header.get('tick_rate', HeadlessTetrisGame.tick_rate)),
+    )
+    game.add_controller(RecordedController(player_id, path))
+    game.join(player_id)
+    game.start()
+    game.run()
+
+    player = game.finished_players.get(player_id, game.players.get(player_id))
+    return ReplayResult(
+        path,
+        player.destroyed_lines,
+        player.tick_counter,
+        hash_board(player.board),
+        player.board.zobrist_hash,
+    )
+
+
+def find_logs(patterns: Iterable[str]) -> List[str]:
+    """디렉토리 또는 glob 패턴으로부터 플레이 로그 파일 목록을 만듦"""
+    paths = []
+    for pattern in patterns:
+        if Path(pattern).is_dir():
+            paths += glob(str(Path(pattern) / 'play-*.log'))
+        else:
+            paths += glob(pattern)
+
+    return sorted(set(paths))
+
+
+def replay_logs(paths: List[str], workers: Optional[int] = None, max_ticks: Optional[int] = None) -> Iterator[ReplayResult]:
+    """로그들을 프로세스 풀에서 병렬로 재생. 결과는 paths 순서대로 반환됨"""
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(replay_log, paths, [max_ticks] * len(paths), chunksize=max(1, len(paths) // 64))
@@ -0,0 +1,27 @@
+import argparse
+import sys
+import time
+from mcpi_tetris.record.replay import find_logs, replay_logs
+
+
+parser = argparse.ArgumentParser(description='Replay recorded play logs headlessly on every core.')
+parser.add_argument('logs', nargs='*', default=['logs'], help='로그 파일, 디렉토리 또는 glob 패턴. (기본값: logs)')
+parser.add_argument('--workers', type=int, help='사용할 프로세스 수. (기본값: CPU 코어 수)')
+parser.add_argument('--max-ticks', type=int, help='로그 하나당 진행할 최대 tick 수')
+
+args = parser.parse_args()
+
+paths = find_logs(args.logs)
+if len(paths) == 0:
+    print('No play logs found!')
+    sys.exit(1)
+
+started = time.perf_counter()
+total_lines = 0
+
+for result in replay_logs(paths, workers=args.workers, max_ticks=args.max_ticks):
+    total_lines += result.destroyed_lines
+    print(f'{result.path}\tlines={result.destroyed_lines}\tticks={result.ticks}\thash={result.board_hash}\tzobrist={result.zobrist_hash:016x}')
+
+elapsed = time.perf_counter() - started
+print(f'[Replay] logs={len(paths)}, total_lines={total_lines}, elapsed={elapsed:.3f}s')
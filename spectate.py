@@ -0,0 +1,59 @@
+import argparse
+from socket import *
+from typing import Dict, List
+from mcpi_tetris.core.spectator import FRAME_DELTA, FRAME_KEYFRAME, FRAME_REMOVED, SPECTATOR_SERVER_PORT, decode_frames
+
+
+parser = argparse.ArgumentParser(description='Watch tetris games streamed by host in terminal.')
+parser.add_argument('ip', nargs='?', default='127.0.0.1', help='IP Address to connect.')
+parser.add_argument('--port', type=int, default=SPECTATOR_SERVER_PORT, help=f'관전 포트. 방을 여러 개 사용하면 {SPECTATOR_SERVER_PORT} + 방 번호 (기본값: {SPECTATOR_SERVER_PORT})')
+
+args = parser.parse_args()
+
+boards: Dict[int, List[List[int]]] = {}
+"""플레이어 ID별 보드. boards[player_id][y][x] = 색깔 값 (빈 칸은 0)"""
+
+ticks: Dict[int, int] = {}
+
+sock = socket(AF_INET, SOCK_STREAM)
+sock.connect((args.ip, args.port))
+print(f'[Spectator] Connected to {args.ip}:{args.port}')
+
+buffer = bytearray()
+
+try:
+    while True:
+        data = sock.recv(65536)
+        if not data:
+            print('[Spectator] Disconnected')
+            break
+
+        buffer += data
+
+        for frame in decode_frames(buffer):
+            if frame.kind == FRAME_KEYFRAME:
+                boards[frame.player_id] = [[0 for x in range(frame.width)] for y in range(frame.height)]
+            elif frame.kind == FRAME_REMOVED:
+                boards.pop(frame.player_id, None)
+                ticks.pop(frame.player_id, None)
+                continue
+            elif frame.kind != FRAME_DELTA or frame.player_id not in boards:
+                continue
+
+            board = boards[frame.player_id]
+            for x, y, color in frame.cells:
+                board[y][x] = color
+
+            ticks[frame.player_id] = frame.tick
+
+        for player_id, board in boards.items():
+            print(f'Player {player_id} (tick={ticks.get(player_id, 0)})')
+            for row in reversed(board):
+                print(' '.join('□' if color == 0 else '■' for color in row))
+
+            print()
+
+except KeyboardInterrupt:
+    pass
+finally:
+    sock.close()
@@ -2,15 +2,20 @@ import sys
 import argparse
 from mcpi_tetris.config import config
 from mcpi_tetris.core.controller import KeyboardArrowController, KeyboardWASDController, StdinController
-from mcpi_tetris.core.game import ConsoleTetrisGame
+from mcpi_tetris.core.game import ConsoleTetrisGame, HeadlessTetrisGame
 
 
 parser = argparse.ArgumentParser(description='Play tetris in terminal. (Single play only)')
 parser.add_argument('--controller', default='wasd', choices=(
-    'wasd', 'arrow', 'stdin', 'joystick',
+    'wasd', 'arrow', 'stdin', 'joystick', 'ai',
 ))
 parser.add_argument('--record', action='store_true', help='Record player\'s key inputs to file. (will saved into logs folder.)')
 parser.add_argument('--play-recorded', help='File to play recorded keys.')
+parser.add_argument('--bitboard', action='store_true', help='비트마스크 기반 보드 엔진을 사용합니다.')
+parser.add_argument('--headless', action='store_true', help='화면 없이 가상 시계로 최대한 빠르게 실행합니다. (--play-recorded와 함께 사용)')
+parser.add_argument('--spectator', action='store_true', help='관전자들이 소켓으로 게임 보드를 볼 수 있도록 합니다. (spectate.py 참고)')
+parser.add_argument('--tick-rate', type=int, default=20, help='1초당 tick 수. 올리면 입력이 더 자주 반영되며, 게임 속도는 그대로입니다. (기본값: 20)')
+parser.add_argument('--max-ticks', type=int, help='headless 모드에서 진행할 최대 tick 수')
 
 config.load_from_parser(parser)
 
@@ -38,6 +43,9 @@ elif config.get('controller') == 'stdin':
 elif config.get('controller') == 'joystick':
     from mcpi_tetris.hardware.controller import RPiGPIOJoystickController
     controller = RPiGPIOJoystickController(player_id)
+elif config.get('controller') == 'ai':
+    from mcpi_tetris.ai.controller import PlacementSearchController
+    controller = PlacementSearchController(player_id)
 elif config.get('controller') == 'record':
     if config.get('play_recorded') is None:
         print('You should give --play-recorded option!! (e.x. --play-recorded 1639161407)')
@@ -46,11 +54,21 @@ elif config.get('controller') == 'record':
     from mcpi_tetris.record.controller import RecordedController
     controller = RecordedController(player_id)
 
-game = ConsoleTetrisGame()
+if config.get('headless'):
+    game = HeadlessTetrisGame(max_ticks=config.get('max_ticks'))
+else:
+    game = ConsoleTetrisGame()
+
 game.add_controller(controller)
 game.join(player_id)
 game.start()
 game.run()
 
+if config.get('headless'):
+    for player in game.finished_players.values():
+        print(f'[Headless] player_id={player.controller.player_id}, destroyed_lines={player.destroyed_lines}')
+
+    print(f'[Headless] {game.report()}')
+
 if need_hardwares:
     Hardware.cleanup_hardwares()
\ No newline at end of file